@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Trigram and full-text lookups (inactive on other databases)
     'cloudinary_storage',
     'cloudinary',
     'signlang',
@@ -83,6 +84,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'signlang.context_processors.page_cache',
             ],
         },
     },
@@ -254,3 +256,75 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 ALLOWED_IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
 ALLOWED_VIDEO_EXTENSIONS = ['mp4', 'webm', 'avi', 'mov']
 ALLOWED_DOCUMENT_EXTENSIONS = ['pdf', 'doc', 'docx', 'txt']
+
+# ============ FLASHCARD SCHEDULING ============
+# Default spaced-repetition scheduler: 'sm2' or 'fsrs' (users can be switched individually)
+FLASHCARD_SCHEDULER = os.environ.get('FLASHCARD_SCHEDULER', 'sm2')
+
+# ============ QUIZ ATTEMPT RETENTION ============
+# compact_quiz_attempts keeps the newest attempts and the best attempt per (user, quiz);
+# older attempts are deleted once they are past keep_days (their counts stay on QuizBest)
+QUIZ_ATTEMPT_RETENTION = {
+    'keep_recent': int(os.environ.get('QUIZ_ATTEMPT_KEEP_RECENT', '20')),
+    'keep_days': int(os.environ.get('QUIZ_ATTEMPT_KEEP_DAYS', '90')),
+}
+
+# ============ SEARCH ============
+# 'memory' (in-process BM25 index), 'postgres' (tsvector + GIN) or 'auto' (Postgres when available)
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+# ============ FORUM RANKING ============
+# Hot score: every like/comment adds its weight (a new post starts with new_post_weight) and the
+# score halves every half_life_hours; decay_forum_scores applies the decay in batches.
+# Top this week: weighted likes and comments from the last week_days days.
+FORUM_RANKING = {
+    'like_weight': float(os.environ.get('FORUM_LIKE_WEIGHT', '1')),
+    'comment_weight': float(os.environ.get('FORUM_COMMENT_WEIGHT', '2')),
+    'new_post_weight': float(os.environ.get('FORUM_NEW_POST_WEIGHT', '3')),
+    'half_life_hours': float(os.environ.get('FORUM_HOT_HALF_LIFE_HOURS', '12')),
+    'week_days': int(os.environ.get('FORUM_TOP_DAYS', '7')),
+}
+
+# ============ PAGE CACHE ============
+# Public pages are cached whole for anonymous visitors (signlang/page_cache.py)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+
+# ============ CACHE ============
+# Shared by every worker when REDIS_URL (Redis or any Redis-protocol server, needs the `redis`
+# package) or CACHE_DIR (file-based, for workers on one host) is set; otherwise each process
+# keeps its own in-memory cache, which is fine for development and tests.
+# Expensive entries go through signlang.cache_tags.get_or_compute (single flight + early refresh).
+# Single flight relies on an atomic cache.add: Redis and LocMem (within a process) provide it,
+# FileBasedCache does not, so with CACHE_DIR two workers may occasionally compute the same entry.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_DIR = os.environ.get('CACHE_DIR', '')
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', '300'))
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'signox',
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': CACHE_TIMEOUT,
+            'KEY_PREFIX': 'signox',
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'signox',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))},
+        }
+    }
@@ -4,7 +4,7 @@ from .models import (
     Quiz, Question, Answer, QuizAttempt, VideoCategory, Video,
     ForumPost, Comment, Like, Report, UserInteraction,
     Badge, UserBadge, UserStreak, UserPoints, Notification, DailyActivity,
-    FeaturedCard, SiteSettings
+    FeaturedCard, SiteSettings, SchedulerParams
 )
 
 
@@ -111,9 +111,10 @@ class VideoAdmin(admin.ModelAdmin):
 
 @admin.register(ForumPost)
 class ForumPostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'is_pinned', 'created_at']
+    list_display = ['title', 'author', 'is_pinned', 'like_count', 'comment_count', 'created_at']
     list_filter = ['is_pinned', 'created_at']
     search_fields = ['title', 'content', 'author__username']
+    readonly_fields = ['like_count', 'comment_count']
 
 
 @admin.register(Comment)
@@ -220,6 +221,14 @@ class DailyActivityAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
 
 
+@admin.register(SchedulerParams)
+class SchedulerParamsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'scheduler', 'stability_scale', 'desired_retention', 'sample_count', 'fitted_at']
+    list_filter = ['scheduler']
+    search_fields = ['user__username']
+    readonly_fields = ['sample_count', 'fitted_at']
+
+
 # ============ HOME PAGE CONTENT ADMIN ============
 
 @admin.register(FeaturedCard)
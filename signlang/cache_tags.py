@@ -0,0 +1,155 @@
+"""
+Cache Tags for Signox
+Cache entries declare the content they were built from as tags: a model
+("lesson") or one row of it ("lesson:42"). Each tag has a version in the cache,
+and entry keys embed the versions of their tags, so invalidating a tag is a
+single write and every entry that declared it is simply never read again
+(the backend expires or culls the old copies).
+
+Versions are random tokens rather than counters: if a version is evicted the
+next one is new, so an old entry can never become readable again. This works
+with the per-process LocMem cache as well as a shared backend (settings.CACHES).
+
+Models opt in with register(); saving or deleting a row then invalidates its
+model tag, its row tag and any related tags (see the bottom of models.py).
+
+get_or_compute() protects expensive entries from stampedes: one caller
+recomputes a missing entry while the others wait for it (single flight), and
+entries are refreshed a little before they expire, with a probability that
+grows as expiry nears and with how long the value took to compute (XFetch),
+so busy keys are rebuilt by one request instead of all workers at once.
+"""
+import math
+import random
+import secrets
+import time
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+
+VERSION_TIMEOUT = None  # Versions never expire; entries carry their own timeouts
+
+# Updates limited to these fields do not invalidate anything (per-view counters)
+IGNORED_UPDATE_FIELDS = {'view_count'}
+
+XFETCH_BETA = 1.0  # > 1 refreshes earlier, < 1 later; 0 disables early refreshes
+LOCK_TIMEOUT = 30  # Seconds before a crashed computation stops blocking others
+LOCK_WAIT = 5  # Seconds to wait for another caller's result before computing anyway
+LOCK_POLL_INTERVAL = 0.05
+
+
+# ============================================
+# TAGS AND VERSIONS
+# ============================================
+def version_key(tag):
+    return f'tag_version_{tag}'
+
+
+def model_tag(model):
+    """Tag for all rows of a model (class or instance), e.g. "lesson" """
+    return model._meta.model_name
+
+
+def instance_tag(instance):
+    """Tag for one row, e.g. "lesson:42" """
+    return f'{model_tag(instance)}:{instance.pk}'
+
+
+def tag_versions(tags):
+    """Current versions of a set of tags as one string, for use inside cache keys"""
+    tags = sorted(set(tags))
+    keys = [version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, secrets.token_hex(4), VERSION_TIMEOUT)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def invalidate(*tags):
+    """Make every entry that declared any of `tags` stale"""
+    cache.set_many({version_key(tag): secrets.token_hex(4) for tag in tags}, VERSION_TIMEOUT)
+
+
+# ============================================
+# TAGGED ENTRIES
+# ============================================
+def make_key(name, tags):
+    """Cache key for `name` that changes whenever any of `tags` is invalidated"""
+    return f'{name}@{tag_versions(tags)}' if tags else name
+
+
+def is_fresh(entry, beta=XFETCH_BETA):
+    """False when the entry is missing or due for an early refresh"""
+    if entry is None:
+        return False
+    _, compute_time, expires_at = entry
+    if expires_at is None:
+        return True
+    # -log(U) is exponentially distributed: usually small, occasionally large
+    return time.time() - compute_time * beta * math.log(1.0 - random.random()) < expires_at
+
+
+def store(key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    compute_time = time.monotonic() - started
+    expires_at = time.time() + timeout if timeout is not None else None
+    cache.set(key, (value, compute_time, expires_at), timeout)
+    return value
+
+
+def get_or_compute(name, compute, timeout, tags=(), refresh=False, beta=XFETCH_BETA):
+    """
+    Cached value of `compute()` under `name`, rebuilt once any of `tags` is
+    invalidated (or straight away with refresh). Only one caller computes at a time.
+    """
+    key = make_key(name, tags)
+    if refresh:
+        return store(key, compute, timeout)
+    entry = cache.get(key)
+    if is_fresh(entry, beta):
+        return entry[0]
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return store(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    # Someone else is computing: serve the old value while it lasts, otherwise wait for theirs
+    if entry is not None:
+        return entry[0]
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if cache.get(lock_key) is None:
+            break
+    return store(key, compute, timeout)
+
+
+# ============================================
+# SIGNAL HUB
+# ============================================
+RELATED_TAGS = {}  # model -> function(instance) returning extra tags to invalidate
+
+
+def content_changed(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS:
+        return
+    related = RELATED_TAGS.get(sender)
+    invalidate(model_tag(sender), instance_tag(instance), *(related(instance) if related else ()))
+
+
+def register(model, related=None):
+    """Invalidate a model's tags whenever one of its rows is saved or deleted"""
+    if related is not None:
+        RELATED_TAGS[model] = related
+    post_save.connect(content_changed, sender=model, dispatch_uid=f'cache_tags_save_{model_tag(model)}')
+    post_delete.connect(content_changed, sender=model, dispatch_uid=f'cache_tags_delete_{model_tag(model)}')
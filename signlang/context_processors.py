@@ -0,0 +1,11 @@
+"""
+Template context processors for the Sign Language Learning Platform
+"""
+from .page_cache import CSRF_PLACEHOLDER
+
+
+def page_cache(request):
+    """Pages rendered for the anonymous page cache get a CSRF placeholder instead of a real token"""
+    if getattr(request, 'page_cache_csrf', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
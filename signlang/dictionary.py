@@ -0,0 +1,200 @@
+"""
+Dictionary Service for Signox
+Letter index for the dictionary page: bucket counts and category counts are
+cached, and each letter is read a page at a time with a keyset cursor over
+the (letter, word_normalized, id) index, so the page costs the same for any
+dictionary size.
+
+Vocabulary lookup matches accent-folded words and meanings: prefix matches come
+from the indexed normalised columns, typo-tolerant matches from trigram
+similarity (pg_trgm on PostgreSQL, an in-process trigram index elsewhere), and
+when those leave the page short, substring matches anywhere in a word or meaning.
+"""
+import base64
+import json
+from django.db import connection
+from django.db.models import Count, Q
+from . import cache_tags, search
+from .models import Category, Vocabulary
+from .utils import DICTIONARY_LETTERS, dictionary_letter_order, normalize_text
+
+
+DICTIONARY_PAGE_SIZE = 48
+DICTIONARY_CACHE_TIMEOUT = 60 * 60 * 24  # Also replaced whenever vocabulary, lessons or categories change
+DICTIONARY_TAGS = ('vocabulary', 'lesson', 'category')
+
+
+def published_vocabulary(category_slug=''):
+    vocabulary = Vocabulary.objects.filter(lesson__is_published=True)
+    if category_slug:
+        vocabulary = vocabulary.filter(lesson__category__slug=category_slug)
+    return vocabulary
+
+
+# ============================================
+# LETTER INDEX
+# ============================================
+def get_letter_counts(category_slug=''):
+    """[(letter, word count)] in dictionary order, for the whole dictionary or one category"""
+    def count_letters():
+        rows = published_vocabulary(category_slug).values('letter').annotate(
+            total=Count('id')
+        ).order_by()
+        return sorted(
+            ((row['letter'], row['total']) for row in rows),
+            key=lambda item: dictionary_letter_order(item[0]),
+        )
+
+    return cache_tags.get_or_compute(
+        f'dictionary_letters_{category_slug}', count_letters, DICTIONARY_CACHE_TIMEOUT,
+        tags=DICTIONARY_TAGS,
+    )
+
+
+def letter_nav(letter_counts):
+    """Every alphabet letter with its count (0 = nothing to show), then any other buckets"""
+    counts = dict(letter_counts)
+    nav = [(letter, counts.get(letter, 0)) for letter in DICTIONARY_LETTERS]
+    nav.extend((letter, count) for letter, count in letter_counts if letter not in DICTIONARY_LETTERS)
+    return nav
+
+
+def get_categories():
+    """Categories with published vocabulary, each with `vocab_count`"""
+    return cache_tags.get_or_compute(
+        'dictionary_categories',
+        lambda: list(Category.objects.annotate(
+            vocab_count=Count('lessons__vocabularies', filter=Q(lessons__is_published=True))
+        ).filter(vocab_count__gt=0)),
+        DICTIONARY_CACHE_TIMEOUT,
+        tags=DICTIONARY_TAGS,
+    )
+
+
+# ============================================
+# LETTER PAGES
+# ============================================
+def encode_cursor(vocab):
+    raw = json.dumps([vocab.word_normalized, vocab.id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """(normalised word, id) of the last card shown, or None to start from the top"""
+    if not cursor:
+        return None
+    try:
+        word, vocab_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(word), int(vocab_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def get_letter_page(letter, category_slug='', cursor=None, limit=DICTIONARY_PAGE_SIZE):
+    """
+    One page of a letter's words in (normalised word, id) order, so "ấm" sorts with "am".
+    Returns (vocabulary, next_cursor); next_cursor is None on the last page.
+    """
+    vocabulary = published_vocabulary(category_slug).filter(letter=letter).select_related(
+        'lesson', 'lesson__category'
+    ).order_by('word_normalized', 'id')
+    position = decode_cursor(cursor)
+    if position:
+        word, vocab_id = position
+        vocabulary = vocabulary.filter(
+            Q(word_normalized__gt=word) | Q(word_normalized=word, id__gt=vocab_id)
+        )
+
+    page = list(vocabulary[:limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page, None
+
+
+# ============================================
+# VOCABULARY LOOKUP
+# ============================================
+LOOKUP_LIMIT = 20
+SIMILARITY_THRESHOLD = 0.3  # Same default as pg_trgm
+PREFIX_END = '\uffff'  # Upper bound of a prefix range, so prefix matches use the column index
+
+
+def prefix_matches(normalized, vocabulary, limit):
+    """{id: score} of words (then meanings) equal to or starting with the query"""
+    scores = {}
+    for field, exact_score, prefix_score in [
+        ('word_normalized', 1.0, 0.9),
+        ('meaning_normalized', 0.8, 0.7),
+    ]:
+        rows = vocabulary.filter(**{
+            f'{field}__gte': normalized, f'{field}__lt': normalized + PREFIX_END,
+        }).order_by(field, 'id').values_list('id', field)[:limit]
+        for vocab_id, value in rows:
+            scores.setdefault(vocab_id, exact_score if value == normalized else prefix_score)
+    return scores
+
+
+def substring_matches(normalized, vocabulary, limit):
+    """{id: score} of words (then meanings) containing the query anywhere, e.g. a word inside a meaning"""
+    scores = {}
+    for field, score in [('word_normalized', 0.6), ('meaning_normalized', 0.5)]:
+        rows = vocabulary.filter(**{f'{field}__contains': normalized}).order_by('id').values_list('id', flat=True)
+        for vocab_id in rows[:limit]:
+            scores.setdefault(vocab_id, score)
+    return scores
+
+
+def trigram_matches(normalized, vocabulary, limit):
+    """(id, similarity) rows from pg_trgm; the % filter uses the GIN trigram indexes"""
+    from django.contrib.postgres.search import TrigramSimilarity
+    from django.db.models.functions import Greatest
+    return vocabulary.filter(
+        Q(word_normalized__trigram_similar=normalized) |
+        Q(meaning_normalized__trigram_similar=normalized)
+    ).annotate(similarity=Greatest(
+        TrigramSimilarity('word_normalized', normalized),
+        TrigramSimilarity('meaning_normalized', normalized),
+    )).order_by('-similarity', 'id').values_list('id', 'similarity')[:limit]
+
+
+def fuzzy_matches(normalized, vocabulary, limit):
+    """{id: trigram similarity} of words or meanings that look like the query"""
+    if connection.vendor == 'postgresql':
+        return dict(trigram_matches(normalized, vocabulary, limit))
+
+    # The in-process index holds all published vocabulary; category filters are applied after
+    ranked = search.get_trigram_index().similar(normalized, SIMILARITY_THRESHOLD, limit * 5)
+    allowed = set(vocabulary.filter(id__in=[vocab_id for vocab_id, _ in ranked]).values_list('id', flat=True))
+    return {vocab_id: score for vocab_id, score in ranked if vocab_id in allowed}
+
+
+def lookup(query, category_slug='', limit=LOOKUP_LIMIT):
+    """
+    Published vocabulary matching a query regardless of accents and small typos,
+    best first, each with a `similarity` score (1 = exact word).
+    """
+    normalized = normalize_text(query, max_length=100)
+    if not normalized:
+        return []
+    vocabulary = published_vocabulary(category_slug)
+
+    scores = fuzzy_matches(normalized, vocabulary, limit)
+    for vocab_id, score in prefix_matches(normalized, vocabulary, limit).items():
+        scores[vocab_id] = max(score, scores.get(vocab_id, 0))
+    if len(scores) < limit:
+        # Whole-string prefix and similarity miss words in the middle of a meaning
+        for vocab_id, score in substring_matches(normalized, vocabulary, limit).items():
+            scores[vocab_id] = max(score, scores.get(vocab_id, 0))
+
+    best = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+    objects = Vocabulary.objects.select_related('lesson', 'lesson__category').in_bulk(
+        [vocab_id for vocab_id, _ in best]
+    )
+    results = []
+    for vocab_id, score in best:
+        vocab = objects[vocab_id]
+        vocab.similarity = round(score, 3)
+        results.append(vocab)
+    results.sort(key=lambda vocab: (-vocab.similarity, vocab.word_normalized, vocab.id))
+    return results
@@ -0,0 +1,342 @@
+"""
+Flashcard Service for Signox
+Builds spaced-repetition decks for lessons with a bounded number of queries
+"""
+import base64
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import cache_tags, gamification
+from .models import Vocabulary, VocabularyReview, LessonMastery, ReviewLog, SchedulerParams
+
+
+VOCABULARY_CACHE_TIMEOUT = 3600  # 1 hour, or until the lesson's vocabulary changes (tag lesson:<id>)
+
+
+# ============================================
+# STATIC VOCABULARY DATA
+# ============================================
+def get_lesson_vocabulary(lesson, refresh=False):
+    """
+    Get the static fields of a lesson's vocabulary (word, meaning, media URLs).
+    Identical for every user, so it is cached per lesson until its vocabulary changes.
+    """
+    def build_cards():
+        return [{
+            'id': vocab.id,
+            'word': vocab.word,
+            'meaning': vocab.meaning,
+            'description': vocab.description,
+            'image': vocab.image.url if vocab.image else None,
+            'video': vocab.video.url if vocab.video else None,
+        } for vocab in lesson.vocabularies.all()]
+
+    return cache_tags.get_or_compute(
+        f'flashcard_vocab_{lesson.id}', build_cards, VOCABULARY_CACHE_TIMEOUT,
+        tags=[f'lesson:{lesson.id}'], refresh=refresh,
+    )
+
+
+# ============================================
+# DECK LOADING
+# ============================================
+def serialize_review(review):
+    """Per-user scheduling data shown on a card"""
+    return {
+        'mastery': review.mastery_level,
+        'interval': review.interval,
+        'repetitions': review.repetitions,
+        'is_due': review.is_due,
+        'next_review': review.next_review.isoformat() if review.next_review else None,
+    }
+
+
+def load_deck(user, lesson):
+    """
+    Build a user's flashcard deck for a lesson.
+    Existing reviews are fetched in one query and missing ones are created
+    with a single bulk insert, instead of one get_or_create per card.
+    """
+    cards = get_lesson_vocabulary(lesson)
+    vocab_ids = set(lesson.vocabularies.values_list('id', flat=True))
+    if vocab_ids != {card['id'] for card in cards}:
+        # Cache entry predates a vocabulary change made elsewhere
+        cards = get_lesson_vocabulary(lesson, refresh=True)
+
+    reviews = {
+        review.vocabulary_id: review
+        for review in VocabularyReview.objects.filter(user=user, vocabulary__lesson=lesson)
+    }
+
+    missing = [
+        VocabularyReview(user=user, vocabulary_id=card['id'], next_review=timezone.now().date())
+        for card in cards if card['id'] not in reviews
+    ]
+    if missing:
+        # Concurrent deck loads may insert the same rows; those are skipped
+        VocabularyReview.objects.bulk_create(missing, ignore_conflicts=True)
+        LessonMastery.sync_card_count(user.id, lesson.id)
+        for review in missing:
+            reviews[review.vocabulary_id] = review
+
+    return [dict(card, review=serialize_review(reviews[card['id']])) for card in cards]
+
+
+def deck_to_json(deck):
+    """Serialize a deck compactly for embedding in the flashcard page"""
+    return json.dumps(deck, separators=(',', ':'), ensure_ascii=False)
+
+
+# ============================================
+# CROSS-LESSON REVIEW SESSIONS
+# ============================================
+REVIEW_SESSION_LIMIT = 100  # Cards served per review session
+REVIEW_BATCH_SIZE = 20  # Cards per queue request (the client prefetches the next batch)
+NEW_CARDS_EVERY = 4  # Interleave one new card after every 4 due cards
+
+
+def encode_queue_cursor(state):
+    """Encode review queue position as an opaque URL-safe string"""
+    raw = json.dumps(state, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_queue_cursor(cursor):
+    """Decode a review queue cursor, falling back to the start of a session"""
+    state = {'due': None, 'new': 0, 'served': 0}
+    if not cursor:
+        return state
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if data.get('due') is not None:
+            due_date, due_id = data['due']
+            state['due'] = [date.fromisoformat(due_date).isoformat(), int(due_id)]
+        state['new'] = int(data.get('new', 0))
+        state['served'] = max(0, int(data.get('served', 0)))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return {'due': None, 'new': 0, 'served': 0}
+    return state
+
+
+def serialize_review_card(review):
+    """Card payload for a review from any lesson"""
+    vocab = review.vocabulary
+    return {
+        'id': vocab.id,
+        'word': vocab.word,
+        'meaning': vocab.meaning,
+        'description': vocab.description,
+        'image': vocab.image.url if vocab.image else None,
+        'video': vocab.video.url if vocab.video else None,
+        'lesson': vocab.lesson.title,
+        'is_new': review.total_reviews == 0,
+        'review': serialize_review(review),
+    }
+
+
+def get_review_batch(user, cursor=None, limit=REVIEW_BATCH_SIZE):
+    """
+    Get the next batch of a cross-lesson review session.
+    Due cards (oldest first) and new cards are read with keyset cursors over
+    indexed columns, so cost does not grow with the user's review history.
+    Returns (cards, next_cursor); next_cursor is None when the session is over.
+    """
+    state = decode_queue_cursor(cursor)
+    limit = min(limit, REVIEW_SESSION_LIMIT - state['served'])
+    if limit <= 0:
+        return [], None
+
+    after = None
+    if state['due']:
+        after = (date.fromisoformat(state['due'][0]), state['due'][1])
+    # One extra row from each stream tells us whether more cards remain
+    due = list(VocabularyReview.get_due_cards(user, limit=limit + 1, after=after))
+    new = list(VocabularyReview.get_new_cards(user, limit=limit + 1, after_id=state['new']))
+
+    batch = []
+    due_used = new_used = 0
+    while len(batch) < limit and (due_used < len(due) or new_used < len(new)):
+        take_new = new_used < len(new) and (
+            due_used >= len(due) or len(batch) % (NEW_CARDS_EVERY + 1) == NEW_CARDS_EVERY
+        )
+        if take_new:
+            batch.append(new[new_used])
+            new_used += 1
+        else:
+            batch.append(due[due_used])
+            due_used += 1
+
+    if due_used:
+        last = due[due_used - 1]
+        state['due'] = [last.next_review.isoformat(), last.id]
+    if new_used:
+        state['new'] = new[new_used - 1].id
+    state['served'] += len(batch)
+
+    has_more = due_used < len(due) or new_used < len(new)
+    if not has_more or state['served'] >= REVIEW_SESSION_LIMIT:
+        return [serialize_review_card(review) for review in batch], None
+    return [serialize_review_card(review) for review in batch], encode_queue_cursor(state)
+
+
+# ============================================
+# BATCHED RATINGS
+# ============================================
+MAX_BATCH_RATINGS = 200  # Largest batch accepted in one request (offline queues included)
+MAX_CLOCK_SKEW = timedelta(minutes=5)  # How far ahead of the server a client clock may run
+
+
+def parse_client_timestamp(value):
+    """
+    Parse a client timestamp (ISO 8601 string or epoch milliseconds).
+    Required: replays are recognised by it, so a missing one can't be replaced by "now".
+    """
+    if value in (None, ''):
+        raise ValueError('Missing client_timestamp')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError('Invalid client_timestamp')
+    reviewed_at = parse_datetime(str(value))
+    if reviewed_at is None:
+        raise ValueError('Invalid client_timestamp')
+    if timezone.is_naive(reviewed_at):
+        reviewed_at = timezone.make_aware(reviewed_at, dt_timezone.utc)
+    return reviewed_at
+
+
+def clean_rating_entries(entries):
+    """Validate a list of rating entries, returning (vocabulary_id, rating, reviewed_at) tuples"""
+    if not isinstance(entries, list) or not entries:
+        raise ValueError('ratings must be a non-empty list')
+    if len(entries) > MAX_BATCH_RATINGS:
+        raise ValueError(f'At most {MAX_BATCH_RATINGS} ratings per request')
+
+    cleaned = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError('Each rating must be an object')
+        try:
+            vocab_id = int(entry.get('vocabulary_id'))
+            rating = int(entry.get('rating'))
+        except (TypeError, ValueError):
+            raise ValueError('Missing vocabulary_id or rating')
+        if rating not in [1, 2, 3, 4]:
+            raise ValueError('Rating must be 1-4')
+        cleaned.append((vocab_id, rating, parse_client_timestamp(entry.get('client_timestamp'))))
+    return cleaned
+
+
+def apply_rating_batch(user, entries):
+    """Validate client rating entries and apply them (see apply_ratings). Raises ValueError for malformed input."""
+    return apply_ratings(user, clean_rating_entries(entries))
+
+
+def rate_card(user, vocab_id, rating):
+    """
+    Apply one rating made now, through the same bulk path as batches, so the
+    review, its ReviewLog row, the lesson rollup, points and activity are
+    written identically. Returns the card's result (see apply_ratings).
+    """
+    return apply_ratings(user, [(vocab_id, rating, timezone.now())])['results'][0]
+
+
+def apply_ratings(user, cleaned):
+    """
+    Apply an ordered list of (vocabulary_id, rating, reviewed_at) ratings in one transaction.
+    Reviews are loaded and written in bulk, the lesson rollups get one update
+    per lesson, and points and daily activity are aggregated into one write each.
+
+    Ratings recorded at or before a card's last review are skipped, so a
+    client can safely replay an offline queue that was partly delivered.
+    Client times are kept as sent (not clamped to the server clock, which would
+    make a replay look newer); ratings more than MAX_CLOCK_SKEW ahead are rejected.
+    """
+    vocab_ids = {vocab_id for vocab_id, _, _ in cleaned}
+    lessons = dict(Vocabulary.objects.filter(id__in=vocab_ids).values_list('id', 'lesson_id'))
+
+    latest = timezone.now() + MAX_CLOCK_SKEW
+    results = []
+    applied = 0
+    points = 0
+
+    with transaction.atomic():
+        reviews = {
+            review.vocabulary_id: review
+            for review in VocabularyReview.objects.select_for_update().filter(
+                user=user, vocabulary_id__in=lessons
+            )
+        }
+        missing = [
+            VocabularyReview(user=user, vocabulary_id=vocab_id, next_review=timezone.now().date())
+            for vocab_id in lessons if vocab_id not in reviews
+        ]
+        if missing:
+            VocabularyReview.objects.bulk_create(missing, ignore_conflicts=True)
+            # Re-read so every review has a primary key for bulk_update
+            reviews = {
+                review.vocabulary_id: review
+                for review in VocabularyReview.objects.select_for_update().filter(
+                    user=user, vocabulary_id__in=lessons
+                )
+            }
+
+        start = {
+            vocab_id: (review.mastery, review.total_reviews == 0)
+            for vocab_id, review in reviews.items()
+        }
+        changed = set()
+        params = SchedulerParams.for_user(user.id)
+        logs = []
+
+        for vocab_id, rating, reviewed_at in cleaned:
+            review = reviews.get(vocab_id)
+            if review is None:
+                results.append({'vocabulary_id': vocab_id, 'status': 'not_found'})
+                continue
+            if reviewed_at > latest:
+                results.append({'vocabulary_id': vocab_id, 'status': 'rejected'})
+                continue
+            if review.last_reviewed and reviewed_at <= review.last_reviewed:
+                results.append({'vocabulary_id': vocab_id, 'status': 'duplicate'})
+                continue
+
+            logs.append(review.apply_rating(rating, reviewed_at=reviewed_at, params=params))
+            changed.add(vocab_id)
+            applied += 1
+            if rating >= 3:
+                points += gamification.POINTS['flashcard_review']
+            results.append({
+                'vocabulary_id': vocab_id,
+                'status': 'applied',
+                'next_interval': review.interval,
+                'mastery': review.mastery_level,
+                'next_review': review.next_review.isoformat() if review.next_review else None,
+            })
+
+        if changed:
+            VocabularyReview.objects.bulk_update(
+                [reviews[vocab_id] for vocab_id in changed], VocabularyReview.RATING_FIELDS
+            )
+            ReviewLog.objects.bulk_create(logs)
+
+        for lesson_id in {lessons[review.vocabulary_id] for review in missing}:
+            LessonMastery.sync_card_count(user.id, lesson_id)
+
+        rollups = defaultdict(lambda: {'mastery': 0, 'reviewed': 0})
+        for vocab_id in changed:
+            old_mastery, first_review = start[vocab_id]
+            rollup = rollups[lessons[vocab_id]]
+            rollup['mastery'] += reviews[vocab_id].mastery - old_mastery
+            rollup['reviewed'] += 1 if first_review else 0
+        for lesson_id, delta in rollups.items():
+            LessonMastery.apply_delta(user.id, lesson_id, **delta)
+
+        if applied:
+            gamification.on_flashcard_reviews(user, applied, points)
+
+    return {'applied': applied, 'points': points, 'results': results}
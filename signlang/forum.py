@@ -0,0 +1,184 @@
+"""
+Forum Ranking for Signox
+Posts carry two precomputed, indexed scores so the hot and top feeds are plain
+keyset scans:
+
+- hot_score: each like or comment adds its weight and a new post starts with a
+  recency bonus; the whole score halves every half-life. The stored score is
+  as of hot_decayed_at: events decay it to their own time before adding their
+  weight, and decay_forum_scores brings the rest of the posts forward in batches.
+- week_score: weighted likes and comments of the last week, incremented by
+  events and recounted by the same batch job as events age out of the window.
+
+Comment threads are read a page at a time: top-level comments by keyset on
+(created_at, id), and a thread's replies depth-first by materialised path.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Comment, ForumPost, Like
+
+
+RANKING_DEFAULTS = {
+    'like_weight': 1.0,
+    'comment_weight': 2.0,
+    'new_post_weight': 3.0,
+    'half_life_hours': 12.0,
+    'week_days': 7,
+}
+MIN_HOT_SCORE = 0.01  # Decayed scores below this drop to 0 and leave the decay batch
+
+# Feed name -> keyset ordering (the trailing id keeps positions unique)
+FEEDS = {
+    'new': ['-is_pinned', '-created_at', '-id'],
+    'hot': ['-hot_score', '-id'],
+    'top': ['-week_score', '-id'],
+}
+DEFAULT_FEED = 'new'
+
+COMMENT_PAGE_SIZE = 20
+REPLY_PAGE_SIZE = 50
+COMMENT_ORDERING = ['created_at', 'id']
+REPLY_ORDERING = ['path']  # Paths are unique and sort each reply under its parent
+
+
+def feed_posts(posts, name):
+    """(posts, ordering) for a feed; "top" only lists posts with activity this week"""
+    if name == 'top':
+        posts = posts.filter(week_score__gt=0)
+    return posts, FEEDS[name]
+
+
+def ranking(name):
+    """A weight from settings.FORUM_RANKING, falling back to RANKING_DEFAULTS"""
+    return getattr(settings, 'FORUM_RANKING', {}).get(name, RANKING_DEFAULTS[name])
+
+
+def decay_factor(hours):
+    """Share of a score left after `hours`"""
+    return 0.5 ** (max(hours, 0) / ranking('half_life_hours'))
+
+
+def week_start(now=None):
+    return (now or timezone.now()) - timedelta(days=ranking('week_days'))
+
+
+def hours_between(earlier, later):
+    return (later - earlier).total_seconds() / 3600
+
+
+# ============================================
+# EVENTS
+# ============================================
+def update_post(post_id, changes):
+    """
+    Apply an event to a post: `changes(decayed_at, now)` returns ForumPost.update()
+    kwargs relative to the stored score as of `decayed_at`. Each event decays the
+    score to `now` and moves hot_decayed_at along, so later decay runs never decay
+    the event's weight over time that passed before it. The UPDATE only applies
+    while hot_decayed_at is unchanged; a concurrent event or decay run means retry.
+    """
+    while True:
+        decayed_at = ForumPost.objects.filter(pk=post_id).values_list('hot_decayed_at', flat=True).first()
+        if decayed_at is None:
+            return
+        now = max(timezone.now(), decayed_at)
+        if ForumPost.objects.filter(pk=post_id, hot_decayed_at=decayed_at).update(
+            hot_decayed_at=now, **changes(decayed_at, now)
+        ):
+            return
+
+
+def decayed_hot_score(decayed_at, now):
+    return F('hot_score') * decay_factor(hours_between(decayed_at, now))
+
+
+def like_added(decayed_at, now):
+    """update_post() changes for a new like"""
+    weight = ranking('like_weight')
+    return {
+        'hot_score': decayed_hot_score(decayed_at, now) + weight,
+        'week_score': F('week_score') + weight,
+    }
+
+
+def like_removed(like, decayed_at, now):
+    """update_post() changes taking back what a like still contributes"""
+    weight = ranking('like_weight')
+    remaining = weight * decay_factor(hours_between(like.created_at, now))
+    changes = {'hot_score': Greatest(decayed_hot_score(decayed_at, now) - remaining, Value(0.0))}
+    if like.created_at >= week_start(now):
+        changes['week_score'] = Greatest(F('week_score') - weight, Value(0.0))
+    return changes
+
+
+def comment_added(decayed_at, now):
+    """update_post() changes for a new comment"""
+    weight = ranking('comment_weight')
+    return {
+        'hot_score': decayed_hot_score(decayed_at, now) + weight,
+        'week_score': F('week_score') + weight,
+    }
+
+
+# ============================================
+# BATCH DECAY
+# ============================================
+def weekly_events(model, since):
+    rows = model.objects.filter(post_id=OuterRef('pk'), created_at__gte=since).order_by().values(
+        'post_id'
+    ).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def decay_chunk(rows, now=None):
+    """
+    Decay the hot scores of `rows` [(id, hot_decayed_at)] to `now` and recount their week scores.
+    One UPDATE with a per-row factor; posts an event has brought forward since
+    `rows` was read (hot_decayed_at moved), or past `now`, keep their score and time.
+    """
+    now = now or timezone.now()
+    due = [
+        (Q(id=post_id, hot_decayed_at=decayed_at), decayed_at)
+        for post_id, decayed_at in rows if decayed_at <= now
+    ]
+    factors = [
+        When(condition, then=F('hot_score') * decay_factor(hours_between(decayed_at, now)))
+        for condition, decayed_at in due
+    ]
+    since = week_start(now)
+    ids = [post_id for post_id, _ in rows]
+    ForumPost.objects.filter(id__in=ids).update(
+        hot_score=Case(*factors, default=F('hot_score')),
+        hot_decayed_at=Case(
+            *[When(condition, then=Value(now)) for condition, _ in due], default=F('hot_decayed_at')
+        ),
+        week_score=ExpressionWrapper(
+            weekly_events(Like, since) * ranking('like_weight') +
+            weekly_events(Comment, since) * ranking('comment_weight'),
+            output_field=FloatField(),
+        ),
+    )
+    # Scores too small to matter stop being rewritten every run
+    ForumPost.objects.filter(id__in=ids, hot_score__gt=0, hot_score__lt=MIN_HOT_SCORE).update(hot_score=0)
+
+
+def posts_to_decay():
+    """Posts whose scores can still change: a hot score left, or events inside the week"""
+    return ForumPost.objects.filter(hot_score__gt=0) | ForumPost.objects.filter(week_score__gt=0)
+
+
+# ============================================
+# COMMENT THREADS
+# ============================================
+def top_level_comments(post):
+    return Comment.objects.filter(post=post, parent__isnull=True).select_related('author', 'author__profile')
+
+
+def thread_replies(comment):
+    """Every reply below a comment; ordered by path they read depth-first"""
+    return Comment.objects.filter(
+        post_id=comment.post_id, path__startswith=comment.path, depth__gt=comment.depth
+    ).select_related('author', 'author__profile')
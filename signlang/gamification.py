@@ -3,10 +3,11 @@ Gamification Service for Rhythm of Signs
 Handles badges, points, streaks, and notifications
 """
 from django.utils import timezone
-from django.db.models import Count, Sum
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Sum, F
 from .models import (
     Badge, UserBadge, UserStreak, UserPoints, Notification, DailyActivity,
-    UserProgress, QuizAttempt, SavedLesson, ForumPost, Comment
+    UserProgress, QuizBest, SavedLesson, ForumPost, Comment
 )
 
 
@@ -20,6 +21,7 @@ POINTS = {
     'quiz_perfect': 50,  # 100% score
     'quiz_fail': 5,  # Encouragement points
     'flashcard_session': 10,
+    'flashcard_review': 2,  # Per card rated Good or Easy
     'forum_post': 15,
     'forum_comment': 5,
     'daily_login': 10,
@@ -269,12 +271,18 @@ def award_points(user, amount, source='other'):
 
     old_level = user_points.level
     user_points.add_points(amount, source)
-    new_level = user_points.level
 
     # Track points in daily activity for heatmap
     update_daily_activity(user, 'points', amount)
 
-    # Check for level up
+    check_level_up(user, user_points, old_level)
+
+    return amount
+
+
+def check_level_up(user, user_points, old_level):
+    """Notify the user if their points moved them past old_level"""
+    new_level = user_points.level
     if new_level > old_level:
         create_notification(
             user=user,
@@ -285,8 +293,6 @@ def award_points(user, amount, source='other'):
             color='success'
         )
 
-    return amount
-
 
 # ============================================
 # STREAK SYSTEM
@@ -354,6 +360,25 @@ def update_daily_activity(user, activity_type, value=1):
     return activity
 
 
+def increment_daily_activity(user, **counts):
+    """Add several counters to today's activity in a single write"""
+    counts = {field: value for field, value in counts.items() if value}
+    if not counts:
+        return
+    today = timezone.now().date()
+    updated = DailyActivity.objects.filter(user=user, date=today).update(
+        **{field: F(field) + value for field, value in counts.items()}
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                DailyActivity.objects.create(user=user, date=today, **counts)
+        except IntegrityError:
+            DailyActivity.objects.filter(user=user, date=today).update(
+                **{field: F(field) + value for field, value in counts.items()}
+            )
+
+
 # ============================================
 # BADGE CHECKING
 # ============================================
@@ -407,19 +432,10 @@ def check_all_badges(user):
     ).count()
     check_badges(user, 'lessons_completed', completed_lessons)
 
-    # Count passed quizzes
-    passed_quizzes = QuizAttempt.objects.filter(
-        user=user,
-        passed=True
-    ).count()
-    check_badges(user, 'quizzes_passed', passed_quizzes)
-
-    # Check for perfect quizzes
-    perfect_quizzes = QuizAttempt.objects.filter(
-        user=user,
-        score=100
-    ).count()
-    check_badges(user, 'perfect_quiz', perfect_quizzes)
+    # Count passed and perfect quiz attempts (kept on QuizBest, so compacted attempts still count)
+    quiz_totals = QuizBest.totals_for_user(user)
+    check_badges(user, 'quizzes_passed', quiz_totals['passed'])
+    check_badges(user, 'perfect_quiz', quiz_totals['perfect'])
 
     # Check saved lessons
     saved = SavedLesson.objects.filter(user=user).count()
@@ -493,18 +509,14 @@ def on_quiz_complete(user, quiz_attempt):
         if quiz_attempt.max_score > 0 and quiz_attempt.score == quiz_attempt.max_score:
             # Perfect score (100%)
             award_points(user, POINTS['quiz_perfect'], 'quiz')
-            # Count perfect quizzes where score equals max_score
-            from django.db.models import F
-            perfect_count = QuizAttempt.objects.filter(
-                user=user,
-                score=F('max_score')
-            ).exclude(max_score=0).count()
-            check_badges(user, 'perfect_quiz', perfect_count)
         else:
             award_points(user, POINTS['quiz_pass'], 'quiz')
 
-        passed_count = QuizAttempt.objects.filter(user=user, passed=True).count()
-        check_badges(user, 'quizzes_passed', passed_count)
+        # Attempt counters live on QuizBest, so compacted attempts still count
+        quiz_totals = QuizBest.totals_for_user(user)
+        if quiz_attempt.max_score > 0 and quiz_attempt.score == quiz_attempt.max_score:
+            check_badges(user, 'perfect_quiz', quiz_totals['perfect'])
+        check_badges(user, 'quizzes_passed', quiz_totals['passed'])
     else:
         award_points(user, POINTS['quiz_fail'], 'quiz')
 
@@ -517,6 +529,17 @@ def on_flashcard_session(user, lesson):
     update_daily_activity(user, 'flashcard')
 
 
+def on_flashcard_reviews(user, reviewed, points):
+    """Handle a batch of flashcard ratings with one points write and one activity write"""
+    ensure_user_gamification(user)
+    if points:
+        user_points = user.points
+        old_level = user_points.level
+        user_points.add_points(points, 'lesson')
+        check_level_up(user, user_points, old_level)
+    increment_daily_activity(user, flashcards_reviewed=reviewed, points_earned=points)
+
+
 def on_forum_post(user):
     """Handle forum post creation"""
     ensure_user_gamification(user)
@@ -622,7 +645,7 @@ def get_user_stats(user):
         'badges_earned': UserBadge.objects.filter(user=user).count(),
         'badges_total': Badge.objects.filter(is_active=True).count(),
         'lessons_completed': UserProgress.objects.filter(user=user, status='completed').count(),
-        'quizzes_passed': QuizAttempt.objects.filter(user=user, passed=True).count(),
+        'quizzes_passed': QuizBest.totals_for_user(user)['passed'],
         'rank': get_user_rank(user),
         'recent_badges': UserBadge.objects.filter(user=user).select_related('badge')[:5],
     }
@@ -0,0 +1,196 @@
+"""
+Quiz Grading Service for Signox
+Compiles quizzes into cached, immutable definitions and grades submissions
+against their in-memory answer key, so showing or submitting a quiz costs no
+queries per question
+"""
+from collections import namedtuple
+from . import cache_tags
+
+
+QUIZ_DEFINITION_TIMEOUT = 60 * 60 * 24  # Stale versions are never read again, so this only bounds memory
+
+# Field names match the Question/Answer models so templates work with either
+AnswerDef = namedtuple('AnswerDef', ['id', 'answer_text', 'is_correct', 'explanation'])
+QuestionDef = namedtuple('QuestionDef', [
+    'id', 'question_text', 'question_type', 'image_url', 'video_url', 'points', 'answers',
+])
+
+
+# ============================================
+# COMPILED QUIZ DEFINITIONS
+# ============================================
+class QuizDefinition:
+    """Immutable snapshot of a quiz's questions and answers, plus its answer key"""
+
+    def __init__(self, quiz_id, version, questions):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.questions = tuple(questions)
+        self.key = AnswerKey(self.questions)
+
+    @property
+    def max_score(self):
+        return self.key.max_score
+
+
+def definition_cache_key(quiz):
+    return f'quiz_definition_{quiz.id}_{quiz.definition_version}'
+
+
+def compile_quiz(quiz):
+    """Build a QuizDefinition with two queries (questions, answers)"""
+    questions = []
+    for question in quiz.questions.prefetch_related('answers').order_by('order', 'id'):
+        questions.append(QuestionDef(
+            id=question.id,
+            question_text=question.question_text,
+            question_type=question.question_type,
+            image_url=question.image.url if question.image else None,
+            video_url=question.video.url if question.video else None,
+            points=question.points,
+            answers=tuple(
+                AnswerDef(answer.id, answer.answer_text, answer.is_correct, answer.explanation)
+                for answer in question.answers.all()
+            ),
+        ))
+    return QuizDefinition(quiz.id, quiz.definition_version, questions)
+
+
+def get_quiz_definition(quiz):
+    """
+    Compiled definition for a quiz, cached per (quiz id, definition_version).
+    Any change to the quiz, its questions or answers replaces the version,
+    so cached copies never need to be deleted.
+    """
+    return cache_tags.get_or_compute(
+        definition_cache_key(quiz), lambda: compile_quiz(quiz), QUIZ_DEFINITION_TIMEOUT,
+    )
+
+
+# ============================================
+# GRADING
+# ============================================
+class AnswerKey:
+    """
+    Everything needed to grade a quiz, built once per compiled definition.
+    `map` is {question_id: {answer_id: is_correct}}; the answers are kept
+    alongside for showing results.
+    """
+
+    def __init__(self, questions):
+        self.questions = tuple(questions)
+        self.map = {}
+        self.answers = {}
+        self.correct = {}
+        for question in self.questions:
+            answers = question.answers
+            self.map[question.id] = {answer.id: answer.is_correct for answer in answers}
+            self.answers[question.id] = {answer.id: answer for answer in answers}
+            self.correct[question.id] = next((answer for answer in answers if answer.is_correct), None)
+        self.max_score = sum(question.points for question in self.questions)
+
+    def selections_from_post(self, data):
+        """Read the raw `question_<id>` fields of a submitted quiz form"""
+        return {question.id: data.get(f'question_{question.id}') for question in self.questions}
+
+
+class GradedQuestion:
+    """Outcome for one question (attribute names match the quiz result template)"""
+
+    def __init__(self, question, selected, correct, is_correct):
+        self.question = question
+        self.selected = selected
+        self.correct = correct
+        self.is_correct = is_correct
+
+
+class GradeResult:
+    """Outcome of grading a whole submission"""
+
+    def __init__(self, score, max_score, passing_score, results, selections):
+        self.score = score
+        self.max_score = max_score
+        self.results = results
+        self.selections = selections  # {question_id: answer_id or None}, only valid choices
+        self.percentage = (score / max_score * 100) if max_score > 0 else 0
+        self.passed = self.percentage >= passing_score
+
+    @property
+    def correct_count(self):
+        return sum(1 for result in self.results if result.is_correct)
+
+    @property
+    def answer_ids(self):
+        """Selected answer ids, the compact form stored on QuizAttempt.answers"""
+        return [answer_id for answer_id in self.selections.values() if answer_id is not None]
+
+    @property
+    def responses(self):
+        """(question_id, answer_id or None, is_correct) per question, for QuestionStats.record"""
+        return [
+            (result.question.id, self.selections[result.question.id], result.is_correct)
+            for result in self.results
+        ]
+
+
+def parse_answer_id(value):
+    """Turn a submitted answer id into an int, or None if it is missing or malformed"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade(key, selections, passing_score):
+    """
+    Grade a submission in one pass over the answer key.
+    `selections` maps question id to the submitted answer id (raw form values are fine).
+    An answer that does not belong to its question counts as unanswered.
+    """
+    score = 0
+    results = []
+    valid = {}
+
+    for question in key.questions:
+        answer_id = parse_answer_id(selections.get(question.id))
+        choices = key.map[question.id]
+        if answer_id not in choices:
+            answer_id = None
+
+        is_correct = answer_id is not None and choices[answer_id]
+        if is_correct:
+            score += question.points
+
+        valid[question.id] = answer_id
+        results.append(GradedQuestion(
+            question=question,
+            selected=key.answers[question.id].get(answer_id),
+            correct=key.correct[question.id],
+            is_correct=is_correct,
+        ))
+
+    return GradeResult(score, key.max_score, passing_score, results, valid)
+
+
+# ============================================
+# ITEM ANALYSIS
+# ============================================
+def item_analysis(questions):
+    """
+    Rows for the teacher's quiz page: each question with its QuestionStats
+    (None if nobody answered it yet) and the share of responses per answer.
+    Expects questions with select_related('stats') and prefetched answers (with their 'stats').
+    """
+    rows = []
+    for question in questions:
+        stats = getattr(question, 'stats', None)
+        rows.append({
+            'question': question,
+            'stats': stats,
+            'answers': [{
+                'answer': answer,
+                'percent': round(stats.answer_share(answer) * 100) if stats else 0,
+            } for answer in question.answers.all()],
+        })
+    return rows
@@ -0,0 +1,108 @@
+"""
+Management command to compact quiz attempt history.
+For every (user, quiz) the newest attempts and the best attempt are kept; older
+attempts past the retention age are deleted. Their counts already live on
+QuizBest (attempts, passed_attempts, perfect_attempts), so badges and stats are
+unchanged and quiz pages only ever read a bounded history.
+
+Summaries are walked in primary-key order and each chunk is compacted in its
+own transaction, so the command can be interrupted and re-run safely.
+
+Defaults come from settings.QUIZ_ATTEMPT_RETENTION.
+Should be run periodically via cron job, e.g. weekly:
+0 4 * * 0 cd /path/to/project && python manage.py compact_quiz_attempts
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from signlang.models import QuizAttempt, QuizBest
+
+
+class Command(BaseCommand):
+    help = 'Delete old quiz attempts beyond the retention policy, keeping recent and best attempts'
+
+    def add_arguments(self, parser):
+        retention = getattr(settings, 'QUIZ_ATTEMPT_RETENTION', {})
+        parser.add_argument(
+            '--keep-recent',
+            type=int,
+            default=retention.get('keep_recent', 20),
+            help='Newest attempts kept per user and quiz',
+        )
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=retention.get('keep_days', 90),
+            help='Attempts newer than this many days are always kept',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='User/quiz summaries compacted per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many attempts would be deleted without deleting',
+        )
+
+    def handle(self, *args, **options):
+        keep_recent = options['keep_recent']
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        if keep_recent < 0 or options['keep_days'] < 0:
+            raise CommandError('--keep-recent and --keep-days cannot be negative')
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        # Only summaries with more live attempts than we keep can have anything to delete
+        summaries = QuizBest.objects.annotate(
+            live_attempts=F('attempts') - F('archived_attempts')
+        ).filter(live_attempts__gt=keep_recent).only(
+            'id', 'user_id', 'quiz_id', 'best_attempt_id', 'archived_attempts'
+        ).order_by('id')
+
+        last_id = 0
+        scanned = deleted = 0
+
+        while True:
+            chunk = list(summaries.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+
+            with transaction.atomic():
+                for summary in chunk:
+                    stale = self.stale_attempt_ids(summary, keep_recent, cutoff)
+                    if not stale:
+                        continue
+                    deleted += len(stale)
+                    if dry_run:
+                        continue
+                    QuizAttempt.objects.filter(id__in=stale).delete()
+                    QuizBest.objects.filter(id=summary.id).update(
+                        archived_attempts=F('archived_attempts') + len(stale)
+                    )
+
+            self.stdout.write(f'Processed {scanned} summaries ({deleted} attempts compacted)...')
+
+        verb = 'would be deleted' if dry_run else 'deleted'
+        self.stdout.write(self.style.SUCCESS(f'{deleted} quiz attempts {verb} from {scanned} summaries'))
+
+    def stale_attempt_ids(self, summary, keep_recent, cutoff):
+        """Ids of a user's attempts at one quiz that fall outside the retention policy"""
+        attempts = QuizAttempt.objects.filter(
+            user_id=summary.user_id, quiz_id=summary.quiz_id
+        ).order_by('-started_at', '-id')
+        recent = list(attempts.values_list('id', flat=True)[:keep_recent]) if keep_recent else []
+        stale = attempts.filter(started_at__lt=cutoff).exclude(id__in=recent)
+        if summary.best_attempt_id:
+            stale = stale.exclude(id=summary.best_attempt_id)
+        return list(stale.values_list('id', flat=True))
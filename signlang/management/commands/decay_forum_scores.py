@@ -0,0 +1,64 @@
+"""
+Management command to age the forum feed scores.
+Hot scores halve every settings.FORUM_RANKING['half_life_hours']; this applies
+the decay to every post that still has a score, and recounts week scores as
+likes and comments leave the "top this week" window. Posts whose scores have
+reached 0 are skipped, so each run only touches recently active posts.
+
+Each post remembers when its score was last decayed (likes and comments decay
+it to their own time before adding their weight), so runs may be irregular or
+missed without skewing the ranking.
+
+Should be run periodically via cron job, e.g. hourly:
+15 * * * * cd /path/to/project && python manage.py decay_forum_scores
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from signlang import forum
+
+
+class Command(BaseCommand):
+    help = 'Decay forum hot scores and recount weekly scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Posts updated per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many posts would be updated without updating',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        posts = forum.posts_to_decay().order_by('id')
+        last_id = 0
+        updated = 0
+
+        while True:
+            chunk = list(posts.filter(id__gt=last_id).values_list('id', 'hot_decayed_at')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            updated += len(chunk)
+
+            if not dry_run:
+                # Taken after the read, so no decay time in the chunk is later than it
+                now = timezone.now()
+                with transaction.atomic():
+                    forum.decay_chunk(chunk, now)
+
+            self.stdout.write(f'Processed {updated} posts...')
+
+        verb = 'would be decayed' if dry_run else 'decayed'
+        self.stdout.write(self.style.SUCCESS(f'{updated} forum posts {verb}'))
@@ -0,0 +1,138 @@
+"""
+Management command to export the flashcard review log for analysis.
+Rows are streamed in (reviewed_at, id) order with a keyset cursor and written
+chunk by chunk, so the log is never loaded into memory.
+
+CSV works out of the box; Parquet needs the optional pyarrow package
+(pip install pyarrow) and writes one row group per chunk.
+
+Examples:
+python manage.py export_review_log --output reviews.csv --since 2025-01-01
+python manage.py export_review_log --format parquet --output reviews.parquet
+"""
+import csv
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from signlang.models import ReviewLog
+
+
+COLUMNS = ['id', 'user_id', 'vocabulary_id', 'rating', 'elapsed_days', 'stability', 'reviewed_at']
+
+
+class Command(BaseCommand):
+    help = 'Stream the flashcard review log to a CSV or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write ("-" for stdout, CSV only)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'parquet'],
+            default='csv',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only export reviews on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--until',
+            help='Only export reviews before this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Rows fetched and written per batch',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if options['format'] == 'parquet' and options['output'] == '-':
+            raise CommandError('Parquet export needs an --output file')
+
+        logs = ReviewLog.objects.all()
+        if options['since']:
+            logs = logs.filter(reviewed_at__gte=self.parse_day(options['since'], '--since'))
+        if options['until']:
+            logs = logs.filter(reviewed_at__lt=self.parse_day(options['until'], '--until'))
+
+        if options['format'] == 'parquet':
+            total = self.write_parquet(logs, options)
+        else:
+            total = self.write_csv(logs, options)
+
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f'Exported {total} reviews to {options["output"]}'))
+
+    def parse_day(self, value, option):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'{option} must be a date (YYYY-MM-DD)')
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def chunks(self, logs, chunk_size):
+        """Yield lists of value tuples in (reviewed_at, id) order"""
+        rows = logs.order_by('reviewed_at', 'id').values_list(*COLUMNS)
+        cursor = None
+        while True:
+            page = rows
+            if cursor:
+                page = rows.filter(
+                    Q(reviewed_at__gt=cursor[0]) | Q(reviewed_at=cursor[0], id__gt=cursor[1])
+                )
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            cursor = (chunk[-1][-1], chunk[-1][0])
+
+    def write_csv(self, logs, options):
+        output = options['output']
+        handle = self.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+        total = 0
+        try:
+            writer = csv.writer(handle)
+            writer.writerow(COLUMNS)
+            for chunk in self.chunks(logs, options['chunk_size']):
+                writer.writerows(
+                    row[:-1] + (row[-1].isoformat(),) for row in chunk
+                )
+                total += len(chunk)
+        finally:
+            if handle is not self.stdout:
+                handle.close()
+        return total
+
+    def write_parquet(self, logs, options):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise CommandError('Parquet export requires pyarrow (pip install pyarrow)')
+
+        schema = pa.schema([
+            ('id', pa.int64()),
+            ('user_id', pa.int64()),
+            ('vocabulary_id', pa.int64()),
+            ('rating', pa.int8()),
+            ('elapsed_days', pa.int32()),
+            ('stability', pa.float32()),
+            ('reviewed_at', pa.timestamp('us', tz='UTC')),
+        ])
+        total = 0
+        with pq.ParquetWriter(options['output'], schema) as writer:
+            for chunk in self.chunks(logs, options['chunk_size']):
+                columns = list(zip(*chunk))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                total += len(chunk)
+        return total
@@ -0,0 +1,149 @@
+"""
+Management command to fit a per-user FSRS stability scale from the review log.
+Only that one multiplier is fitted; the FSRS weights stay at their defaults.
+Every logged rating of a card with a memory state is a sample: the model predicts
+recall from the days elapsed and the stability at that time, and the rating says
+whether the sign was recalled ("Again" = forgotten).
+
+Users are processed in batches; each batch is optimised together with NumPy
+(fixed number of gradient steps), so run time grows linearly with the number
+of reviews and memory stays bounded by the batch size.
+
+Should be run periodically via cron job, e.g. nightly:
+0 3 * * * cd /path/to/project && python manage.py optimize_scheduler
+"""
+from datetime import timedelta
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from signlang import cache_tags, scheduling
+from signlang.models import ReviewLog, SchedulerParams
+
+
+class Command(BaseCommand):
+    help = 'Fit per-user FSRS stability scales from the flashcard review log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-users',
+            type=int,
+            default=2000,
+            help='Users optimised together per batch',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=100,
+            help='Gradient steps per batch',
+        )
+        parser.add_argument(
+            '--learning-rate',
+            type=float,
+            default=0.5,
+        )
+        parser.add_argument(
+            '--min-samples',
+            type=int,
+            default=20,
+            help='Minimum reviews a user needs before their parameters are fitted',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only learn from reviews in the last N days',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only fit this user id',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Fit and report without saving',
+        )
+
+    def handle(self, *args, **options):
+        batch_users = options['batch_users']
+        if batch_users < 1 or options['iterations'] < 1:
+            raise CommandError('--batch-users and --iterations must be at least 1')
+
+        reviews = ReviewLog.objects.filter(stability__gt=0)
+        if options['days']:
+            reviews = reviews.filter(reviewed_at__gte=timezone.now() - timedelta(days=options['days']))
+        if options['user']:
+            reviews = reviews.filter(user_id=options['user'])
+
+        last_user = 0
+        fitted = skipped = 0
+
+        while True:
+            user_ids = list(
+                reviews.filter(user_id__gt=last_user)
+                .order_by('user_id').values_list('user_id', flat=True).distinct()[:batch_users]
+            )
+            if not user_ids:
+                break
+            last_user = user_ids[-1]
+
+            scales, counts = self.fit_batch(reviews, user_ids, options)
+            eligible = [
+                (user_id, scale, count)
+                for user_id, scale, count in zip(user_ids, scales, counts)
+                if count >= options['min_samples']
+            ]
+            skipped += len(user_ids) - len(eligible)
+            fitted += len(eligible)
+
+            if eligible and not options['dry_run']:
+                self.save_batch(eligible)
+            self.stdout.write(f'Fitted {fitted} users ({skipped} with too little history)...')
+
+        verb = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(f'Scheduler parameters {verb} for {fitted} users'))
+
+    def fit_batch(self, reviews, user_ids, options):
+        """Fit scales for one batch of users; returns (scales, sample counts) aligned with user_ids"""
+        index = {user_id: i for i, user_id in enumerate(user_ids)}
+        rows = reviews.filter(user_id__in=user_ids).values_list(
+            'user_id', 'elapsed_days', 'stability', 'rating'
+        )
+        data = np.array([
+            (index[user_id], elapsed, stability, rating > 1)
+            for user_id, elapsed, stability, rating in rows.iterator(chunk_size=5000)
+        ], dtype=np.float64).reshape(-1, 4)
+
+        user_index = data[:, 0].astype(np.int64)
+        trials = np.ones(len(data))
+        scales = scheduling.fit_stability_scales(
+            user_index, data[:, 1], data[:, 2], trials, data[:, 3],
+            user_count=len(user_ids),
+            iterations=options['iterations'],
+            learning_rate=options['learning_rate'],
+        )
+        counts = np.bincount(user_index, minlength=len(user_ids))
+        return scales, counts
+
+    def save_batch(self, eligible):
+        """Upsert fitted parameters for a batch of users"""
+        now = timezone.now()
+        existing = {
+            params.user_id: params
+            for params in SchedulerParams.objects.filter(user_id__in=[row[0] for row in eligible])
+        }
+        updated, created = [], []
+        for user_id, scale, count in eligible:
+            params = existing.get(user_id) or SchedulerParams(user_id=user_id)
+            params.stability_scale = round(float(scale), 4)
+            params.sample_count = int(count)
+            params.fitted_at = now
+            (updated if params.pk else created).append(params)
+
+        with transaction.atomic():
+            SchedulerParams.objects.bulk_update(
+                updated, ['stability_scale', 'sample_count', 'fitted_at'], batch_size=500
+            )
+            SchedulerParams.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+        # Bulk writes send no signals; drop the cached parameters (SchedulerParams.for_user) here
+        cache_tags.invalidate(cache_tags.model_tag(SchedulerParams))
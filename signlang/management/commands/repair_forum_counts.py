@@ -0,0 +1,99 @@
+"""
+Management command to reconcile the denormalised forum counters.
+ForumPost.like_count and comment_count move with F() updates when users like,
+unlike and comment; rows removed another way (Django admin, deleted accounts)
+leave them too high. Comment.reply_count (all descendants) is recounted as
+well. This checks posts in primary-key chunks and rewrites only the counters
+that drifted.
+
+Should be run periodically via cron job, e.g. nightly:
+0 3 * * * cd /path/to/project && python manage.py repair_forum_counts
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from signlang.models import Comment, ForumPost, Like
+
+
+def counted_replies():
+    """Subquery counting the replies below a comment (its descendants by path)"""
+    rows = Comment.objects.filter(
+        post_id=OuterRef('post_id'), path__startswith=OuterRef('path'), depth__gt=OuterRef('depth')
+    ).order_by().values('post_id').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def counted(model):
+    """Subquery counting a post's rows in `model`"""
+    rows = model.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id').annotate(
+        total=Count('id')
+    ).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recount forum post likes, comments and replies and fix counters that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Posts checked per batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counters without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        posts = ForumPost.objects.order_by('id')
+        last_id = 0
+        scanned = repaired = repaired_comments = 0
+
+        while True:
+            ids = list(posts.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            scanned += len(ids)
+
+            drifted = list(ForumPost.objects.filter(id__in=ids).annotate(
+                actual_likes=counted(Like),
+                actual_comments=counted(Comment),
+            ).filter(
+                ~Q(like_count=F('actual_likes')) | ~Q(comment_count=F('actual_comments'))
+            ).values_list('id', flat=True))
+            repaired += len(drifted)
+
+            if drifted and not dry_run:
+                # Recount inside the UPDATE so likes arriving meanwhile are not lost
+                ForumPost.objects.filter(id__in=drifted).update(
+                    like_count=counted(Like), comment_count=counted(Comment)
+                )
+
+            drifted_comments = list(Comment.objects.filter(post_id__in=ids).annotate(
+                actual_replies=counted_replies(),
+            ).exclude(reply_count=F('actual_replies')).values_list('id', 'reply_count', 'actual_replies'))
+            repaired_comments += len(drifted_comments)
+
+            if not dry_run:
+                for comment_id, reply_count, actual in drifted_comments:
+                    # Skipped if a reply arrived meanwhile; the next run checks it again
+                    Comment.objects.filter(id=comment_id, reply_count=reply_count).update(reply_count=actual)
+
+            self.stdout.write(
+                f'Checked {scanned} posts ({repaired} posts, {repaired_comments} comments drifted)...'
+            )
+
+        verb = 'would be repaired' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{repaired} of {scanned} forum posts and {repaired_comments} comments {verb}'
+        ))
@@ -0,0 +1,139 @@
+"""
+Management command to recompute flashcard review schedules in bulk.
+Reviews are streamed in primary-key order, recomputed with the vectorised
+scheduler and written back with bulk_update, one chunk at a time.
+
+Examples:
+python manage.py reschedule_reviews --shift-days 3          # after a 3 day outage
+python manage.py reschedule_reviews --interval-scale 0.8    # after tightening intervals
+python manage.py reschedule_reviews --max-interval 180 --dry-run
+"""
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from signlang import scheduling
+from signlang.models import VocabularyReview
+
+
+class Command(BaseCommand):
+    help = 'Recompute ease factors, intervals and due dates for flashcard reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shift-days',
+            type=int,
+            default=0,
+            help='Move every due date by this many days',
+        )
+        parser.add_argument(
+            '--interval-scale',
+            type=float,
+            default=1.0,
+            help='Multiply current intervals and recompute due dates from the last review',
+        )
+        parser.add_argument(
+            '--max-interval',
+            type=int,
+            help='Cap intervals (in days) and recompute due dates from the last review',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only reschedule reviews of this user id',
+        )
+        parser.add_argument(
+            '--lesson',
+            type=int,
+            help='Only reschedule reviews of vocabulary in this lesson id',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows read and written per batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would change without writing',
+        )
+
+    def handle(self, *args, **options):
+        shift_days = options['shift_days']
+        interval_scale = options['interval_scale']
+        max_interval = options['max_interval']
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        if interval_scale <= 0:
+            raise CommandError('--interval-scale must be positive')
+        if max_interval is not None and max_interval < 1:
+            raise CommandError('--max-interval must be at least 1')
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        recompute = interval_scale != 1.0 or max_interval is not None
+        if not recompute and not shift_days:
+            self.stdout.write(self.style.WARNING(
+                'Nothing to do. Use --shift-days, --interval-scale or --max-interval'
+            ))
+            return
+
+        reviews = VocabularyReview.objects.filter(total_reviews__gt=0)
+        if options['user']:
+            reviews = reviews.filter(user_id=options['user'])
+        if options['lesson']:
+            reviews = reviews.filter(vocabulary__lesson_id=options['lesson'])
+        reviews = reviews.only(
+            'id', 'ease_factor', 'interval', 'next_review', 'last_reviewed'
+        ).order_by('id')
+
+        today = timezone.now().date()
+        last_id = 0
+        scanned = changed = 0
+
+        while True:
+            chunk = list(reviews.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+
+            ease = np.array([review.ease_factor for review in chunk], dtype=np.float64)
+            interval = np.array([review.interval for review in chunk], dtype=np.int64)
+
+            if recompute:
+                ease, interval = scheduling.rescale(
+                    ease, interval, interval_scale=interval_scale, max_interval=max_interval
+                )
+                base = [
+                    review.last_reviewed.date() if review.last_reviewed else today
+                    for review in chunk
+                ]
+                next_review = scheduling.due_dates(base, interval, shift_days)
+            else:
+                base = [review.next_review or today for review in chunk]
+                next_review = scheduling.due_dates(base, 0, shift_days)
+
+            updated = []
+            for review, new_ease, new_interval, new_due in zip(chunk, ease, interval, next_review):
+                new_ease, new_interval = float(new_ease), int(new_interval)
+                if (review.ease_factor, review.interval, review.next_review) == (new_ease, new_interval, new_due):
+                    continue
+                review.ease_factor = new_ease
+                review.interval = new_interval
+                review.next_review = new_due
+                updated.append(review)
+
+            changed += len(updated)
+            if updated and not dry_run:
+                with transaction.atomic():
+                    VocabularyReview.objects.bulk_update(
+                        updated, ['ease_factor', 'interval', 'next_review'], batch_size=chunk_size
+                    )
+
+            self.stdout.write(f'Processed {scanned} reviews ({changed} changed)...')
+
+        verb = 'would change' if dry_run else 'rescheduled'
+        self.stdout.write(self.style.SUCCESS(f'{scanned} reviews scanned, {changed} {verb}'))
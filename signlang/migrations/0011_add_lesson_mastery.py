@@ -0,0 +1,88 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_mastery(apps, schema_editor):
+    """Store mastery on existing review rows and build the per-lesson rollups"""
+    VocabularyReview = apps.get_model('signlang', 'VocabularyReview')
+    LessonMastery = apps.get_model('signlang', 'LessonMastery')
+
+    batch = []
+    for review in VocabularyReview.objects.filter(total_reviews__gt=0).iterator(chunk_size=1000):
+        correct_rate = (review.correct_reviews / review.total_reviews) * 100
+        rep_bonus = min(20, review.repetitions * 5)
+        review.mastery = min(100, int(correct_rate * 0.8 + rep_bonus))
+        batch.append(review)
+        if len(batch) >= 1000:
+            VocabularyReview.objects.bulk_update(batch, ['mastery'])
+            batch = []
+    if batch:
+        VocabularyReview.objects.bulk_update(batch, ['mastery'])
+
+    totals = VocabularyReview.objects.values('user_id', 'vocabulary__lesson_id').annotate(
+        mastery_sum=Sum('mastery'),
+        card_count=Count('id'),
+        reviewed_count=Count('id', filter=Q(total_reviews__gt=0)),
+    ).order_by()
+    LessonMastery.objects.bulk_create([
+        LessonMastery(
+            user_id=row['user_id'],
+            lesson_id=row['vocabulary__lesson_id'],
+            mastery_sum=row['mastery_sum'] or 0,
+            card_count=row['card_count'],
+            reviewed_count=row['reviewed_count'],
+        )
+        for row in totals
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0010_add_is_teacher_field'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mastery_sum', models.IntegerField(default=0)),
+                ('card_count', models.IntegerField(default=0)),
+                ('reviewed_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Lesson Mastery',
+            },
+        ),
+        migrations.AddField(
+            model_name='vocabularyreview',
+            name='mastery',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='vocabularyreview',
+            index=models.Index(fields=['vocabulary', 'total_reviews', 'mastery'], name='vocab_review_difficulty_idx'),
+        ),
+        migrations.AddField(
+            model_name='lessonmastery',
+            name='lesson',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_mastery', to='signlang.lesson'),
+        ),
+        migrations.AddField(
+            model_name='lessonmastery',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_mastery', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lessonmastery',
+            unique_together={('user', 'lesson')},
+        ),
+        migrations.RunPython(backfill_mastery, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_next_review(apps, schema_editor):
+    """Give unscheduled reviews a date so the due-card index covers them"""
+    VocabularyReview = apps.get_model('signlang', 'VocabularyReview')
+    VocabularyReview.objects.filter(next_review__isnull=True).update(next_review=timezone.now().date())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0011_add_lesson_mastery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_next_review, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vocabularyreview',
+            index=models.Index(fields=['user', 'next_review', 'id'], name='vocab_review_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vocabularyreview',
+            index=models.Index(fields=['user', 'total_reviews', 'id'], name='vocab_review_new_idx'),
+        ),
+    ]
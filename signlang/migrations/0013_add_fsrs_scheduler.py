@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_memory_state(apps, schema_editor):
+    """
+    Give cards reviewed under SM-2 a starting memory state: their current interval
+    approximates the days until recall drops to 90%, and difficulty starts mid-scale.
+    """
+    VocabularyReview = apps.get_model('signlang', 'VocabularyReview')
+    reviewed = VocabularyReview.objects.filter(total_reviews__gt=0)
+    reviewed.filter(interval__gt=0).update(stability=F('interval'), difficulty=5.0)
+    reviewed.filter(interval__lte=0).update(stability=0.5, difficulty=5.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0012_add_review_queue_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vocabularyreview',
+            name='difficulty',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vocabularyreview',
+            name='stability',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SchedulerParams',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheduler', models.CharField(blank=True, choices=[('sm2', 'SM-2'), ('fsrs', 'FSRS')], help_text='Leave blank to use the site default (FLASHCARD_SCHEDULER)', max_length=10)),
+                ('stability_scale', models.FloatField(default=1.0)),
+                ('desired_retention', models.FloatField(default=0.9)),
+                ('sample_count', models.IntegerField(default=0)),
+                ('fitted_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scheduler_params', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Scheduler params',
+            },
+        ),
+        migrations.RunPython(seed_memory_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0013_add_fsrs_scheduler'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(choices=[(1, 'Again'), (2, 'Hard'), (3, 'Good'), (4, 'Easy')])),
+                ('elapsed_days', models.IntegerField(default=0)),
+                ('stability', models.FloatField(default=0)),
+                ('reviewed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to=settings.AUTH_USER_MODEL)),
+                ('vocabulary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to='signlang.vocabulary')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reviewed_at', 'id'], name='review_log_time_idx'), models.Index(fields=['user', 'reviewed_at'], name='review_log_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0014_add_review_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='definition_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+
+
+def backfill_quiz_bests(apps, schema_editor):
+    """Summarise existing attempts per (user, quiz)"""
+    QuizAttempt = apps.get_model('signlang', 'QuizAttempt')
+    QuizBest = apps.get_model('signlang', 'QuizBest')
+
+    best = QuizAttempt.objects.filter(
+        user_id=OuterRef('user_id'), quiz_id=OuterRef('quiz_id')
+    ).order_by('-score', 'id')
+    groups = QuizAttempt.objects.values('user_id', 'quiz_id').annotate(
+        attempt_count=Count('id'),
+        passed_count=Count('id', filter=Q(passed=True)),
+        last_at=Max('started_at'),
+        best_id=Subquery(best.values('id')[:1]),
+        best_score=Subquery(best.values('score')[:1]),
+        best_max_score=Subquery(best.values('max_score')[:1]),
+    ).order_by()
+
+    batch = []
+    for row in groups.iterator(chunk_size=2000):
+        batch.append(QuizBest(
+            user_id=row['user_id'],
+            quiz_id=row['quiz_id'],
+            best_attempt_id=row['best_id'],
+            best_score=row['best_score'],
+            max_score=row['best_max_score'],
+            attempts=row['attempt_count'],
+            passed=row['passed_count'] > 0,
+            last_attempt_at=row['last_at'],
+        ))
+        if len(batch) >= 1000:
+            QuizBest.objects.bulk_create(batch)
+            batch = []
+    QuizBest.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0015_add_quiz_definition_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizBest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_score', models.IntegerField(default=0)),
+                ('max_score', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('passed', models.BooleanField(default=False)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'quiz', '-started_at'], name='quiz_attempt_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='quizbest',
+            name='best_attempt',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='signlang.quizattempt'),
+        ),
+        migrations.AddField(
+            model_name='quizbest',
+            name='quiz',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_bests', to='signlang.quiz'),
+        ),
+        migrations.AddField(
+            model_name='quizbest',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_bests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizbest',
+            unique_together={('user', 'quiz')},
+        ),
+        migrations.RunPython(backfill_quiz_bests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:57
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_attempt_counters(apps, schema_editor):
+    """Count passed and perfect attempts per (user, quiz) from the existing history"""
+    QuizAttempt = apps.get_model('signlang', 'QuizAttempt')
+    QuizBest = apps.get_model('signlang', 'QuizBest')
+
+    def count_of(condition):
+        attempts = QuizAttempt.objects.filter(
+            condition, user_id=OuterRef('user_id'), quiz_id=OuterRef('quiz_id')
+        ).order_by().values('user_id').annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(attempts), 0)
+
+    QuizBest.objects.update(
+        passed_attempts=count_of(Q(passed=True)),
+        perfect_attempts=count_of(Q(score=F('max_score'), max_score__gt=0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0018_add_question_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizbest',
+            name='archived_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizbest',
+            name='passed_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quizbest',
+            name='perfect_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_attempt_counters, migrations.RunPython.noop),
+    ]
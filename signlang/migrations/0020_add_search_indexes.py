@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:01
+
+from django.db import migrations
+
+
+SEARCH_CONFIG = 'signox_unaccent'  # Must match PostgresBackend.config in signlang/search.py
+
+# (model, index name, [(field, tsvector weight)]) - must match SEARCH_TYPES in signlang/search.py
+SEARCH_INDEXES = [
+    ('Lesson', 'lesson_search_gin', [('title', 'A'), ('description', 'B'), ('content', 'C')]),
+    ('Video', 'video_search_gin', [('title', 'A'), ('description', 'B')]),
+    ('Vocabulary', 'vocabulary_search_gin', [('word', 'A'), ('meaning', 'A'), ('description', 'B')]),
+    ('ForumPost', 'forumpost_search_gin', [('title', 'A'), ('content', 'B')]),
+]
+
+
+def search_index(name, fields):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for field, weight in fields:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return GinIndex(vector, name=name)
+
+
+def add_search_indexes(apps, schema_editor):
+    """
+    GIN indexes on the search tsvector expressions (PostgreSQL only). The text search
+    configuration strips accents before indexing ("chào" is indexed as "chao"), so
+    unaccented queries match like the in-memory backend.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    schema_editor.execute(f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {SEARCH_CONFIG}')
+    schema_editor.execute(f'CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = simple)')
+    schema_editor.execute(
+        f'ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} '
+        'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple'
+    )
+    for model_name, name, fields in SEARCH_INDEXES:
+        schema_editor.add_index(apps.get_model('signlang', model_name), search_index(name, fields))
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, name, fields in SEARCH_INDEXES:
+        schema_editor.remove_index(apps.get_model('signlang', model_name), search_index(name, fields))
+    schema_editor.execute(f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {SEARCH_CONFIG}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0019_add_quiz_attempt_retention'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:06
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Frozen copy of signlang.utils.dictionary_letter as of this migration
+TONE_MARKS = {'\u0300', '\u0301', '\u0303', '\u0309', '\u0323'}
+
+
+def dictionary_letter(word):
+    """First letter of a word without tone marks, or "#" if it does not start with one"""
+    word = unicodedata.normalize('NFC', (word or '').strip())
+    if not word or not word[0].isalpha():
+        return '#'
+    base = ''.join(
+        char for char in unicodedata.normalize('NFD', word[0]) if char not in TONE_MARKS
+    )
+    return unicodedata.normalize('NFC', base).upper()[:1]
+
+
+def backfill_letters(apps, schema_editor):
+    """Bucket existing vocabulary by first letter, in primary-key chunks"""
+    Vocabulary = apps.get_model('signlang', 'Vocabulary')
+    last_id = 0
+    while True:
+        chunk = list(Vocabulary.objects.filter(id__gt=last_id).order_by('id').only('id', 'word')[:2000])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for vocab in chunk:
+            vocab.letter = dictionary_letter(vocab.word)
+        Vocabulary.objects.bulk_update(chunk, ['letter'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0020_add_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vocabulary',
+            name='letter',
+            field=models.CharField(default='#', editable=False, max_length=1),
+        ),
+        migrations.RunPython(backfill_letters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:08
+
+import re
+
+from django.db import migrations, models
+from unidecode import unidecode
+
+
+TRIGRAM_INDEXES = [
+    ('vocabulary_word_trgm', 'word_normalized'),
+    ('vocabulary_meaning_trgm', 'meaning_normalized'),
+]
+
+
+def normalize_text(text, max_length):
+    """Frozen copy of signlang.utils.normalize_text as of this migration"""
+    normalized = ' '.join(re.findall(r'[a-z0-9]+', unidecode(text or '').lower()))
+    return normalized[:max_length]
+
+
+def backfill_normalized(apps, schema_editor):
+    """Fill the normalised shadow columns of existing vocabulary, in primary-key chunks"""
+    Vocabulary = apps.get_model('signlang', 'Vocabulary')
+    last_id = 0
+    while True:
+        chunk = list(
+            Vocabulary.objects.filter(id__gt=last_id).order_by('id').only('id', 'word', 'meaning')[:2000]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for vocab in chunk:
+            vocab.word_normalized = normalize_text(vocab.word, max_length=100)
+            vocab.meaning_normalized = normalize_text(vocab.meaning, max_length=200)
+        Vocabulary.objects.bulk_update(chunk, ['word_normalized', 'meaning_normalized'])
+
+
+def trigram_index(name, field):
+    from django.contrib.postgres.indexes import GinIndex
+    return GinIndex(fields=[field], name=name, opclasses=['gin_trgm_ops'])
+
+
+def add_trigram_indexes(apps, schema_editor):
+    """pg_trgm GIN indexes for fuzzy lookup (PostgreSQL only; other databases use the in-process index)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    Vocabulary = apps.get_model('signlang', 'Vocabulary')
+    for name, field in TRIGRAM_INDEXES:
+        schema_editor.add_index(Vocabulary, trigram_index(name, field))
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Vocabulary = apps.get_model('signlang', 'Vocabulary')
+    for name, field in TRIGRAM_INDEXES:
+        schema_editor.remove_index(Vocabulary, trigram_index(name, field))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0021_add_vocabulary_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vocabulary',
+            name='meaning_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='vocabulary',
+            name='word_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_normalized, migrations.RunPython.noop),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+        migrations.AddIndex(
+            model_name='vocabulary',
+            index=models.Index(fields=['letter', 'word_normalized', 'id'], name='vocabulary_letter_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_post_counters(apps, schema_editor):
+    """Count existing likes and comments per post"""
+    ForumPost = apps.get_model('signlang', 'ForumPost')
+    Like = apps.get_model('signlang', 'Like')
+    Comment = apps.get_model('signlang', 'Comment')
+
+    def count_of(model):
+        rows = model.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id').annotate(
+            total=Count('id')
+        ).values('total')
+        return Coalesce(Subquery(rows), 0)
+
+    ForumPost.objects.update(like_count=count_of(Like), comment_count=count_of(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0023_add_list_cursor_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_post_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['is_pinned', 'created_at', 'id'], name='forumpost_list_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:18
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of the signlang.forum ranking defaults as of this migration
+RANKING_DEFAULTS = {
+    'like_weight': 1.0,
+    'comment_weight': 2.0,
+    'new_post_weight': 3.0,
+    'half_life_hours': 12.0,
+    'week_days': 7,
+}
+MIN_HOT_SCORE = 0.01
+
+
+def ranking(name):
+    return getattr(settings, 'FORUM_RANKING', {}).get(name, RANKING_DEFAULTS[name])
+
+
+def backfill_scores(apps, schema_editor):
+    """Score existing posts from their like and comment history, in primary-key chunks"""
+    ForumPost = apps.get_model('signlang', 'ForumPost')
+    Like = apps.get_model('signlang', 'Like')
+    Comment = apps.get_model('signlang', 'Comment')
+    now = django.utils.timezone.now()
+    since = now - timedelta(days=ranking('week_days'))
+
+    def contribution(created_at, weight):
+        hours = max((now - created_at).total_seconds() / 3600, 0)
+        hot = weight * 0.5 ** (hours / ranking('half_life_hours'))
+        return hot, weight if created_at >= since else 0
+
+    last_id = 0
+    while True:
+        chunk = list(ForumPost.objects.filter(id__gt=last_id).order_by('id').only('id', 'created_at')[:1000])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        posts = {post.id: post for post in chunk}
+        for post in chunk:
+            # Recency only feeds the hot score
+            post.hot_score = contribution(post.created_at, ranking('new_post_weight'))[0]
+            post.week_score = 0
+            post.hot_decayed_at = now
+        for model, weight in [(Like, ranking('like_weight')), (Comment, ranking('comment_weight'))]:
+            for post_id, created_at in model.objects.filter(post_id__in=posts).values_list('post_id', 'created_at'):
+                hot, week = contribution(created_at, weight)
+                posts[post_id].hot_score += hot
+                posts[post_id].week_score += week
+        for post in chunk:
+            if post.hot_score < MIN_HOT_SCORE:
+                post.hot_score = 0
+        ForumPost.objects.bulk_update(chunk, ['hot_score', 'hot_decayed_at', 'week_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0024_add_forum_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='hot_decayed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='week_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['hot_score', 'id'], name='forumpost_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['week_score', 'id'], name='forumpost_week_idx'),
+        ),
+    ]
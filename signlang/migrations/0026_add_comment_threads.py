@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    """Existing comments are all top-level: their path is their own id"""
+    Comment = apps.get_model('signlang', 'Comment')
+    last_id = 0
+    while True:
+        chunk = list(Comment.objects.filter(id__gt=last_id).order_by('id').only('id')[:2000])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for comment in chunk:
+            comment.path = f'{comment.id:010d}/'
+        Comment.objects.bulk_update(chunk, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0025_add_forum_ranking_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='signlang.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+    ]
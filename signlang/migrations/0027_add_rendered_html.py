@@ -0,0 +1,91 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:22
+
+import bleach
+import markdown
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaks_filter
+
+
+# Frozen copy of the signlang.rendering settings as of this migration
+ALLOWED_TAGS = [
+    'p', 'br', 'strong', 'em', 'u', 's', 'code', 'pre', 'blockquote',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'li',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+    'a', 'img',
+    'hr', 'div', 'span',
+]
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan'],
+}
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.tables',
+    'markdown.extensions.nl2br',
+    'markdown.extensions.sane_lists',
+]
+
+
+def render_markdown(text):
+    if not text:
+        return ''
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def render_text(text):
+    if not text:
+        return ''
+    return str(linebreaks_filter(text, autoescape=True))
+
+
+# (model, source field, rendered field, renderer)
+RENDERED_FIELDS = [
+    ('Lesson', 'content', 'content_html', render_markdown),
+    ('Video', 'description', 'description_html', render_markdown),
+    ('ForumPost', 'content', 'content_html', render_text),
+]
+
+
+def backfill_html(apps, schema_editor):
+    """Render existing content into the new columns, in primary-key chunks"""
+    for model_name, source, target, render in RENDERED_FIELDS:
+        model = apps.get_model('signlang', model_name)
+        last_id = 0
+        while True:
+            chunk = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', source)[:500])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            for obj in chunk:
+                setattr(obj, target, render(getattr(obj, source)))
+            model.objects.bulk_update(chunk, [target])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0026_add_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_html, migrations.RunPython.noop),
+    ]
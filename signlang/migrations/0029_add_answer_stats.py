@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0028_add_index_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerStats',
+            fields=[
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='signlang.answer')),
+                ('picks', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Answer stats',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0029_add_answer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexversion',
+            name='pruned_through',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='IndexChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'id'], name='index_change_key_id')],
+            },
+        ),
+    ]
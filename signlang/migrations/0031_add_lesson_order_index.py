@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signlang', '0030_add_index_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['category', 'order', 'id'], name='lesson_category_order_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
+import secrets
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Sum, Count, Avg
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from . import cache_tags, rendering, scheduling
+from .utils import dictionary_letter, normalize_text, OTHER_LETTER
 
 
 # ============================================
@@ -75,6 +79,7 @@ class Lesson(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='lessons')
     description = models.TextField()
     content = models.TextField()
+    content_html = models.TextField(blank=True, editable=False)  # Rendered from content (render_content_html)
     video_url = models.URLField(blank=True)
     thumbnail = models.ImageField(upload_to='lessons/thumbnails/', blank=True, null=True)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_LEVELS, default='easy', db_index=True)
@@ -85,10 +90,21 @@ class Lesson(models.Model):
 
     class Meta:
         ordering = ['category', 'order', 'created_at']
+        indexes = [
+            # Lessons of a category in catalogue order, paginated by keyset
+            models.Index(fields=['category', 'order', 'id'], name='lesson_category_order_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            # render_content_html refreshes content_html before the write
+            kwargs['update_fields'] = {*update_fields, 'content_html'}
+        super().save(*args, **kwargs)
+
 
 class Vocabulary(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='vocabularies')
@@ -98,14 +114,36 @@ class Vocabulary(models.Model):
     image = models.ImageField(upload_to='vocabulary/images/', blank=True, null=True)
     video = models.FileField(upload_to='vocabulary/videos/', blank=True, null=True)
     order = models.IntegerField(default=0)
+    letter = models.CharField(max_length=1, default=OTHER_LETTER, editable=False)  # Dictionary bucket of word
+    # Accent-folded, lowercased copies for diacritic-insensitive lookup ("xin chao" finds "Xin chào")
+    word_normalized = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
+    meaning_normalized = models.CharField(max_length=200, blank=True, db_index=True, editable=False)
 
     class Meta:
         verbose_name_plural = "Vocabularies"
         ordering = ['order']
+        indexes = [
+            # Keyset paging through one dictionary letter
+            models.Index(fields=['letter', 'word_normalized', 'id'], name='vocabulary_letter_idx'),
+        ]
 
     def __str__(self):
         return self.word
 
+    def save(self, *args, **kwargs):
+        self.letter = dictionary_letter(self.word)
+        self.word_normalized = normalize_text(self.word, max_length=100)
+        self.meaning_normalized = normalize_text(self.meaning, max_length=200)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = set()
+            if 'word' in update_fields:
+                derived |= {'letter', 'word_normalized'}
+            if 'meaning' in update_fields:
+                derived.add('meaning_normalized')
+            kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
 
 class UserProgress(models.Model):
     STATUS_CHOICES = [
@@ -149,6 +187,9 @@ class Quiz(models.Model):
     passing_score = models.IntegerField(default=70)
     time_limit = models.IntegerField(default=0)  # 0 = no limit, otherwise in minutes
     is_active = models.BooleanField(default=True)
+    # Random token replaced whenever the quiz, its questions or answers change;
+    # part of the cache key of the compiled definition (see grading.get_quiz_definition)
+    definition_version = models.BigIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name_plural = "Quizzes"
@@ -156,6 +197,15 @@ class Quiz(models.Model):
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def bump_definition_version(**filters):
+        """
+        Invalidate cached definitions of the matching quizzes.
+        A fresh random token (not a counter) is used, so an admin form saving a
+        stale copy of the quiz can never bring back an old cache key.
+        """
+        Quiz.objects.filter(**filters).update(definition_version=secrets.randbits(62))
+
 
 class Question(models.Model):
     QUESTION_TYPES = [
@@ -196,11 +246,301 @@ class QuizAttempt(models.Model):
     passed = models.BooleanField(default=False)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    # Selected answer ids (each identifies its question); unanswered questions are left out
+    answers = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # A user's recent attempts at a quiz
+            models.Index(fields=['user', 'quiz', '-started_at'], name='quiz_attempt_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title} ({self.score}/{self.max_score})"
 
 
+class QuizSession(models.Model):
+    """
+    An in-progress quiz: server-side deadline plus answers autosaved as the
+    student works. Finishing it grades the saved answers and links the attempt.
+    """
+    GRACE_SECONDS = 30  # Allowance for network latency when checking the deadline
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_sessions')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='sessions')
+    answers = models.JSONField(default=dict, blank=True)  # {"<question_id>": answer_id}
+    started_at = models.DateTimeField(auto_now_add=True)
+    deadline = models.DateTimeField(null=True, blank=True)  # None = no time limit
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempt = models.OneToOneField(
+        QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='session'
+    )
+
+    class Meta:
+        constraints = [
+            # At most one open session per user and quiz
+            models.UniqueConstraint(
+                fields=['user', 'quiz'], condition=Q(finished_at__isnull=True),
+                name='quiz_session_one_open',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title} ({'finished' if self.finished_at else 'open'})"
+
+    @property
+    def is_expired(self):
+        """Past the deadline (plus grace period); only finishing is allowed then"""
+        if self.deadline is None:
+            return False
+        return timezone.now() > self.deadline + timedelta(seconds=self.GRACE_SECONDS)
+
+    @property
+    def remaining_seconds(self):
+        if self.deadline is None:
+            return None
+        return max(0, int((self.deadline - timezone.now()).total_seconds()))
+
+    @classmethod
+    def current_for(cls, user, quiz):
+        """The user's open session for a quiz, or None if the quiz hasn't been started"""
+        return cls.objects.filter(user=user, quiz=quiz, finished_at__isnull=True).first()
+
+    @classmethod
+    def open_for(cls, user, quiz):
+        """The user's open session for a quiz, starting one (and its timer) if needed"""
+        session = cls.current_for(user, quiz)
+        if session:
+            return session
+        deadline = None
+        if quiz.time_limit:
+            deadline = timezone.now() + timedelta(minutes=quiz.time_limit)
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user=user, quiz=quiz, deadline=deadline)
+        except IntegrityError:
+            # Another tab started the session first
+            return cls.objects.get(user=user, quiz=quiz, finished_at__isnull=True)
+
+    def save_answers(self, answers):
+        """
+        Merge {question_id: answer_id} into the saved answers under a row lock,
+        so overlapping autosaves from the same page don't drop each other's writes.
+        Returns False if the session can no longer be changed.
+        """
+        with transaction.atomic():
+            session = QuizSession.objects.select_for_update().get(pk=self.pk)
+            if session.finished_at or session.is_expired:
+                return False
+            session.answers.update({str(question_id): answer_id for question_id, answer_id in answers.items()})
+            session.save(update_fields=['answers', 'updated_at'])
+        self.answers = session.answers
+        return True
+
+    def discard(self):
+        """Drop an unfinished session without recording an attempt (e.g. it expired unanswered)"""
+        QuizSession.objects.filter(pk=self.pk, finished_at__isnull=True).delete()
+
+    @property
+    def selections(self):
+        """Saved answers keyed by integer question id, as the grader expects"""
+        return {int(question_id): answer_id for question_id, answer_id in self.answers.items()}
+
+    def finish(self, score, max_score, passed, answers=(), responses=(), score_fraction=0):
+        """
+        Close the session and record its attempt (see QuizBest.record_attempt),
+        folding `responses` into the item statistics in the same transaction
+        (see QuestionStats.record).
+        Returns (attempt, summary), or (None, None) if the session was already finished,
+        e.g. by a duplicate submit.
+        """
+        with transaction.atomic():
+            claimed = QuizSession.objects.filter(pk=self.pk, finished_at__isnull=True).update(
+                finished_at=timezone.now()
+            )
+            if not claimed:
+                return None, None
+            attempt, best = QuizBest.record_attempt(
+                self.user, self.quiz, score, max_score, passed, answers=answers
+            )
+            QuizSession.objects.filter(pk=self.pk).update(attempt=attempt)
+            if responses:
+                QuestionStats.record(responses, score_fraction)
+        self.attempt = attempt
+        return attempt, best
+
+
+class QuizBest(models.Model):
+    """
+    Per-user summary of all attempts at a quiz (best score, attempt counts, passed).
+    Written in the same transaction as each attempt, so "best attempt" reads are
+    a single-row lookup instead of sorting the attempt history. The counters
+    also cover attempts removed by compact_quiz_attempts.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_bests')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='user_bests')
+    best_attempt = models.ForeignKey(
+        QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    best_score = models.IntegerField(default=0)
+    max_score = models.IntegerField(default=0)  # Max score of the best attempt
+    attempts = models.IntegerField(default=0)
+    passed_attempts = models.IntegerField(default=0)
+    perfect_attempts = models.IntegerField(default=0)  # Attempts with score == max_score
+    archived_attempts = models.IntegerField(default=0)  # Attempts deleted by compaction
+    passed = models.BooleanField(default=False)  # Passed in any attempt
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'quiz']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title} (best {self.best_score}/{self.max_score})"
+
+    @property
+    def percentage(self):
+        return int(self.best_score / self.max_score * 100) if self.max_score > 0 else 0
+
+    @classmethod
+    def record_attempt(cls, user, quiz, score, max_score, passed, answers=()):
+        """
+        Create a completed QuizAttempt and fold it into the user's summary atomically.
+        `answers` is the list of selected answer ids stored on the attempt.
+        Returns (attempt, summary). A new best must beat the old score; ties keep the earlier attempt.
+        """
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.create(
+                user=user, quiz=quiz, score=score, max_score=max_score,
+                passed=passed, completed_at=timezone.now(), answers=list(answers),
+            )
+            best, _ = cls.objects.select_for_update().get_or_create(user=user, quiz=quiz)
+            if best.best_attempt_id is None or score > best.best_score:
+                best.best_attempt = attempt
+                best.best_score = score
+                best.max_score = max_score
+            best.attempts += 1
+            if passed:
+                best.passed_attempts += 1
+            if max_score > 0 and score == max_score:
+                best.perfect_attempts += 1
+            best.passed = best.passed or passed
+            best.last_attempt_at = attempt.completed_at
+            best.save()
+        return attempt, best
+
+    @classmethod
+    def for_quiz(cls, user, quiz):
+        """The user's summary for a quiz, or None if they never attempted it"""
+        return cls.objects.filter(user=user, quiz=quiz).select_related('best_attempt').first()
+
+    @classmethod
+    def totals_for_user(cls, user):
+        """Attempt counters summed over all of a user's quizzes, including compacted history"""
+        totals = cls.objects.filter(user=user).aggregate(
+            attempts=Sum('attempts'),
+            passed=Sum('passed_attempts'),
+            perfect=Sum('perfect_attempts'),
+        )
+        return {name: value or 0 for name, value in totals.items()}
+
+
+class QuestionStats(models.Model):
+    """
+    Item-analysis statistics for a question, maintained incrementally from graded
+    attempts (running counts and sums), so reading them never scans attempts.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    responses = models.IntegerField(default=0)  # Attempts that included this question
+    correct = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    # Sums of attempt scores (0-1) for the point-biserial discrimination index
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Question stats'
+
+    def __str__(self):
+        return f"Stats for {self.question}"
+
+    @property
+    def p_value(self):
+        """Share of responses that were correct (item difficulty; higher = easier)"""
+        return self.correct / self.responses if self.responses else None
+
+    @property
+    def discrimination(self):
+        """
+        Point-biserial correlation between answering this question correctly and
+        the attempt's total score (-1 to 1; below ~0.2 suggests a weak or misleading item).
+        """
+        n, n_correct = self.responses, self.correct
+        if n < 2 or n_correct in (0, n):
+            return None
+        mean = self.score_sum / n
+        variance = self.score_sq_sum / n - mean ** 2
+        if variance <= 1e-12:
+            return None
+        mean_correct = self.correct_score_sum / n_correct
+        mean_wrong = (self.score_sum - self.correct_score_sum) / (n - n_correct)
+        p = n_correct / n
+        return (mean_correct - mean_wrong) / variance ** 0.5 * (p * (1 - p)) ** 0.5
+
+    def answer_share(self, answer):
+        """Share of responses that picked the given answer (select_related its `stats`)"""
+        answer_stats = getattr(answer, 'stats', None)
+        if not self.responses or answer_stats is None:
+            return 0
+        return answer_stats.picks / self.responses
+
+    @classmethod
+    def record(cls, responses, score_fraction):
+        """
+        Fold one graded attempt into the stats of its questions and answers.
+        `responses` is a list of (question_id, answer_id or None, is_correct).
+        Call inside the attempt's transaction (QuizSession.finish): each row gets
+        an F() increment, so concurrent submits only wait on a row while it is written.
+        """
+        question_ids = sorted({question_id for question_id, _, _ in responses})
+        picked = sorted({answer_id for _, answer_id, _ in responses if answer_id is not None})
+        cls.objects.bulk_create(
+            [cls(question_id=question_id) for question_id in question_ids], ignore_conflicts=True
+        )
+        AnswerStats.objects.bulk_create(
+            [AnswerStats(answer_id=answer_id) for answer_id in picked], ignore_conflicts=True
+        )
+
+        now = timezone.now()
+        # Update in question id order so concurrent submits of the same quiz can't deadlock
+        for question_id, answer_id, is_correct in sorted(responses, key=lambda response: response[0]):
+            cls.objects.filter(question_id=question_id).update(
+                responses=F('responses') + 1,
+                correct=F('correct') + int(is_correct),
+                skipped=F('skipped') + int(answer_id is None),
+                score_sum=F('score_sum') + score_fraction,
+                score_sq_sum=F('score_sq_sum') + score_fraction ** 2,
+                correct_score_sum=F('correct_score_sum') + (score_fraction if is_correct else 0),
+                updated_at=now,
+            )
+        if picked:
+            AnswerStats.objects.filter(answer_id__in=picked).update(picks=F('picks') + 1)
+
+
+class AnswerStats(models.Model):
+    """How often an answer was picked, beside QuestionStats (see QuestionStats.record)"""
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    picks = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Answer stats'
+
+    def __str__(self):
+        return f"Stats for {self.answer}"
+
+
 class VideoCategory(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -225,6 +565,7 @@ class Video(models.Model):
     slug = models.SlugField(unique=True)
     category = models.ForeignKey(VideoCategory, on_delete=models.CASCADE, related_name='videos')
     description = models.TextField()
+    description_html = models.TextField(blank=True, editable=False)  # Rendered from description (render_content_html)
     video_file = models.FileField(upload_to='videos/', blank=True, null=True)
     video_url = models.URLField(blank=True)
     thumbnail = models.ImageField(upload_to='videos/thumbnails/', blank=True, null=True)
@@ -235,48 +576,148 @@ class Video(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the video library (newest first)
+            models.Index(fields=['created_at', 'id'], name='video_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'description' in update_fields:
+            # render_content_html refreshes description_html before the write
+            kwargs['update_fields'] = {*update_fields, 'description_html'}
+        super().save(*args, **kwargs)
+
 
 class ForumPost(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forum_posts')
     title = models.CharField(max_length=200)
     content = models.TextField()
+    content_html = models.TextField(blank=True, editable=False)  # Rendered from content (render_content_html)
     image = models.ImageField(upload_to='forum/images/', blank=True, null=True)
     video = models.FileField(upload_to='forum/videos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_pinned = models.BooleanField(default=False)
+    # Denormalised counters, kept in step by toggle_like/add_comment and the delete
+    # handlers (release_like/release_comment); repair_forum_counts reconciles
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    # Precomputed feed ranking, see signlang/forum.py
+    hot_score = models.FloatField(default=0)
+    hot_decayed_at = models.DateTimeField(default=timezone.now)
+    week_score = models.FloatField(default=0)
 
     class Meta:
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            # Forum list: pinned first, then newest, paginated by keyset
+            models.Index(fields=['is_pinned', 'created_at', 'id'], name='forumpost_list_idx'),
+            models.Index(fields=['hot_score', 'id'], name='forumpost_hot_idx'),
+            models.Index(fields=['week_score', 'id'], name='forumpost_week_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
-    @property
-    def like_count(self):
-        return self.likes.count()
-
-    @property
-    def comment_count(self):
-        return self.comments.count()
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.hot_score:
+            from . import forum
+            self.hot_score = forum.ranking('new_post_weight')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            # render_content_html refreshes content_html before the write
+            kwargs['update_fields'] = {*update_fields, 'content_html'}
+        super().save(*args, **kwargs)
+
+    def toggle_like(self, user):
+        """
+        Like the post for a user, or remove their like if they already liked it.
+        The counter and feed scores move with F() updates in the same transaction.
+        Returns (liked, like_count).
+        """
+        from . import forum
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=user, post=self)
+            if created:
+                forum.update_post(self.pk, lambda decayed_at, now: {
+                    'like_count': F('like_count') + 1, **forum.like_added(decayed_at, now),
+                })
+            else:
+                # Only the request that still finds the row deletes it (double clicks race here);
+                # release_like takes back its count and score
+                like = Like.objects.select_for_update().filter(pk=like.pk).first()
+                if like:
+                    like.delete()
+        self.refresh_from_db(fields=['like_count', 'hot_score', 'hot_decayed_at', 'week_score'])
+        return created, self.like_count
+
+    def add_comment(self, comment, parent=None):
+        """Save a new comment (or a reply to `parent`) on the post, counting and scoring it atomically"""
+        from . import forum
+        comment.post = self
+        comment.parent = parent
+        with transaction.atomic():
+            comment.save()
+            forum.update_post(self.pk, lambda decayed_at, now: {
+                'comment_count': F('comment_count') + 1, **forum.comment_added(decayed_at, now),
+            })
+        self.refresh_from_db(fields=['comment_count', 'hot_score', 'hot_decayed_at', 'week_score'])
+        return comment
 
 
 class Comment(models.Model):
+    PATH_SEGMENT_WIDTH = 10  # Zero-padded ids, so paths sort depth-first in creation order
+    MAX_DEPTH = 8  # Replies below this depth attach to the deepest allowed ancestor
+
     post = models.ForeignKey(ForumPost, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies'
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Materialised path: ids of the ancestors and the comment itself, e.g. "0000000012/0000000045/"
+    path = models.CharField(max_length=100, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.IntegerField(default=0, editable=False)  # All descendants, not just direct replies
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Top-level comments of a post, paginated by keyset
+            models.Index(fields=['post', 'parent', 'created_at', 'id'], name='comment_thread_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username}"
 
+    @classmethod
+    def path_segment(cls, comment_id):
+        return f'{comment_id:0{cls.PATH_SEGMENT_WIDTH}d}/'
+
+    def ancestor_ids(self):
+        """Ids from the thread's top-level comment down to the parent"""
+        return [int(segment) for segment in self.path.split('/')[:-2]]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        parent = self.parent
+        if parent is not None and parent.depth >= self.MAX_DEPTH:
+            parent = self.parent = Comment.objects.get(id=parent.ancestor_ids()[self.MAX_DEPTH - 1])
+        self.depth = parent.depth + 1 if parent else 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.path = (parent.path if parent else '') + self.path_segment(self.id)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+            if parent:
+                Comment.objects.filter(id__in=self.ancestor_ids()).update(reply_count=F('reply_count') + 1)
+
 
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes')
@@ -310,6 +751,13 @@ class Report(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the moderation queue, optionally filtered by status
+            models.Index(fields=['created_at', 'id'], name='report_recent_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='report_status_recent_idx'),
+        ]
+
     def __str__(self):
         return f"Report on {self.post.title}"
 
@@ -652,61 +1100,82 @@ class VocabularyReview(models.Model):
     next_review = models.DateField(null=True, blank=True)  # When to show again
     last_reviewed = models.DateTimeField(null=True, blank=True)
 
+    # FSRS memory state (0 stability = never rated)
+    stability = models.FloatField(default=0)  # Days until recall probability falls to 90%
+    difficulty = models.FloatField(default=0)  # 1 (easy) to 10 (hard)
+
     # Stats
     total_reviews = models.IntegerField(default=0)
     correct_reviews = models.IntegerField(default=0)  # Rating >= 3
     last_rating = models.IntegerField(null=True, blank=True)
+    mastery = models.IntegerField(default=0)  # Stored result of calculate_mastery() (0-100)
 
     class Meta:
         unique_together = ['user', 'vocabulary']
         ordering = ['next_review']
+        indexes = [
+            # Lets vocabulary_difficulty() rank signs across all learners from the index alone
+            models.Index(fields=['vocabulary', 'total_reviews', 'mastery'], name='vocab_review_difficulty_idx'),
+            # Cross-lesson review queue: due cards and new cards per user
+            models.Index(fields=['user', 'next_review', 'id'], name='vocab_review_due_idx'),
+            models.Index(fields=['user', 'total_reviews', 'id'], name='vocab_review_new_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.vocabulary.word}"
 
-    def process_rating(self, rating):
+    # Fields written by apply_rating() (used for bulk updates)
+    RATING_FIELDS = [
+        'ease_factor', 'interval', 'repetitions', 'next_review', 'last_reviewed',
+        'stability', 'difficulty', 'total_reviews', 'correct_reviews', 'last_rating', 'mastery',
+    ]
+
+    def apply_rating(self, rating, reviewed_at=None, params=None):
         """
-        Process a rating (1-4) and update SM-2 parameters.
-        Based on SM-2 algorithm with simplifications.
+        Apply a rating (1-4) to the scheduling state and stats without saving.
+        The maths lives in scheduling.review_step; `params` is the user's
+        SchedulerParams (looked up, from the cache, when not given).
+        `reviewed_at` lets ratings recorded offline be replayed at their original time.
+        Returns the unsaved ReviewLog entry for this rating, so callers can write logs in bulk.
         """
+        reviewed_at = reviewed_at or timezone.now()
+        review_date = reviewed_at.date()
+        if params is None:
+            params = SchedulerParams.for_user(self.user_id)
+
+        elapsed_days = 0
+        if self.last_reviewed:
+            elapsed_days = max(0, (review_date - self.last_reviewed.date()).days)
+
         self.total_reviews += 1
         self.last_rating = rating
-        self.last_reviewed = timezone.now()
+        self.last_reviewed = reviewed_at
 
         if rating >= 3:
             self.correct_reviews += 1
 
-        if rating == 1:  # Again - complete reset
-            self.repetitions = 0
-            self.interval = 0
-            self.next_review = timezone.now().date()  # Review again today
-        elif rating == 2:  # Hard - extend slightly
-            self.repetitions = 0
-            self.interval = max(1, int(self.interval * 0.5))
-            self.next_review = timezone.now().date() + timedelta(days=self.interval)
-            # Decrease ease factor
-            self.ease_factor = max(1.3, self.ease_factor - 0.15)
-        elif rating == 3:  # Good - normal progression
-            if self.repetitions == 0:
-                self.interval = 1
-            elif self.repetitions == 1:
-                self.interval = 3
-            else:
-                self.interval = int(self.interval * self.ease_factor)
-            self.repetitions += 1
-            self.next_review = timezone.now().date() + timedelta(days=self.interval)
-        else:  # Easy (4) - accelerated progression
-            if self.repetitions == 0:
-                self.interval = 4
-            else:
-                self.interval = int(self.interval * self.ease_factor * 1.3)
-            self.repetitions += 1
-            self.next_review = timezone.now().date() + timedelta(days=self.interval)
-            # Increase ease factor
-            self.ease_factor = min(3.0, self.ease_factor + 0.1)
+        log = ReviewLog(
+            user_id=self.user_id,
+            vocabulary_id=self.vocabulary_id,
+            rating=rating,
+            elapsed_days=elapsed_days,
+            stability=self.stability,
+            reviewed_at=reviewed_at,
+        )
 
-        self.save()
-        return self.interval
+        state = scheduling.review_next({
+            'ease_factor': self.ease_factor,
+            'interval': self.interval,
+            'repetitions': self.repetitions,
+            'stability': self.stability,
+            'difficulty': self.difficulty,
+        }, rating, elapsed_days, params)
+        for field, value in state.items():
+            setattr(self, field, value)
+        self.next_review = review_date + timedelta(days=self.interval)
+
+        self.mastery = self.calculate_mastery()
+        return log
 
     @property
     def is_due(self):
@@ -715,8 +1184,7 @@ class VocabularyReview(models.Model):
             return True
         return timezone.now().date() >= self.next_review
 
-    @property
-    def mastery_level(self):
+    def calculate_mastery(self):
         """Calculate mastery level (0-100%) based on repetitions and ease"""
         if self.total_reviews == 0:
             return 0
@@ -725,21 +1193,45 @@ class VocabularyReview(models.Model):
         rep_bonus = min(20, self.repetitions * 5)  # Up to 20% bonus for reps
         return min(100, int(correct_rate * 0.8 + rep_bonus))
 
+    @property
+    def mastery_level(self):
+        """Mastery level (0-100%) as stored by the last rating"""
+        return self.mastery
+
     @classmethod
-    def get_due_cards(cls, user, lesson=None, limit=20):
-        """Get vocabulary cards due for review"""
+    def get_due_cards(cls, user, lesson=None, limit=20, after=None):
+        """
+        Get previously reviewed cards due for review, oldest first.
+        `after` is a (next_review, id) keyset cursor; served by vocab_review_due_idx.
+        """
         today = timezone.now().date()
         queryset = cls.objects.filter(
-            user=user
-        ).filter(
-            models.Q(next_review__lte=today) | models.Q(next_review__isnull=True)
-        ).select_related('vocabulary', 'vocabulary__lesson')
+            user=user,
+            next_review__lte=today,
+            total_reviews__gt=0,
+        ).select_related('vocabulary', 'vocabulary__lesson').order_by('next_review', 'id')
+
+        if after:
+            next_review, review_id = after
+            queryset = queryset.filter(
+                models.Q(next_review__gt=next_review) |
+                models.Q(next_review=next_review, id__gt=review_id)
+            )
 
         if lesson:
             queryset = queryset.filter(vocabulary__lesson=lesson)
 
         return queryset[:limit]
 
+    @classmethod
+    def get_new_cards(cls, user, limit=20, after_id=0):
+        """Get cards that have never been rated, in the order they were added"""
+        return cls.objects.filter(
+            user=user,
+            total_reviews=0,
+            id__gt=after_id,
+        ).select_related('vocabulary', 'vocabulary__lesson').order_by('id')[:limit]
+
     @classmethod
     def get_or_create_for_vocabulary(cls, user, vocabulary):
         """Get or create a review record for a vocabulary item"""
@@ -748,8 +1240,201 @@ class VocabularyReview(models.Model):
             vocabulary=vocabulary,
             defaults={'next_review': timezone.now().date()}
         )
+        if created:
+            LessonMastery.apply_delta(user.id, vocabulary.lesson_id, cards=1)
         return review
 
+    @classmethod
+    def vocabulary_difficulty(cls, limit=10):
+        """
+        Rank vocabulary from hardest to easiest by average mastery across all learners.
+        Only reviewed cards count; served by vocab_review_difficulty_idx.
+        """
+        return cls.objects.filter(total_reviews__gt=0).values(
+            'vocabulary_id'
+        ).annotate(
+            avg_mastery=Avg('mastery'),
+            learners=Count('id'),
+        ).order_by('avg_mastery', 'vocabulary_id')[:limit]
+
+
+class LessonMastery(models.Model):
+    """
+    Per-(user, lesson) rollup of VocabularyReview.mastery.
+    Maintained incrementally so lesson mastery is a single-row lookup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_mastery')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='user_mastery')
+    mastery_sum = models.IntegerField(default=0)  # Sum of VocabularyReview.mastery
+    card_count = models.IntegerField(default=0)  # Review records for this lesson
+    reviewed_count = models.IntegerField(default=0)  # Review records rated at least once
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'lesson']
+        verbose_name_plural = "Lesson Mastery"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.lesson.title}: {self.average_mastery}%"
+
+    @property
+    def average_mastery(self):
+        """Average mastery (0-100%) over the user's review records for the lesson"""
+        return self.mastery_sum // self.card_count if self.card_count > 0 else 0
+
+    @classmethod
+    def apply_delta(cls, user_id, lesson_id, mastery=0, cards=0, reviewed=0):
+        """Atomically add deltas to the rollup row, creating it on first use"""
+        if not (mastery or cards or reviewed):
+            return
+        rollup = cls.objects.filter(user_id=user_id, lesson_id=lesson_id)
+        changes = {
+            'mastery_sum': F('mastery_sum') + mastery,
+            'card_count': F('card_count') + cards,
+            'reviewed_count': F('reviewed_count') + reviewed,
+            'updated_at': timezone.now(),
+        }
+        if rollup.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id, lesson_id=lesson_id,
+                    mastery_sum=mastery, card_count=cards, reviewed_count=reviewed,
+                )
+        except IntegrityError:
+            # Another request created the row first
+            rollup.update(**changes)
+
+    @classmethod
+    def sync_card_count(cls, user_id, lesson_id):
+        """Recount review records for a lesson (after a bulk insert that may skip conflicts)"""
+        card_count = VocabularyReview.objects.filter(
+            user_id=user_id, vocabulary__lesson_id=lesson_id
+        ).count()
+        rollup = cls.objects.filter(user_id=user_id, lesson_id=lesson_id)
+        if rollup.update(card_count=card_count, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, lesson_id=lesson_id, card_count=card_count)
+        except IntegrityError:
+            rollup.update(card_count=card_count, updated_at=timezone.now())
+
+    @classmethod
+    def for_lesson(cls, user, lesson):
+        """Get the rollup row for a lesson (None if the user has no review records)"""
+        return cls.objects.filter(user=user, lesson=lesson).first()
+
+    @classmethod
+    def rebuild(cls, lesson_id=None, user_id=None):
+        """Recompute rollup rows from VocabularyReview (used when vocabulary is removed)"""
+        reviews = VocabularyReview.objects.all()
+        rollups = cls.objects.all()
+        if lesson_id is not None:
+            reviews = reviews.filter(vocabulary__lesson_id=lesson_id)
+            rollups = rollups.filter(lesson_id=lesson_id)
+        if user_id is not None:
+            reviews = reviews.filter(user_id=user_id)
+            rollups = rollups.filter(user_id=user_id)
+
+        totals = reviews.values('user_id', 'vocabulary__lesson_id').annotate(
+            mastery_sum=Sum('mastery'),
+            card_count=Count('id'),
+            reviewed_count=Count('id', filter=Q(total_reviews__gt=0)),
+        ).order_by()
+
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create([
+                cls(
+                    user_id=row['user_id'],
+                    lesson_id=row['vocabulary__lesson_id'],
+                    mastery_sum=row['mastery_sum'] or 0,
+                    card_count=row['card_count'],
+                    reviewed_count=row['reviewed_count'],
+                )
+                for row in totals
+            ], batch_size=500)
+
+
+def rebuild_lesson_mastery(sender, instance, origin=None, **kwargs):
+    """
+    Drop deleted vocabulary's review records from the lesson rollups, once per lesson
+    and delete() call. Vocabulary deleted along with its lesson (or category) is
+    skipped: the lesson's rollups are deleted with it.
+    """
+    if origin is not None:
+        origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+        if origin_model is not Vocabulary:
+            return
+        # post_delete runs after every row of the delete() is gone, so one rebuild per lesson suffices
+        rebuilt = vars(origin).setdefault('_rebuilt_mastery_lessons', set())
+        if instance.lesson_id in rebuilt:
+            return
+        rebuilt.add(instance.lesson_id)
+    LessonMastery.rebuild(lesson_id=instance.lesson_id)
+
+
+class ReviewLog(models.Model):
+    """
+    Append-only history of flashcard ratings, for retention analysis and scheduler fitting.
+    Rows are never updated; export with the export_review_log command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_logs')
+    vocabulary = models.ForeignKey(Vocabulary, on_delete=models.CASCADE, related_name='review_logs')
+    rating = models.PositiveSmallIntegerField(choices=VocabularyReview.RATING_CHOICES)
+    elapsed_days = models.IntegerField(default=0)  # Days since the previous rating of this card
+    stability = models.FloatField(default=0)  # FSRS stability before this rating (0 = first rating)
+    reviewed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Time-range scans (exports, partition/archive by month) and per-user history
+            models.Index(fields=['reviewed_at', 'id'], name='review_log_time_idx'),
+            models.Index(fields=['user', 'reviewed_at'], name='review_log_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.vocabulary_id} ({self.rating})"
+
+
+class SchedulerParams(models.Model):
+    """
+    Per-user flashcard scheduling parameters.
+    stability_scale is fitted offline by the optimize_scheduler command.
+    """
+    CACHE_TIMEOUT = 60 * 60  # Read on every rating; saves invalidate it through cache_tags
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='scheduler_params')
+    scheduler = models.CharField(
+        max_length=10, choices=scheduling.SCHEDULER_CHOICES, blank=True,
+        help_text='Leave blank to use the site default (FLASHCARD_SCHEDULER)'
+    )
+    stability_scale = models.FloatField(default=1.0)  # Multiplies FSRS stability
+    desired_retention = models.FloatField(default=0.9)  # Target recall probability for FSRS intervals
+    sample_count = models.IntegerField(default=0)  # Reviews used in the last fit
+    fitted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Scheduler params'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.scheduler_name}"
+
+    @property
+    def scheduler_name(self):
+        return scheduling.get_scheduler(self.scheduler).name
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Saved parameters for a user, or unsaved defaults (cached until parameters change)"""
+        return cache_tags.get_or_compute(
+            f'scheduler_params_{user_id}',
+            lambda: cls.objects.filter(user_id=user_id).first() or cls(user_id=user_id),
+            cls.CACHE_TIMEOUT,
+            tags=[cache_tags.model_tag(cls)],
+        )
+
 
 # ============================================
 # HOME PAGE CONTENT MODELS
@@ -816,22 +1501,102 @@ class FeaturedCard(models.Model):
         return f"{self.title} ({self.section})"
 
 
-# Signal to clear cache when FeaturedCard changes
-from django.db.models.signals import post_save, post_delete
-from django.core.cache import cache as django_cache
+from django.db.models.signals import post_save, post_delete, pre_save
+
+
+# (source field, rendered field, renderer) for models that store rendered HTML
+RENDERED_FIELDS = {
+    Lesson: ('content', 'content_html', rendering.render_markdown),
+    Video: ('description', 'description_html', rendering.render_markdown),
+    ForumPost: ('content', 'content_html', rendering.render_text),
+}
+
+
+def render_content_html(sender, instance, update_fields=None, **kwargs):
+    """
+    Render the source text into its *_html column before every save, fixture
+    loads (raw saves, which skip Model.save()) included. QuerySet.update() and
+    bulk writes bypass this; templates fall back to rendering when the column is empty.
+    """
+    source, target, render = RENDERED_FIELDS[sender]
+    if update_fields is None or source in update_fields:
+        setattr(instance, target, render(getattr(instance, source)))
+
+
+def bump_quiz_definition_version(sender, instance, **kwargs):
+    """Quiz content changed: compiled definitions cached under the old version go stale"""
+    if sender is Quiz:
+        Quiz.bump_definition_version(id=instance.id)
+    elif sender is Question:
+        Quiz.bump_definition_version(id=instance.quiz_id)
+    else:
+        # The question may already be gone when answers are deleted with it;
+        # its own post_delete bumps the quiz in that case
+        Quiz.bump_definition_version(questions__id=instance.question_id)
+
 
+def deleted_with_post(origin):
+    """The delete started from a forum post (or a queryset of them), so its counters go with it"""
+    return isinstance(origin, ForumPost) or getattr(origin, 'model', None) is ForumPost
 
-def clear_featured_card_cache(sender, instance, **kwargs):
-    """Clear featured card cache when a card is saved or deleted"""
-    # Clear cache for the specific section
-    django_cache.delete(f'featured_cards_{instance.section}')
-    # Also clear all section caches to be safe
-    for section_key, _ in FeaturedCard.SECTION_CHOICES:
-        django_cache.delete(f'featured_cards_{section_key}')
 
+def release_comment(sender, instance, origin=None, **kwargs):
+    """
+    A deleted comment stops counting toward its post, and a deleted reply toward
+    its ancestors (replies deleted with it do the same)
+    """
+    if deleted_with_post(origin):
+        return
+    ForumPost.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+    if instance.parent_id:
+        Comment.objects.filter(id__in=instance.ancestor_ids(), reply_count__gt=0).update(
+            reply_count=F('reply_count') - 1
+        )
 
-post_save.connect(clear_featured_card_cache, sender=FeaturedCard)
-post_delete.connect(clear_featured_card_cache, sender=FeaturedCard)
+
+def release_like(sender, instance, origin=None, **kwargs):
+    """A deleted like stops counting toward its post, taking back what it still adds to the scores"""
+    from . import forum
+    if deleted_with_post(origin):
+        return
+    forum.update_post(instance.post_id, lambda decayed_at, now: {
+        'like_count': F('like_count') - 1,
+        **forum.like_removed(instance, decayed_at, now),
+    })
+
+
+def update_search_index(sender, instance, **kwargs):
+    """Re-index searchable content (search and suggestions) after it is saved"""
+    from . import search
+    search.content_changed(instance, kwargs.get('update_fields'))
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop deleted content from search and suggestions"""
+    from . import search
+    search.content_deleted(instance)
+
+
+for rendered in RENDERED_FIELDS:
+    pre_save.connect(render_content_html, sender=rendered)
+post_delete.connect(rebuild_lesson_mastery, sender=Vocabulary)
+post_delete.connect(release_comment, sender=Comment)
+post_delete.connect(release_like, sender=Like)
+post_save.connect(bump_quiz_definition_version, sender=Quiz)
+post_save.connect(bump_quiz_definition_version, sender=Question)
+post_delete.connect(bump_quiz_definition_version, sender=Question)
+post_save.connect(bump_quiz_definition_version, sender=Answer)
+post_delete.connect(bump_quiz_definition_version, sender=Answer)
+for searchable in (Lesson, Video, Vocabulary, ForumPost):
+    post_save.connect(update_search_index, sender=searchable)
+    post_delete.connect(remove_from_search_index, sender=searchable)
+# Cached pages, fragments and lookups declare tags for these models (see cache_tags)
+cache_tags.register(Lesson, related=lambda lesson: [f'category:{lesson.category_id}'])
+cache_tags.register(Vocabulary, related=lambda vocab: [f'lesson:{vocab.lesson_id}'])
+for tagged_content in (Category, Video, VideoCategory, FeaturedCard, SchedulerParams):
+    cache_tags.register(tagged_content)
 
 
 class SiteSettings(models.Model):
@@ -853,3 +1618,88 @@ class SiteSettings(models.Model):
             return cls.objects.get(key=key).value
         except cls.DoesNotExist:
             return default
+
+
+class IndexVersion(models.Model):
+    """
+    Generation of a process-memory index (search, suggestions, trigrams).
+    Kept in the database so every worker sees changes made by the others,
+    whatever cache backend is configured. Ordinary edits are published as
+    IndexChange rows and applied incrementally; a new generation (publish())
+    makes every worker rebuild, as does falling behind `pruned_through`,
+    the last change id removed from the log.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.CharField(max_length=32)
+    pruned_through = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.version}"
+
+    @classmethod
+    def current(cls, key):
+        version = cls.objects.filter(key=key).values_list('version', flat=True).first()
+        if version is None:
+            version = cls.objects.get_or_create(key=key, defaults={'version': secrets.token_hex(8)})[0].version
+        return version
+
+    @classmethod
+    def state(cls, key):
+        """(version, pruned_through) of an index, creating its row if needed"""
+        state = cls.objects.filter(key=key).values_list('version', 'pruned_through').first()
+        if state is None:
+            cls.current(key)
+            state = cls.objects.filter(key=key).values_list('version', 'pruned_through').get()
+        return state
+
+    @classmethod
+    def publish(cls, key):
+        """Store a new version for `key` and return it"""
+        version = secrets.token_hex(8)
+        cls.objects.update_or_create(key=key, defaults={'version': version})
+        return version
+
+
+class IndexChange(models.Model):
+    """
+    Change log of a process-memory index: one row per saved or deleted object.
+    Workers re-read only the logged objects instead of rebuilding. Rows older
+    than RETENTION are pruned; workers that had not read them rebuild.
+    """
+    RETENTION = timedelta(hours=1)
+    PRUNE_EVERY = 500  # Change ids between prunes
+
+    key = models.CharField(max_length=100)  # IndexVersion.key of the index
+    model = models.CharField(max_length=100)  # Model label, e.g. "signlang.lesson"
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Changes of one index after the last one a worker applied
+            models.Index(fields=['key', 'id'], name='index_change_key_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}: {self.model} #{self.object_id}"
+
+    @classmethod
+    def record(cls, key, instance):
+        change = cls.objects.create(key=key, model=instance._meta.label_lower, object_id=instance.pk)
+        if change.id % cls.PRUNE_EVERY == 0:
+            cls.prune()
+        return change
+
+    @classmethod
+    def last_id(cls, key):
+        return cls.objects.filter(key=key).order_by('-id').values_list('id', flat=True).first() or 0
+
+    @classmethod
+    def prune(cls, before=None):
+        """Delete changes older than RETENTION, noting the last deleted id of each index"""
+        stale = cls.objects.filter(created_at__lt=before or timezone.now() - cls.RETENTION)
+        for key, last_id in stale.values('key').annotate(last_id=models.Max('id')).values_list('key', 'last_id'):
+            IndexVersion.current(key)
+            IndexVersion.objects.filter(key=key, pruned_through__lt=last_id).update(pruned_through=last_id)
+            cls.objects.filter(key=key, id__lte=last_id).delete()
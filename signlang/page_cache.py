@@ -0,0 +1,98 @@
+"""
+Page Cache for Signox
+Whole-page caching of public pages for anonymous visitors (logged-in users
+get template fragment caches keyed on the same content tags).
+
+A cached page is keyed on its path, query string and active language, and on
+the versions of the content tags it declares ("lesson", "category", ...).
+Saving or deleting a model of that kind invalidates its tag (see cache_tags),
+so stale pages are simply never read again.
+
+Cached HTML holds a placeholder instead of the CSRF token; every response gets
+the visitor's own token, so forms on cached pages still submit.
+"""
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from . import cache_tags
+
+
+PAGE_CACHE_TIMEOUT = 60 * 10  # Content changes invalidate sooner through tag versions
+CSRF_PLACEHOLDER = '__signox_csrf_token__'
+CACHED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+# ============================================
+# ANONYMOUS PAGE CACHE
+# ============================================
+def has_pending_messages(request):
+    """Queued or stored flash messages (len() does not mark them as read)"""
+    return len(messages.get_messages(request)) > 0
+
+
+def is_cacheable(request):
+    return (
+        getattr(settings, 'PAGE_CACHE_ENABLED', True)
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not has_pending_messages(request)
+    )
+
+
+def page_key(request, tags):
+    digest = hashlib.sha256(
+        f'{request.path}?{request.GET.urlencode()}|{translation.get_language()}'.encode()
+    ).hexdigest()
+    return cache_tags.make_key(f'page_{digest}', tags)
+
+
+def personalise(request, content):
+    """Swap the placeholder for this visitor's CSRF token (also sets their CSRF cookie)"""
+    placeholder = CSRF_PLACEHOLDER.encode()
+    if placeholder not in content:
+        return content
+    return content.replace(placeholder, get_token(request).encode())
+
+
+def cache_anonymous_page(*tags, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Serve a view from the page cache for anonymous GET requests.
+    `tags` name the content the page shows; changes to it invalidate the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = page_key(request, tags)
+            cached = cache.get(key)
+            if cached is not None:
+                content, status, headers = cached
+                response = HttpResponse(personalise(request, content), status=status, headers=headers)
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            # Templates render CSRF_PLACEHOLDER instead of a token (see context_processors.page_cache)
+            request.page_cache_csrf = True
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+            finally:
+                request.page_cache_csrf = False
+
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                cache.set(key, (response.content, response.status_code, headers), timeout)
+            response.content = personalise(request, response.content)
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
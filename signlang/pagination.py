@@ -0,0 +1,153 @@
+"""
+Cursor Pagination for Signox
+Keyset pagination over an ordered (sort key..., id) tuple: each page is one
+indexed range query with LIMIT, with no COUNT(*) and no OFFSET, so page 1000
+costs the same as page 1. Cursors are opaque URL-safe strings.
+"""
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+
+ESTIMATE_CAP = 1000  # Databases without planner estimates count at most this many rows
+
+
+class CursorPage:
+    """One page of results; iterate it like a list"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, estimated_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_total = estimated_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """
+    Paginate `queryset` by `ordering`, e.g. ['-created_at', '-id'].
+    The last ordering field must be unique (normally the primary key) so every
+    row has a distinct position; fields may follow relations ('category__order').
+    With estimate_total, pages carry an approximate row count (PostgreSQL's
+    planner estimate, or a count capped at ESTIMATE_CAP elsewhere).
+    """
+
+    def __init__(self, queryset, ordering, per_page, estimate_total=False):
+        self.queryset = queryset
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.per_page = per_page
+        self.estimate_total = estimate_total
+
+    # ---------- cursors ----------
+    def encode_cursor(self, obj, direction):
+        values = [self.value_of(obj, field) for field, _ in self.ordering]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':'), default=str).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor):
+        """(direction, values) or None for the first page (also for malformed cursors)"""
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            direction, raw_values = data['d'], data['v']
+            if direction not in ('next', 'prev') or len(raw_values) != len(self.ordering):
+                return None
+            values = [
+                self.model_field(field).to_python(value)
+                for (field, _), value in zip(self.ordering, raw_values)
+            ]
+        except (ValueError, TypeError, KeyError, ValidationError):
+            return None
+        return direction, values
+
+    def value_of(self, obj, path):
+        for name in path.split('__'):
+            obj = getattr(obj, name)
+        return obj
+
+    def model_field(self, path):
+        model = self.queryset.model
+        names = path.split('__')
+        for name in names[:-1]:
+            model = model._meta.get_field(name).related_model
+        return model._meta.get_field(names[-1])
+
+    # ---------- queries ----------
+    def after(self, values, reverse=False):
+        """Rows strictly after `values` in the ordering (before them with reverse)"""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def order_by(self, reverse=False):
+        return [
+            f'{"-" if descending != reverse else ""}{field}' for field, descending in self.ordering
+        ]
+
+    def page(self, cursor=None):
+        """The page after (or before) `cursor`; the first page without one"""
+        position = self.decode_cursor(cursor)
+        backwards = position is not None and position[0] == 'prev'
+
+        rows = self.queryset.order_by(*self.order_by(reverse=backwards))
+        if position is not None:
+            rows = rows.filter(self.after(position[1], reverse=backwards))
+        items = list(rows[:self.per_page + 1])
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if backwards:
+            items.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = position is not None, more
+
+        return CursorPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1], 'next') if items and has_next else None,
+            previous_cursor=self.encode_cursor(items[0], 'prev') if items and has_previous else None,
+            estimated_total=self.estimated_total() if self.estimate_total else None,
+        )
+
+    def estimated_total(self):
+        """Approximate row count without a full COUNT(*) over a large table"""
+        if connection.vendor == 'postgresql':
+            plan = json.loads(self.queryset.order_by().explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows'])
+        return self.queryset.order_by()[:ESTIMATE_CAP].count()
+
+
+def paginate(request, queryset, ordering, per_page, estimate_total=False):
+    """Page of `queryset` for the `cursor` query parameter of a request"""
+    paginator = CursorPaginator(queryset, ordering, per_page, estimate_total=estimate_total)
+    return paginator.page(request.GET.get('cursor'))
@@ -0,0 +1,89 @@
+"""
+Content Rendering for Signox
+Markdown to sanitised HTML for lesson content and video descriptions, and
+plain-text paragraphs for forum posts. Models store the result in *_html
+columns when they are saved, so pages do not render anything per view; the
+`markdown` template filter covers other text through a content-hash cache.
+
+markdown.Markdown and bleach's Cleaner are costly to build and not safe to share
+between threads, so each thread builds one of each and reuses it.
+"""
+import hashlib
+import threading
+import bleach
+import markdown
+from django.core.cache import cache
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.safestring import mark_safe
+
+
+# Allowed HTML tags and attributes for sanitization
+ALLOWED_TAGS = [
+    'p', 'br', 'strong', 'em', 'u', 's', 'code', 'pre', 'blockquote',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'li',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+    'a', 'img',
+    'hr', 'div', 'span',
+]
+
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan'],
+}
+
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.fenced_code',  # ```code blocks```
+    'markdown.extensions.tables',        # | tables |
+    'markdown.extensions.nl2br',         # newlines to <br>
+    'markdown.extensions.sane_lists',    # better list handling
+]
+
+# Bump when the extensions or allowed markup change, so cached HTML is rebuilt
+RENDER_VERSION = 1
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+_local = threading.local()
+
+
+def get_renderer():
+    """This thread's (Markdown, Cleaner) pair"""
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = (
+            markdown.Markdown(extensions=MARKDOWN_EXTENSIONS),
+            bleach.sanitizer.Cleaner(tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True),
+        )
+    return renderer
+
+
+def render_markdown(text):
+    """Markdown text as sanitised HTML (XSS-safe)"""
+    if not text:
+        return ''
+    md, cleaner = get_renderer()
+    # reset() clears state (footnotes, references) left over from the previous document
+    html = md.reset().convert(text)
+    return cleaner.clean(html)
+
+
+def render_text(text):
+    """Plain text as escaped HTML paragraphs, as the |linebreaks filter renders it"""
+    if not text:
+        return ''
+    return str(linebreaks_filter(text, autoescape=True))
+
+
+def cached_markdown(text):
+    """render_markdown through the cache, keyed by a hash of the text"""
+    if not text:
+        return mark_safe('')
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    key = f'markdown_{RENDER_VERSION}_{digest}'
+    html = cache.get(key)
+    if html is None:
+        html = render_markdown(text)
+        cache.set(key, html, RENDER_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,306 @@
+"""
+Scheduling Service for Signox
+Spaced-repetition maths expressed over NumPy arrays, so a single rating
+and a bulk reschedule of millions of reviews share the same code.
+
+Two schedulers are available: the simplified SM-2 the app started with and an
+FSRS-style memory model (stability/difficulty). Both states are kept up to date
+on every rating; the active scheduler only decides the next interval.
+"""
+from abc import ABC, abstractmethod
+import numpy as np
+from django.conf import settings
+
+
+# ============================================
+# SM-2 PARAMETERS
+# ============================================
+SM2_DEFAULTS = {
+    'min_ease': 1.3,
+    'max_ease': 3.0,
+    'hard_ease_penalty': 0.15,
+    'easy_ease_bonus': 0.1,
+    'hard_interval_factor': 0.5,
+    'easy_interval_factor': 1.3,
+    'first_good_interval': 1,
+    'second_good_interval': 3,
+    'first_easy_interval': 4,
+}
+
+
+def get_sm2_params(overrides=None):
+    """SM-2 parameters: defaults, then settings.SM2_PARAMS, then explicit overrides"""
+    params = dict(SM2_DEFAULTS)
+    params.update(getattr(settings, 'SM2_PARAMS', {}))
+    params.update(overrides or {})
+    return params
+
+
+# ============================================
+# VECTORISED SM-2
+# ============================================
+def sm2_step(ease_factor, interval, repetitions, rating, params=None):
+    """
+    Apply ratings (1=Again, 2=Hard, 3=Good, 4=Easy) to arrays of card state.
+    Inputs broadcast against each other; returns new (ease_factor, interval, repetitions) arrays.
+    """
+    p = get_sm2_params(params)
+    ease, interval, reps, rating = np.broadcast_arrays(
+        np.asarray(ease_factor, dtype=np.float64),
+        np.asarray(interval, dtype=np.int64),
+        np.asarray(repetitions, dtype=np.int64),
+        np.asarray(rating, dtype=np.int64),
+    )
+
+    again = rating <= 1
+    hard = rating == 2
+    good = rating == 3
+    easy = rating >= 4
+
+    new_interval = np.select(
+        [
+            again,
+            hard,
+            good & (reps == 0),
+            good & (reps == 1),
+            good,
+            easy & (reps == 0),
+        ],
+        [
+            np.zeros_like(interval),
+            np.maximum(1, np.floor(interval * p['hard_interval_factor'])),
+            np.full_like(interval, p['first_good_interval']),
+            np.full_like(interval, p['second_good_interval']),
+            np.floor(interval * ease),
+            np.full_like(interval, p['first_easy_interval']),
+        ],
+        default=np.floor(interval * ease * p['easy_interval_factor']),
+    ).astype(np.int64)
+
+    new_reps = np.where(again | hard, 0, reps + 1)
+
+    new_ease = np.where(hard, np.maximum(p['min_ease'], ease - p['hard_ease_penalty']), ease)
+    new_ease = np.where(easy, np.minimum(p['max_ease'], ease + p['easy_ease_bonus']), new_ease)
+
+    return new_ease, new_interval, new_reps
+
+
+def sm2_next(ease_factor, interval, repetitions, rating, params=None):
+    """Apply one rating to one card, returning plain Python (ease_factor, interval, repetitions)"""
+    ease, interval, reps = sm2_step(ease_factor, interval, repetitions, rating, params)
+    return float(ease), int(interval), int(reps)
+
+
+def rescale(ease_factor, interval, interval_scale=1.0, max_interval=None, params=None):
+    """
+    Re-fit existing card state to new parameters: clamp ease to the allowed range
+    and scale intervals (at least 1 day for cards already in progression).
+    Returns new (ease_factor, interval) arrays.
+    """
+    p = get_sm2_params(params)
+    ease = np.clip(np.asarray(ease_factor, dtype=np.float64), p['min_ease'], p['max_ease'])
+    interval = np.asarray(interval, dtype=np.int64)
+
+    scaled = np.where(interval > 0, np.maximum(1, np.floor(interval * interval_scale)), 0)
+    if max_interval is not None:
+        scaled = np.minimum(scaled, max_interval)
+    return ease, scaled.astype(np.int64)
+
+
+def due_dates(base_dates, interval, shift_days=0):
+    """Add intervals (plus an optional shift) to an array of dates; returns datetime.date objects"""
+    days = np.asarray(base_dates, dtype='datetime64[D]')
+    return (days + np.asarray(interval, dtype=np.int64) + shift_days).astype(object)
+
+
+# ============================================
+# FSRS-STYLE MEMORY MODEL
+# ============================================
+# Default FSRS-4.5 weights
+FSRS_WEIGHTS = np.array([
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+])
+FSRS_DECAY = -0.5
+FSRS_FACTOR = 19 / 81  # Makes retrievability exactly 90% when elapsed days == stability
+FSRS_MAX_INTERVAL = 3650
+
+
+def retrievability(elapsed_days, stability, stability_scale=1.0):
+    """Probability of recall after elapsed_days for cards with the given stability"""
+    stability = np.maximum(np.asarray(stability, dtype=np.float64) * stability_scale, 1e-6)
+    return (1 + FSRS_FACTOR * np.asarray(elapsed_days, dtype=np.float64) / stability) ** FSRS_DECAY
+
+
+def fsrs_step(stability, difficulty, elapsed_days, rating, stability_scale=1.0, weights=None):
+    """
+    Update FSRS memory state for arrays of cards.
+    Cards with stability 0 have never been rated and get their initial state from the rating.
+    Returns new (stability, difficulty) arrays.
+    """
+    w = FSRS_WEIGHTS if weights is None else np.asarray(weights, dtype=np.float64)
+    stability, difficulty, elapsed, rating = np.broadcast_arrays(
+        np.asarray(stability, dtype=np.float64),
+        np.asarray(difficulty, dtype=np.float64),
+        np.asarray(elapsed_days, dtype=np.float64),
+        np.clip(np.asarray(rating, dtype=np.int64), 1, 4),
+    )
+    first = stability <= 0
+    grade = rating.astype(np.float64)
+
+    init_stability = w[rating - 1]
+    init_difficulty = np.clip(w[4] - (grade - 3) * w[5], 1, 10)
+
+    # Difficulty moves with the grade and reverts slightly towards the "Good" default
+    next_difficulty = difficulty - w[6] * (grade - 3)
+    next_difficulty = np.clip(w[7] * w[4] + (1 - w[7]) * next_difficulty, 1, 10)
+
+    safe_stability = np.where(first, 1.0, stability)
+    recall = retrievability(elapsed, safe_stability, stability_scale)
+    hard_penalty = np.where(rating == 2, w[15], 1.0)
+    easy_bonus = np.where(rating == 4, w[16], 1.0)
+    recalled = safe_stability * (
+        1 + np.exp(w[8]) * (11 - difficulty) * safe_stability ** -w[9]
+        * (np.exp(w[10] * (1 - recall)) - 1) * hard_penalty * easy_bonus
+    )
+    forgotten = (
+        w[11] * np.maximum(difficulty, 1) ** -w[12] * ((safe_stability + 1) ** w[13] - 1)
+        * np.exp(w[14] * (1 - recall))
+    )
+    next_stability = np.where(rating == 1, np.minimum(forgotten, safe_stability), recalled)
+
+    return (
+        np.where(first, init_stability, next_stability),
+        np.where(first, init_difficulty, next_difficulty),
+    )
+
+
+def fsrs_interval(stability, stability_scale=1.0, desired_retention=0.9, max_interval=FSRS_MAX_INTERVAL):
+    """Days until recall probability drops to desired_retention"""
+    stability = np.asarray(stability, dtype=np.float64) * stability_scale
+    days = stability / FSRS_FACTOR * (desired_retention ** (1 / FSRS_DECAY) - 1)
+    return np.clip(np.round(days), 1, max_interval).astype(np.int64)
+
+
+# ============================================
+# PLUGGABLE SCHEDULERS
+# ============================================
+class Scheduler(ABC):
+    """
+    Picks the next interval for cards whose SM-2 and memory states were just updated.
+    `cards` is a dict of arrays (ease_factor, interval, repetitions, stability,
+    difficulty, rating) and `params` a SchedulerParams-like object.
+    """
+    name = ''
+    label = ''
+
+    @abstractmethod
+    def intervals(self, cards, params):
+        """Next interval in days for each card"""
+
+
+class SM2Scheduler(Scheduler):
+    name = 'sm2'
+    label = 'SM-2'
+
+    def intervals(self, cards, params):
+        return cards['interval']
+
+
+class FSRSScheduler(Scheduler):
+    name = 'fsrs'
+    label = 'FSRS'
+
+    def intervals(self, cards, params):
+        days = fsrs_interval(
+            cards['stability'], params.stability_scale, params.desired_retention
+        )
+        # "Again" keeps the card in today's queue, like SM-2
+        return np.where(cards['rating'] <= 1, 0, days)
+
+
+SCHEDULERS = {scheduler.name: scheduler for scheduler in [SM2Scheduler(), FSRSScheduler()]}
+SCHEDULER_CHOICES = [(name, scheduler.label) for name, scheduler in SCHEDULERS.items()]
+
+
+def get_scheduler(name=None):
+    """Scheduler by name, falling back to settings.FLASHCARD_SCHEDULER"""
+    name = name or getattr(settings, 'FLASHCARD_SCHEDULER', 'sm2')
+    return SCHEDULERS.get(name, SCHEDULERS['sm2'])
+
+
+def review_step(cards, rating, elapsed_days, params):
+    """
+    Apply ratings to arrays of card state with the scheduler chosen in params.
+    Returns a new dict with updated ease_factor, repetitions, stability,
+    difficulty and the interval picked by the scheduler.
+    """
+    ease, sm2_days, reps = sm2_step(
+        cards['ease_factor'], cards['interval'], cards['repetitions'], rating
+    )
+    stability, difficulty = fsrs_step(
+        cards['stability'], cards['difficulty'], elapsed_days, rating, params.stability_scale
+    )
+    updated = {
+        'ease_factor': ease,
+        'interval': sm2_days,
+        'repetitions': reps,
+        'stability': stability,
+        'difficulty': difficulty,
+        'rating': np.asarray(rating),
+    }
+    updated['interval'] = np.asarray(
+        get_scheduler(params.scheduler_name).intervals(updated, params), dtype=np.int64
+    )
+    return updated
+
+
+def review_next(card, rating, elapsed_days, params):
+    """Apply one rating to one card's state dict, returning plain Python values"""
+    updated = review_step(card, rating, elapsed_days, params)
+    return {
+        'ease_factor': float(updated['ease_factor']),
+        'interval': int(updated['interval']),
+        'repetitions': int(updated['repetitions']),
+        'stability': float(updated['stability']),
+        'difficulty': float(updated['difficulty']),
+    }
+
+
+# ============================================
+# PER-USER PARAMETER FITTING
+# ============================================
+MIN_STABILITY_SCALE = 0.25
+MAX_STABILITY_SCALE = 4.0
+
+
+def fit_stability_scales(user_index, elapsed_days, stability, trials, successes,
+                         user_count, iterations=100, learning_rate=0.5, prior_weight=5.0):
+    """
+    Fit one stability scale per user by batched gradient descent on the binomial
+    log-loss of predicted recall. All users in the batch are optimised together;
+    per-user gradients are summed with np.bincount, so each step is O(samples).
+    A prior pulls users with little history towards the default scale of 1.
+    Returns an array of scales, one per user index.
+    """
+    user_index = np.asarray(user_index, dtype=np.int64)
+    elapsed = np.maximum(np.asarray(elapsed_days, dtype=np.float64), 0)
+    stability = np.maximum(np.asarray(stability, dtype=np.float64), 1e-6)
+    trials = np.asarray(trials, dtype=np.float64)
+    successes = np.asarray(successes, dtype=np.float64)
+    failures = trials - successes
+
+    weight = np.bincount(user_index, weights=trials, minlength=user_count) + prior_weight
+    log_scale = np.zeros(user_count)
+    bounds = np.log(MIN_STABILITY_SCALE), np.log(MAX_STABILITY_SCALE)
+
+    for _ in range(iterations):
+        x = FSRS_FACTOR * elapsed / (stability * np.exp(log_scale[user_index]))
+        recall = np.clip((1 + x) ** FSRS_DECAY, 1e-6, 1 - 1e-6)
+        d_recall = -FSRS_DECAY * x * (1 + x) ** (FSRS_DECAY - 1)
+        d_loss = (failures / (1 - recall) - successes / recall) * d_recall
+        gradient = np.bincount(user_index, weights=d_loss, minlength=user_count)
+        gradient = (gradient + prior_weight * log_scale) / weight
+        log_scale = np.clip(log_scale - learning_rate * gradient, *bounds)
+
+    return np.exp(log_scale)
@@ -0,0 +1,755 @@
+"""
+Search Service for Signox
+Relevance-ranked search over lessons, videos, vocabulary and forum posts.
+
+Two backends share one interface:
+- InMemoryBackend: a per-process inverted index with BM25 ranking over
+  accent-folded tokens ("xin chao" finds "Xin chào"). Built on first use and
+  kept up to date by model signals; other processes apply the same changes
+  from a change log in the database.
+- PostgresBackend: tsvector matching and ts_rank ordering over accent-folded
+  lexemes, served by the GIN indexes of migration 0020 (PostgreSQL only).
+
+Typeahead suggestions come from an in-memory prefix trie (falling back to similar
+vocabulary words when nothing starts with the prefix), and fuzzy vocabulary lookup
+without pg_trgm from an in-memory trigram index, both maintained the same way.
+
+settings.SEARCH_BACKEND picks one ('memory', 'postgres'); the default 'auto'
+uses Postgres when the database is PostgreSQL.
+"""
+import bisect
+from abc import ABC, abstractmethod
+import math
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+from .models import IndexChange, IndexVersion, Lesson, Video, Vocabulary, ForumPost
+from .utils import fold_text, tokenize, trigrams
+
+
+MIN_QUERY_LENGTH = 2
+MAX_SUGGESTIONS = 8
+MIN_CORRECTION_LENGTH = 3  # Shorter prefixes share too few trigrams to guess a typo
+MAX_SUGGESTION_KEY = 40  # Characters of each title indexed in the suggestion trie
+MAX_PREFIX_EXPANSIONS = 50  # Index terms a partial query word may expand to
+SNIPPET_WORDS = 30
+VERSION_CHECK_INTERVAL = 5  # Seconds between checks for changes made by other processes
+MAX_CHANGES_APPLIED = 1000  # Logged changes applied one by one; more than this rebuilds
+CHANGE_SETTLE_SECONDS = 60  # Logged changes this recent are applied again on the next check
+
+
+# ============================================
+# SEARCHABLE CONTENT
+# ============================================
+class SearchType:
+    """
+    One searchable model. `fields` are (field name, BM25 weight, tsvector weight);
+    `visible` limits the index to content students can open. `link` is the
+    (slug column, URL name) a typeahead suggestion opens, if the type has suggestions.
+    """
+
+    def __init__(self, name, model, fields, visible, related=(), snippet_field=None, link=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.visible = visible
+        self.related = related
+        self.title_field = fields[0][0]
+        self.snippet_field = snippet_field or fields[1][0]
+        self.link = link
+
+    def queryset(self):
+        return self.model.objects.filter(self.visible).select_related(*self.related)
+
+    def field_names(self):
+        return [field for field, _, _ in self.fields]
+
+    def source_fields(self, columns=None):
+        """Model fields whose changes can alter this type's index entries (text, visibility, link)"""
+        fields = {column.split('__')[0] for column in columns or self.field_names()}
+        fields.update(lookup.split('__')[0] for lookup in q_lookups(self.visible))
+        if self.link:
+            fields.add(self.link[0].split('__')[0])
+        return fields
+
+    def lesson_fields(self):
+        """Lesson fields this type reads through `lesson__` lookups (visibility, link)"""
+        lookups = list(q_lookups(self.visible)) + ([self.link[0]] if self.link else [])
+        return {lookup.split('__')[1] for lookup in lookups if lookup.startswith('lesson__')}
+
+
+def q_lookups(q):
+    """Lookup strings ('lesson__is_published') used anywhere in a Q object"""
+    for child in q.children:
+        if isinstance(child, Q):
+            yield from q_lookups(child)
+        else:
+            yield child[0]
+
+
+SEARCH_TYPES = [
+    SearchType('lessons', Lesson, [
+        ('title', 3, 'A'), ('description', 2, 'B'), ('content', 1, 'C'),
+    ], Q(is_published=True), related=['category'], link=('slug', 'lesson_detail')),
+    SearchType('videos', Video, [
+        ('title', 3, 'A'), ('description', 1, 'B'),
+    ], Q(is_published=True), related=['category'], link=('slug', 'video_detail')),
+    SearchType('vocabulary', Vocabulary, [
+        ('word', 3, 'A'), ('meaning', 2, 'A'), ('description', 1, 'B'),
+    ], Q(lesson__is_published=True), related=['lesson'], snippet_field='description',
+       link=('lesson__slug', 'lesson_detail')),
+    SearchType('forum', ForumPost, [
+        ('title', 3, 'A'), ('content', 1, 'B'),
+    ], Q(), related=['author']),
+]
+
+
+def query_terms(query):
+    """Folded, de-duplicated words of a query, in order"""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+# ============================================
+# BACKENDS
+# ============================================
+class SearchBackend(ABC):
+    """
+    `search` returns {type name: [(object id, score), ...]} best first.
+    `update` and `remove` are called when content changes.
+    """
+    name = ''
+
+    @abstractmethod
+    def search(self, query, limit=10):
+        """Ranked hits for a query (see the class docstring)"""
+
+    def update(self, instance, update_fields=None):
+        pass
+
+    def remove(self, instance):
+        pass
+
+
+class ProcessIndex(ABC):
+    """
+    Base for indexes held in process memory and kept current from model signals.
+    Each change is logged in the database (IndexChange) under the index's key,
+    and other worker processes re-read just the logged objects. Workers look at
+    the log at most every VERSION_CHECK_INTERVAL seconds, so lookups in between
+    do not touch the database. They rebuild only when the generation changes
+    (IndexVersion.publish), when the changes they missed were pruned, or when
+    more than MAX_CHANGES_APPLIED piled up.
+    Subclasses say which columns they read and how a row is added or removed.
+    """
+    version_key = ''
+    search_types = SEARCH_TYPES
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.last_change = 0  # Changes up to this id are in the index
+        self.checked_at = 0.0
+        self.reset()
+
+    @abstractmethod
+    def reset(self):
+        """Start from an empty index"""
+
+    @abstractmethod
+    def columns(self, search_type):
+        """Columns read for each row of a search type"""
+
+    @abstractmethod
+    def add_row(self, search_type, row):
+        """Index one (id, *columns) row"""
+
+    @abstractmethod
+    def discard(self, key):
+        """Drop one (type name, id) entry, if indexed"""
+
+    def search_type_for(self, model):
+        return next((search_type for search_type in self.search_types if search_type.model is model), None)
+
+    def rows(self, search_type, ids=None):
+        rows = search_type.model.objects.filter(search_type.visible)
+        if ids is not None:
+            rows = rows.filter(id__in=ids)
+        return rows.values_list('id', *self.columns(search_type)).iterator(chunk_size=2000)
+
+    # ---------- building ----------
+    def build(self):
+        """Index all visible content (one query per content type)"""
+        with self.lock:
+            version, _ = IndexVersion.state(self.version_key)
+            last_change = IndexChange.last_id(self.version_key)  # Read first: later changes are applied again
+            self.reset()
+            for search_type in self.search_types:
+                for row in self.rows(search_type):
+                    self.add_row(search_type, row)
+            self.version = version
+            self.last_change = last_change
+            self.checked_at = time.monotonic()
+
+    def ensure_current(self):
+        """Build on first use, then apply changes made by other processes"""
+        if self.version is None:
+            self.build()
+        elif time.monotonic() - self.checked_at >= VERSION_CHECK_INTERVAL:
+            self.checked_at = time.monotonic()
+            self.catch_up()
+
+    def catch_up(self):
+        """Re-read the objects changed since the last check, or rebuild on a gap in the log"""
+        version, pruned_through = IndexVersion.state(self.version_key)
+        if version != self.version or pruned_through > self.last_change:
+            self.build()
+            return
+        changes = list(IndexChange.objects.filter(
+            key=self.version_key, id__gt=self.last_change
+        ).order_by('id').values_list('id', 'model', 'object_id', 'created_at')[:MAX_CHANGES_APPLIED + 1])
+        if len(changes) > MAX_CHANGES_APPLIED:
+            self.build()
+            return
+        if not changes:
+            return
+
+        changed = defaultdict(set)
+        for _, label, object_id, _ in changes:
+            changed[label].add(object_id)
+        # A change committed late can carry a lower id than one already read, so
+        # recent changes are applied again on the next check instead of skipped
+        settled = timezone.now() - timedelta(seconds=CHANGE_SETTLE_SECONDS)
+        with self.lock:
+            for label, ids in changed.items():
+                self.refresh(apps.get_model(label), list(ids))
+            for change_id, _, _, created_at in changes:
+                if created_at >= settled:
+                    break
+                self.last_change = change_id
+
+    # ---------- incremental updates ----------
+    def source_fields(self, model):
+        """Fields of `model` whose changes can alter this index (lessons also through their vocabulary)"""
+        fields = set()
+        for search_type in self.search_types:
+            if search_type.model is model:
+                fields |= search_type.source_fields(self.columns(search_type))
+            elif model is Lesson and search_type.model is Vocabulary:
+                fields |= search_type.lesson_fields()
+        return fields
+
+    def update(self, instance, update_fields=None):
+        """
+        Apply a saved or deleted object here and log it, under this index's own
+        key, for the other processes. Objects this index can't be affected by
+        (forum posts in the trigram index, a lesson's content in the suggestion
+        trie) are neither applied nor logged.
+        """
+        fields = self.source_fields(type(instance))
+        if not fields:
+            return
+        if update_fields is not None:
+            if not fields & {instance._meta.get_field(name).name for name in update_fields}:
+                return
+        with self.lock:
+            if self.version is not None:
+                self.refresh(type(instance), [instance.id])
+        IndexChange.record(self.version_key, instance)
+
+    def remove(self, instance):
+        # Deleted rows are no longer visible, so re-reading them drops them
+        self.update(instance)
+
+    def refresh(self, model, ids):
+        """Re-read objects of one model, and the vocabulary of lessons (publishing or a slug changes it)"""
+        search_type = self.search_type_for(model)
+        if search_type:
+            self.reindex(search_type, ids)
+        vocabulary = self.search_type_for(Vocabulary) if model is Lesson else None
+        if vocabulary:
+            self.reindex(vocabulary, list(
+                Vocabulary.objects.filter(lesson_id__in=ids).values_list('id', flat=True)
+            ))
+
+    def reindex(self, search_type, ids):
+        """Re-read rows from the database; invisible or missing ones leave the index"""
+        found = set()
+        for row in self.rows(search_type, ids):
+            found.add(row[0])
+            self.add_row(search_type, row)
+        for object_id in set(ids) - found:
+            self.discard((search_type.name, object_id))
+
+
+class InMemoryBackend(ProcessIndex, SearchBackend):
+    """BM25 over an inverted index of folded tokens, held in process memory"""
+    name = 'memory'
+    version_key = 'search_index'
+    k1 = 1.2
+    b = 0.75
+
+    def reset(self):
+        self.postings = defaultdict(dict)  # term -> {(type name, id): weighted term frequency}
+        self.documents = {}  # (type name, id) -> {term: weighted term frequency}
+        self.lengths = {}  # (type name, id) -> document length
+        self.total_length = 0
+        self.sorted_terms = None  # Rebuilt lazily for prefix lookups
+
+    def columns(self, search_type):
+        return search_type.field_names()
+
+    def add_row(self, search_type, row):
+        """Store weighted term frequencies of one document"""
+        terms = defaultdict(int)
+        for (field, weight, _), text in zip(search_type.fields, row[1:]):
+            for term in tokenize(strip_tags(text or '')):
+                terms[term] += weight
+        self.add((search_type.name, row[0]), terms)
+
+    def add(self, key, terms):
+        self.discard(key)
+        if not terms:
+            return
+        self.documents[key] = terms
+        self.lengths[key] = sum(terms.values())
+        self.total_length += self.lengths[key]
+        for term, frequency in terms.items():
+            if term not in self.postings:
+                self.sorted_terms = None
+            self.postings[term][key] = frequency
+
+    def discard(self, key):
+        terms = self.documents.pop(key, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(key)
+        for term in terms:
+            documents = self.postings[term]
+            documents.pop(key, None)
+            if not documents:
+                del self.postings[term]
+                self.sorted_terms = None
+
+    # ---------- querying ----------
+    def expand(self, term):
+        """The term itself if indexed, otherwise indexed terms starting with it"""
+        if term in self.postings:
+            return [term]
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.postings)
+        start = bisect.bisect_left(self.sorted_terms, term)
+        matches = []
+        for candidate in self.sorted_terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, limit=10):
+        self.ensure_current()
+        with self.lock:
+            count = len(self.documents)
+            if not count:
+                return {}
+            average_length = self.total_length / count
+            scores = defaultdict(float)
+            for query_term in query_terms(query):
+                for term in self.expand(query_term):
+                    documents = self.postings[term]
+                    idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+                    for key, frequency in documents.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average_length)
+                        scores[key] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = defaultdict(list)
+        for (type_name, object_id), score in sorted(scores.items(), key=lambda item: -item[1]):
+            if len(ranked[type_name]) < limit:
+                ranked[type_name].append((object_id, score))
+        return ranked
+
+
+class PostgresBackend(SearchBackend):
+    """
+    Full-text search in PostgreSQL. The tsvector expression is the one the GIN
+    indexes are built on, so matching uses the index. The configuration (created
+    in migration 0020) is 'simple' behind the unaccent dictionary: Vietnamese
+    words stay intact but are folded on both sides, so "xin chao" finds "Xin chào"
+    as with the in-memory backend.
+    """
+    name = 'postgres'
+    config = 'signox_unaccent'
+
+    @classmethod
+    def vector(cls, search_type):
+        from django.contrib.postgres.search import SearchVector
+        vector = None
+        for field, _, weight in search_type.fields:
+            part = SearchVector(field, weight=weight, config=cls.config)
+            vector = part if vector is None else vector + part
+        return vector
+
+    def matches(self, search_type, query):
+        """Visible rows of one type matching a query, best first, with their `rank`"""
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+        vector = self.vector(search_type)
+        return search_type.model.objects.annotate(
+            search=vector, rank=SearchRank(vector, search_query)
+        ).filter(search_type.visible, search=search_query).order_by('-rank', 'id')
+
+    def search(self, query, limit=10):
+        return {
+            search_type.name: list(self.matches(search_type, query).values_list('id', 'rank')[:limit])
+            for search_type in SEARCH_TYPES
+        }
+
+
+# ============================================
+# TYPEAHEAD SUGGESTIONS
+# ============================================
+class TrieNode:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()  # (type name, id) of titles ending here
+
+
+class SuggestionIndex(ProcessIndex):
+    """
+    Prefix trie of folded lesson titles, vocabulary words and video titles.
+    Every word of a title starts a key, so "chao" suggests "Xin chào" too.
+    Lookups only walk memory; the database is read when the trie is built.
+    """
+    version_key = 'search_suggestions'
+    search_types = [search_type for search_type in SEARCH_TYPES if search_type.link]
+
+    def reset(self):
+        self.root = TrieNode()
+        self.entries = {}  # (type name, id) -> (label, url, trie keys)
+        self.url_patterns = {}
+
+    def columns(self, search_type):
+        return [search_type.title_field, search_type.link[0]]
+
+    def add_row(self, search_type, row):
+        object_id, label, slug = row
+        key = (search_type.name, object_id)
+        self.discard(key)
+        words = tokenize(label)
+        if not words or not slug:
+            return
+        trie_keys = {' '.join(words[start:])[:MAX_SUGGESTION_KEY] for start in range(len(words))}
+        for trie_key in trie_keys:
+            node = self.root
+            for char in trie_key:
+                node = node.children.setdefault(char, TrieNode())
+            node.keys.add(key)
+        self.entries[key] = (label, self.link_url(search_type, slug), trie_keys)
+
+    def link_url(self, search_type, slug):
+        # Reverse once per URL name and fill in slugs, instead of reversing per row
+        pattern = self.url_patterns.get(search_type.name)
+        if pattern is None:
+            pattern = self.url_patterns[search_type.name] = reverse(search_type.link[1], args=['__slug__'])
+        return pattern.replace('__slug__', slug)
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for trie_key in entry[2]:
+            path = [self.root]
+            for char in trie_key:
+                path.append(path[-1].children[char])
+            path[-1].keys.discard(key)
+            # Prune branches that no longer lead to any title
+            for depth in range(len(trie_key), 0, -1):
+                node = path[depth]
+                if node.keys or node.children:
+                    break
+                del path[depth - 1].children[trie_key[depth - 1]]
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Titles with a word starting with `prefix`, shortest completions first and
+        titles that start with the prefix ahead of the rest.
+        Returns [{'type', 'label', 'url'}].
+        """
+        folded = ' '.join(tokenize(prefix))[:MAX_SUGGESTION_KEY]
+        if len(folded) < MIN_QUERY_LENGTH:
+            return []
+        self.ensure_current()
+        with self.lock:
+            node = self.root
+            for char in folded:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+
+            # Breadth-first, so the walk stops early on short, busy prefixes
+            found = {}
+            queue = deque([node])
+            while queue and len(found) < limit * 4:
+                node = queue.popleft()
+                for key in node.keys:
+                    found.setdefault(key, self.entries[key])
+                queue.extend(node.children.values())
+            entries = list(found.items())
+
+        type_order = [search_type.name for search_type in self.search_types]
+        entries.sort(key=lambda item: (
+            not ' '.join(tokenize(item[1][0])).startswith(folded),
+            type_order.index(item[0][0]),
+            len(item[1][0]),
+        ))
+        suggestions, seen = [], set()
+        for (type_name, _), (label, url, _) in entries:
+            if (type_name, label) in seen:
+                continue
+            seen.add((type_name, label))
+            suggestions.append({'type': type_name, 'label': label, 'url': url})
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+    def corrections(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Vocabulary words that look like `prefix` (trigram similarity, see
+        dictionary.fuzzy_matches), most similar first, for when no title starts with it.
+        Unlike suggest() this may read the database, so it only runs on a miss.
+        """
+        from .dictionary import fuzzy_matches, published_vocabulary
+        folded = ' '.join(tokenize(prefix))[:MAX_SUGGESTION_KEY]
+        if len(folded) < MIN_CORRECTION_LENGTH:
+            return []
+        scores = fuzzy_matches(folded, published_vocabulary(), limit)
+        self.ensure_current()
+        suggestions = []
+        with self.lock:
+            for vocab_id, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+                entry = self.entries.get(('vocabulary', vocab_id))
+                if entry:
+                    suggestions.append({'type': 'vocabulary', 'label': entry[0], 'url': entry[1]})
+        return suggestions[:limit]
+
+
+# ============================================
+# VOCABULARY TRIGRAMS
+# ============================================
+class TrigramIndex(ProcessIndex):
+    """
+    In-process trigram index of normalised vocabulary words and meanings, for
+    fuzzy lookup on databases without pg_trgm. Similarity is the Jaccard index
+    of trigram sets, as in pg_trgm's similarity().
+    """
+    version_key = 'vocabulary_trigrams'
+    search_types = [SearchType('vocabulary', Vocabulary, [
+        ('word_normalized', 1, 'A'), ('meaning_normalized', 1, 'B'),
+    ], Q(lesson__is_published=True))]
+
+    def reset(self):
+        self.postings = defaultdict(set)  # trigram -> vocabulary ids
+        self.grams = {}  # vocabulary id -> (word trigrams, meaning trigrams)
+
+    def columns(self, search_type):
+        return search_type.field_names()
+
+    def add_row(self, search_type, row):
+        vocab_id, word, meaning = row
+        self.discard((search_type.name, vocab_id))
+        grams = (frozenset(trigrams(word)), frozenset(trigrams(meaning)))
+        self.grams[vocab_id] = grams
+        for gram in grams[0] | grams[1]:
+            self.postings[gram].add(vocab_id)
+
+    def discard(self, key):
+        grams = self.grams.pop(key[1], None)
+        if grams is None:
+            return
+        for gram in grams[0] | grams[1]:
+            self.postings[gram].discard(key[1])
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def similar(self, text, threshold=0.3, limit=20):
+        """[(vocabulary id, similarity)] best first, for words or meanings similar to text"""
+        query = frozenset(trigrams(text))
+        if not query:
+            return []
+        self.ensure_current()
+        with self.lock:
+            # A match shares at least ceil(threshold * |query|) trigrams with the query,
+            # so it must contain one of the rarest |query| - that + 1 (prefix filtering)
+            rarest = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))
+            probe = len(query) - math.ceil(threshold * len(query)) + 1
+            candidates = set()
+            for gram in rarest[:probe]:
+                candidates.update(self.postings.get(gram, ()))
+
+            scores = []
+            for vocab_id in candidates:
+                score = max(
+                    len(query & grams) / len(query | grams) if grams else 0
+                    for grams in self.grams[vocab_id]
+                )
+                if score >= threshold:
+                    scores.append((vocab_id, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:limit]
+
+
+BACKENDS = {backend.name: backend for backend in [InMemoryBackend, PostgresBackend]}
+_backend = None
+_suggestions = None
+_trigrams = None
+
+
+def get_backend():
+    """The configured backend (settings.SEARCH_BACKEND), created once per process"""
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if name not in BACKENDS:
+            name = 'postgres' if connection.vendor == 'postgresql' else 'memory'
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def get_suggestions():
+    """The process-wide typeahead suggestion index"""
+    global _suggestions
+    if _suggestions is None:
+        _suggestions = SuggestionIndex()
+    return _suggestions
+
+
+def get_trigram_index():
+    """The process-wide vocabulary trigram index (used when the database has no pg_trgm)"""
+    global _trigrams
+    if _trigrams is None:
+        _trigrams = TrigramIndex()
+    return _trigrams
+
+
+def suggest(prefix, limit=MAX_SUGGESTIONS):
+    """Typeahead suggestions for a partial query (see SuggestionIndex.suggest), or likely corrections of a typo"""
+    index = get_suggestions()
+    return index.suggest(prefix, limit) or index.corrections(prefix, limit)
+
+
+def indexes_any(model, update_fields):
+    """Whether saving only `update_fields` can change what any index holds for this model"""
+    changed = {model._meta.get_field(name).name for name in update_fields}
+    return any(
+        changed & search_type.source_fields()
+        for search_type in SEARCH_TYPES + TrigramIndex.search_types
+        if search_type.model is model
+    )
+
+
+def content_changed(instance, update_fields=None):
+    """Called from post_save of searchable models; saves of unindexed columns (view counts) are skipped"""
+    if update_fields is not None and not indexes_any(type(instance), update_fields):
+        return
+    get_backend().update(instance, update_fields)
+    get_suggestions().update(instance, update_fields)
+    if connection.vendor != 'postgresql':
+        get_trigram_index().update(instance, update_fields)
+
+
+def content_deleted(instance):
+    """Called from post_delete of searchable models"""
+    get_backend().remove(instance)
+    get_suggestions().remove(instance)
+    if connection.vendor != 'postgresql':
+        get_trigram_index().remove(instance)
+
+
+# ============================================
+# RESULTS
+# ============================================
+def highlight(text, terms, words=None):
+    """
+    HTML-escaped text with words matching the query terms wrapped in <mark>.
+    With `words`, returns a snippet of about that many words around the first match.
+    """
+    text = strip_tags(text or '')
+    matches = list(re.finditer(r'\w+', text))
+    hits = [
+        index for index, match in enumerate(matches)
+        if any(fold_text(match.group()).startswith(term) for term in terms)
+    ]
+
+    start, end = 0, len(text)
+    if words and len(matches) > words:
+        first = max(0, (hits[0] if hits else 0) - words // 4)
+        last = min(len(matches), first + words)
+        start = matches[first].start()
+        end = matches[last - 1].end()
+        hits = [index for index in hits if first <= index < last]
+
+    parts = ['&hellip;'] if start > 0 else []
+    position = start
+    for index in hits:
+        match = matches[index]
+        parts.append(escape(text[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        position = match.end()
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append('&hellip;')
+    return mark_safe(''.join(parts))
+
+
+def search(query, limit=10):
+    """
+    Ranked hits per content type, best first, as model instances with
+    `search_score`, `highlighted_title` and `snippet` attached.
+    Returns {'lessons': [...], 'videos': [...], 'vocabulary': [...], 'forum': [...], 'total_count': n}.
+    """
+    results = {search_type.name: [] for search_type in SEARCH_TYPES}
+    results['total_count'] = 0
+    terms = query_terms(query)
+    if len(query.strip()) < MIN_QUERY_LENGTH or not terms:
+        return results
+
+    ranked = get_backend().search(query, limit)
+    for search_type in SEARCH_TYPES:
+        hits = ranked.get(search_type.name) or []
+        if not hits:
+            continue
+        objects = search_type.queryset().in_bulk([object_id for object_id, _ in hits])
+        for object_id, score in hits:
+            obj = objects.get(object_id)
+            if obj is None:
+                continue
+            obj.search_score = score
+            results[search_type.name].append(obj)
+
+    # Typo-tolerant vocabulary matches fill up the list ("xin chao" finds "Xin chào" on any backend)
+    vocabulary = results['vocabulary']
+    if len(vocabulary) < limit:
+        from .dictionary import lookup
+        found = {vocab.id for vocab in vocabulary}
+        for vocab in lookup(query, limit=limit):
+            if vocab.id not in found and len(vocabulary) < limit:
+                vocab.search_score = vocab.similarity
+                vocabulary.append(vocab)
+
+    for search_type in SEARCH_TYPES:
+        for obj in results[search_type.name]:
+            obj.highlighted_title = highlight(getattr(obj, search_type.title_field), terms)
+            obj.snippet = highlight(getattr(obj, search_type.snippet_field), terms, SNIPPET_WORDS)
+        results['total_count'] += len(results[search_type.name])
+    return results
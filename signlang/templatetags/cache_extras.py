@@ -0,0 +1,13 @@
+from django import template
+from signlang.cache_tags import tag_versions
+
+register = template.Library()
+
+
+@register.simple_tag
+def content_version(*tags):
+    """
+    Versions of content tags, to vary {% cache %} fragments on, e.g.
+    {% content_version 'lesson' 'category' as version %}{% cache 600 home_lessons version LANGUAGE_CODE %}
+    """
+    return tag_versions(tags)
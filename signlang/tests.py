@@ -1,3 +1,1416 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+import csv
+import itertools
+import re
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresWrapper
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import bleach
+import markdown
 
-# Create your tests here.
+from . import cache_tags, dictionary, flashcards, forum, grading, page_cache, rendering, scheduling, search
+from .models import (
+    Answer, AnswerStats, Category, Comment, ForumPost, IndexChange, IndexVersion, Lesson, LessonMastery, Like,
+    Question, QuestionStats, Quiz, QuizAttempt, QuizBest, QuizSession, ReviewLog, SchedulerParams, Video,
+    VideoCategory, Vocabulary, VocabularyReview,
+)
+from .pagination import CursorPaginator
+
+
+def postgres_sql(queryset):
+    """SQL a queryset compiles to on PostgreSQL, without a PostgreSQL server"""
+    wrapper = PostgresWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+    sql, params = queryset.query.get_compiler(connection=wrapper).as_sql()
+    return sql % tuple(repr(param) for param in params)
+
+
+class DictionaryLookupTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.hello = Vocabulary.objects.create(
+            lesson=lesson, word='Xin chào', meaning='A greeting used when meeting someone'
+        )
+        search._trigrams = None
+
+    def tearDown(self):
+        search._trigrams = None
+
+    def test_matches_a_word_inside_the_meaning(self):
+        self.assertEqual(dictionary.lookup('meeting'), [self.hello])
+
+    def test_dictionary_page_counts_meaning_matches(self):
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        response = self.client.get(reverse('dictionary'), {'q': 'meeting'})
+        self.assertEqual(response.context['match_count'], 1)
+
+    def test_accent_insensitive_prefix(self):
+        self.assertEqual(dictionary.lookup('xin chao'), [self.hello])
+        self.assertEqual(dictionary.lookup('xin chao')[0].similarity, 1.0)
+
+    def test_trigram_matches_compile_for_postgres(self):
+        rows = dictionary.trigram_matches('xin chao', Vocabulary.objects.all(), 10)
+        sql = postgres_sql(rows)
+        self.assertIn('"word_normalized" % ', sql)
+        self.assertIn('SIMILARITY("signlang_vocabulary"."meaning_normalized"', sql)
+        self.assertIn('LIMIT 10', sql)
+
+
+class DictionaryIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        hidden = Lesson.objects.create(
+            title='H', slug='h', category=category, description='', content='', is_published=False
+        )
+        for word in ['ấm', 'ba', 'an', 'ăn', 'Ảnh', 'an', '1 số']:
+            Vocabulary.objects.create(lesson=self.lesson, word=word, meaning='m')
+        Vocabulary.objects.create(lesson=hidden, word='bí mật', meaning='m')
+
+    def test_letter_counts_in_dictionary_order(self):
+        self.assertEqual(dictionary.get_letter_counts(), [('A', 3), ('Ă', 1), ('Â', 1), ('B', 1), ('#', 1)])
+
+    def test_letter_counts_cached_until_vocabulary_changes(self):
+        dictionary.get_letter_counts()
+        with CaptureQueriesContext(connection) as queries:
+            dictionary.get_letter_counts()
+        self.assertEqual(len(queries), 0)
+        Vocabulary.objects.create(lesson=self.lesson, word='cá', meaning='m')
+        self.assertIn(('C', 1), dictionary.get_letter_counts())
+
+    def test_letter_pages_follow_the_cursor(self):
+        expected = list(
+            Vocabulary.objects.filter(letter='A').order_by('word_normalized', 'id').values_list('id', flat=True)
+        )
+        served, cursor = [], None
+        for _ in range(3):
+            page, cursor = dictionary.get_letter_page('A', cursor=cursor, limit=2)
+            served.extend(vocab.id for vocab in page)
+            if cursor is None:
+                break
+        self.assertEqual(served, expected)
+        self.assertIsNone(cursor)
+
+    def test_malformed_cursor_starts_over(self):
+        first, _ = dictionary.get_letter_page('A', limit=2)
+        page, _ = dictionary.get_letter_page('A', cursor='////', limit=2)
+        self.assertEqual(page, first)
+
+    def test_letter_api(self):
+        _, cursor = dictionary.get_letter_page('A', limit=2)
+        response = self.client.get(reverse('dictionary_letter_api'), {'letter': 'A', 'cursor': cursor}).json()
+        self.assertFalse(response['has_more'])
+        self.assertIn('Ảnh', response['html'])
+        self.assertEqual(self.client.get(reverse('dictionary_letter_api')).status_code, 400)
+
+
+class SearchIndexSignalTests(TestCase):
+    def setUp(self):
+        category = VideoCategory.objects.create(name='Greetings', slug='greetings')
+        self.video = Video.objects.create(title='Xin chào', slug='xin-chao', category=category, description='')
+
+    def test_view_count_save_skips_reindex(self):
+        with mock.patch.object(search, 'get_backend') as get_backend:
+            self.video.view_count += 1
+            self.video.save(update_fields=['view_count'])
+        get_backend.assert_not_called()
+
+    def test_indexed_field_save_reindexes(self):
+        with mock.patch.object(search, 'get_backend') as get_backend:
+            self.video.is_published = False
+            self.video.save(update_fields=['is_published'])
+        get_backend.return_value.update.assert_called_once_with(self.video, frozenset({'is_published'}))
+
+
+class SuggestionIndexTests(TestCase):
+    def setUp(self):
+        category = VideoCategory.objects.create(name='Greetings', slug='greetings')
+        Video.objects.create(title='Xin chào', slug='xin-chao', category=category, description='')
+        self.index = search.SuggestionIndex()
+
+    def labels(self, prefix):
+        return [suggestion['label'] for suggestion in self.index.suggest(prefix)]
+
+    def test_keystrokes_between_checks_skip_database(self):
+        self.assertEqual(self.labels('xin'), ['Xin chào'])
+        with CaptureQueriesContext(connection) as queries:
+            self.labels('chao')
+            self.labels('xi')
+        self.assertEqual(len(queries), 0)
+
+    def test_rebuilds_after_change_in_another_process(self):
+        self.labels('xin')
+        Video.objects.filter(slug='xin-chao').update(title='Tạm biệt')  # No signals, like another worker
+        IndexVersion.publish(search.SuggestionIndex.version_key)
+        self.assertEqual(self.labels('xin'), ['Xin chào'])  # Not checked again yet
+        self.index.checked_at -= search.VERSION_CHECK_INTERVAL
+        self.assertEqual(self.labels('xin'), [])
+        self.assertEqual(self.labels('tam'), ['Tạm biệt'])
+
+    def test_applies_changes_from_another_process_without_rebuilding(self):
+        self.labels('xin')
+        other = search.SuggestionIndex()  # Another worker's copy
+        video = Video.objects.get(slug='xin-chao')
+        video.title = 'Tạm biệt'
+        video.save()
+        other.update(video)
+        self.index.checked_at -= search.VERSION_CHECK_INTERVAL
+        with mock.patch.object(self.index, 'build') as build:
+            self.assertEqual(self.labels('tam'), ['Tạm biệt'])
+        build.assert_not_called()
+        self.assertEqual(self.labels('xin'), [])
+
+    def test_rebuilds_when_missed_changes_were_pruned(self):
+        self.labels('xin')
+        Video.objects.filter(slug='xin-chao').update(title='Tạm biệt')
+        search.SuggestionIndex().update(Video.objects.get(slug='xin-chao'))
+        IndexChange.prune(before=timezone.now() + timedelta(seconds=1))
+        self.assertFalse(IndexChange.objects.exists())
+        self.index.checked_at -= search.VERSION_CHECK_INTERVAL
+        with mock.patch.object(self.index, 'build', wraps=self.index.build) as build:
+            self.assertEqual(self.labels('tam'), ['Tạm biệt'])
+        build.assert_called_once()
+
+
+class TrigramIndexTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(
+            title='Greetings', slug='greetings', category=category, description='', content=''
+        )
+        Vocabulary.objects.create(lesson=self.lesson, word='Xin chào', meaning='Hello')
+        self.index = search.TrigramIndex()
+        search._trigrams = self.index
+
+    def tearDown(self):
+        search._trigrams = None
+
+    def test_unpublished_lesson_drops_its_vocabulary(self):
+        self.assertEqual(len(self.index.similar('xin chao')), 1)
+        self.lesson.is_published = False
+        self.lesson.save()
+        self.assertEqual(self.index.similar('xin chao'), [])
+        self.lesson.is_published = True
+        self.lesson.save()
+        self.assertEqual(len(self.index.similar('xin chao')), 1)
+
+
+class IndexChangeLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(
+            title='Greetings', slug='greetings', category=category, description='', content=''
+        )
+        IndexChange.objects.all().delete()
+
+    def logged_keys(self):
+        return set(IndexChange.objects.values_list('key', flat=True))
+
+    def test_forum_posts_only_reach_the_search_index(self):
+        ForumPost.objects.create(author=self.user, title='Hello', content='Hi')
+        self.assertEqual(self.logged_keys(), {search.InMemoryBackend.version_key})
+
+    def test_lesson_content_edit_skips_vocabulary_trigrams(self):
+        self.lesson.content = 'New text'
+        self.lesson.save(update_fields=['content'])
+        self.assertEqual(self.logged_keys(), {search.InMemoryBackend.version_key})
+
+    def test_publishing_a_lesson_reaches_every_index(self):
+        self.lesson.is_published = False
+        self.lesson.save(update_fields=['is_published'])
+        self.assertEqual(self.logged_keys(), {
+            search.InMemoryBackend.version_key, search.SuggestionIndex.version_key,
+            search.TrigramIndex.version_key,
+        })
+
+
+class ForumCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='x')
+        self.reader = User.objects.create_user('reader', password='x')
+        self.post = ForumPost.objects.create(author=self.author, title='Hello', content='Hi')
+
+    def counts(self):
+        return ForumPost.objects.values_list('like_count', 'comment_count').get(pk=self.post.pk)
+
+    def test_likes_and_comments_move_the_counters(self):
+        self.assertEqual(self.post.toggle_like(self.reader), (True, 1))
+        self.assertEqual(self.post.toggle_like(self.author), (True, 2))
+        self.assertEqual(self.post.toggle_like(self.reader), (False, 1))
+        root = self.post.add_comment(Comment(author=self.reader, content='root'))
+        self.post.add_comment(Comment(author=self.author, content='reply'), parent=root)
+        self.assertEqual(self.counts(), (1, 2))
+
+    def test_repair_fixes_drifted_counters(self):
+        self.post.toggle_like(self.reader)
+        self.post.add_comment(Comment(author=self.reader, content='one'))
+        ForumPost.objects.filter(pk=self.post.pk).update(like_count=4, comment_count=5)
+        call_command('repair_forum_counts', '--dry-run', stdout=StringIO())
+        self.assertEqual(self.counts(), (4, 5))
+        call_command('repair_forum_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_deleting_likes_and_comments_lowers_the_counters(self):
+        self.post.toggle_like(self.reader)
+        self.post.toggle_like(self.author)
+        root = self.post.add_comment(Comment(author=self.reader, content='root'))
+        self.post.add_comment(Comment(author=self.author, content='reply'), parent=root)
+        self.post.add_comment(Comment(author=self.author, content='other'))
+        self.assertEqual(self.counts(), (2, 3))
+        Like.objects.filter(user=self.reader).delete()  # e.g. removed in the admin
+        root.delete()  # Takes its reply with it
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertAlmostEqual(
+            ForumPost.objects.get(pk=self.post.pk).hot_score, 3.0 + 1.0 + 2.0 * 3, places=3
+        )
+
+    def test_deleting_a_user_lowers_the_counters_of_their_posts_only(self):
+        other = ForumPost.objects.create(author=self.reader, title='Mine', content='...')
+        self.post.toggle_like(self.reader)
+        other.toggle_like(self.author)
+        self.post.add_comment(Comment(author=self.reader, content='hi'))
+        self.reader.delete()
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertFalse(ForumPost.objects.filter(pk=other.pk).exists())
+
+    def list_queries(self):
+        """{feed: (posts shown, queries)} for the first forum page"""
+        pages = {}
+        for feed in forum.FEEDS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('forum_list'), {'sort': feed})
+            pages[feed] = (len(response.context['posts']), len(queries))
+        return pages
+
+    def test_list_queries_do_not_grow_with_the_page(self):
+        self.client.force_login(self.reader)
+        self.post.toggle_like(self.reader)  # Activity this week puts it in the "top" feed
+        few = self.list_queries()
+        for number in range(6):
+            post = ForumPost.objects.create(author=self.author, title=f'Post {number}', content='...')
+            post.toggle_like(self.reader)
+            post.add_comment(Comment(author=self.reader, content='Nice'))
+        many = self.list_queries()
+        for feed in forum.FEEDS:
+            self.assertEqual((few[feed][0], many[feed][0]), (1, 7), feed)
+            self.assertEqual(few[feed][1], many[feed][1], feed)
+
+
+class ForumRankingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        self.post = ForumPost.objects.create(author=self.user, title='Hello', content='Hi')
+        # Last decayed a day ago (two half-lives): the new-post bonus is worth a quarter now
+        ForumPost.objects.filter(pk=self.post.pk).update(
+            hot_decayed_at=timezone.now() - timedelta(hours=24)
+        )
+
+    def decay(self):
+        post = ForumPost.objects.get(pk=self.post.pk)
+        forum.decay_chunk([(post.id, post.hot_decayed_at)])
+        return ForumPost.objects.get(pk=self.post.pk).hot_score
+
+    def test_new_like_keeps_full_weight_after_late_decay(self):
+        self.post.toggle_like(self.user)
+        self.assertAlmostEqual(self.decay(), 3.0 / 4 + 1.0, places=3)
+
+    def test_like_removed_takes_back_its_weight(self):
+        self.post.toggle_like(self.user)
+        self.post.toggle_like(self.user)
+        self.assertAlmostEqual(self.decay(), 3.0 / 4, places=3)
+
+    def test_decay_keeps_posts_moved_by_a_later_event(self):
+        stale = ForumPost.objects.get(pk=self.post.pk)
+        self.post.add_comment(Comment(author=self.user, content='Nice'))
+        forum.decay_chunk([(stale.id, stale.hot_decayed_at)])
+        self.assertAlmostEqual(ForumPost.objects.get(pk=self.post.pk).hot_score, 3.0 / 4 + 2.0, places=3)
+
+    def test_decay_skips_posts_decayed_after_now(self):
+        earlier = timezone.now()
+        self.post.add_comment(Comment(author=self.user, content='Nice'))
+        post = ForumPost.objects.get(pk=self.post.pk)
+        forum.decay_chunk([(post.id, post.hot_decayed_at)], earlier)
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).hot_decayed_at, post.hot_decayed_at)
+
+    def test_command_decays_every_chunk(self):
+        other = ForumPost.objects.create(author=self.user, title='Other', content='Hi')
+        ForumPost.objects.filter(pk=other.pk).update(hot_decayed_at=timezone.now() - timedelta(hours=12))
+        out = StringIO()
+        call_command('decay_forum_scores', chunk_size=1, stdout=out)
+        self.assertIn('2 forum posts decayed', out.getvalue())
+        scores = dict(ForumPost.objects.values_list('title', 'hot_score'))
+        self.assertAlmostEqual(scores['Hello'], 3.0 / 4, places=3)
+        self.assertAlmostEqual(scores['Other'], 3.0 / 2, places=3)
+
+    def test_command_dry_run_changes_nothing(self):
+        call_command('decay_forum_scores', dry_run=True, stdout=StringIO())
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).hot_score, 3.0)
+
+
+class PostgresSearchTests(TestCase):
+    def test_vectors_use_accent_folding_config(self):
+        for search_type in search.SEARCH_TYPES:
+            vector = search.PostgresBackend.vector(search_type)
+            sql = postgres_sql(search_type.model.objects.annotate(search=vector).values('search'))
+            self.assertIn("to_tsvector('signox_unaccent'::regconfig", sql)
+            self.assertNotIn("'simple'", sql)
+
+    def test_matches_filter_like_the_in_memory_index(self):
+        # Same visibility rule and folded query as InMemoryBackend.rows()
+        backend = search.PostgresBackend()
+        for search_type in search.SEARCH_TYPES:
+            sql = postgres_sql(backend.matches(search_type, 'xin chào'))
+            self.assertIn("websearch_to_tsquery('signox_unaccent'::regconfig, 'xin chào')", sql)
+            visible = {Lesson: 'lesson', Vocabulary: 'lesson', Video: 'video'}.get(search_type.model)
+            if visible:
+                self.assertIn(f'"signlang_{visible}"."is_published"', sql)
+
+
+class GlobalSearchViewTests(TestCase):
+    def setUp(self):
+        for name in ('_backend', '_suggestions', '_trigrams'):
+            patcher = mock.patch.object(search, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(
+            title='Xin chào', slug='xin-chao', category=category, description='Greetings', content=''
+        )
+        Lesson.objects.create(
+            title='Xin chào nháp', slug='draft', category=category, description='', content='', is_published=False
+        )
+        self.word = Vocabulary.objects.create(lesson=self.lesson, word='Chào buổi sáng', meaning='Good morning')
+        author = User.objects.create_user('writer', password='x')
+        self.post = ForumPost.objects.create(author=author, title='Học chào hỏi', content='...')
+        self.url = reverse('global_search')
+
+    def test_ranked_results_across_types_with_highlighting(self):
+        response = self.client.get(self.url, {'q': 'chao'})
+        results = response.context['results']
+        self.assertEqual([lesson.id for lesson in results['lessons']], [self.lesson.id])  # Draft hidden
+        self.assertEqual([vocab.id for vocab in results['vocabulary']], [self.word.id])
+        self.assertEqual([post.id for post in results['forum']], [self.post.id])
+        self.assertEqual(results['total_count'], 3)
+        self.assertContains(response, 'Xin <mark>chào</mark>', html=False)
+
+    def test_empty_and_short_queries_return_nothing(self):
+        for query in ['', '   ', 'x']:
+            response = self.client.get(self.url, {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['results']['total_count'], 0)
+        self.assertEqual(self.client.get(self.url).context['query'], '')
+
+    def test_no_matches(self):
+        response = self.client.get(self.url, {'q': 'zzzz'})
+        self.assertEqual(response.context['results']['total_count'], 0)
+        self.assertContains(response, 'find anything matching')
+
+
+class SearchSuggestViewTests(TestCase):
+    def setUp(self):
+        for name in ('_backend', '_suggestions', '_trigrams'):
+            patcher = mock.patch.object(search, name, None)  # Fresh process indexes for this test's rows
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(
+            title='Chào hỏi', slug='chao-hoi', category=category, description='', content=''
+        )
+        Vocabulary.objects.create(lesson=lesson, word='Xin chào', meaning='Hello')
+        Vocabulary.objects.create(lesson=lesson, word='Cảm ơn', meaning='Thank you')
+        self.url = reverse('search_suggest')
+
+    def suggest(self, query):
+        return self.client.get(self.url, {'q': query}).json()['suggestions']
+
+    def test_prefix_suggestions_without_queries_per_keystroke(self):
+        self.assertEqual([(row['type'], row['label']) for row in self.suggest('chao')], [
+            ('lessons', 'Chào hỏi'), ('vocabulary', 'Xin chào'),
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual([row['label'] for row in self.suggest('xin ch')], ['Xin chào'])
+        self.assertFalse([query for query in queries if 'signlang_' in query['sql']])
+
+    def test_typo_suggests_similar_vocabulary(self):
+        self.assertEqual(self.suggest('cam onn'), [
+            {'type': 'vocabulary', 'label': 'Cảm ơn', 'url': reverse('lesson_detail', args=['chao-hoi'])},
+        ])
+
+    def test_blank_and_short_queries(self):
+        for query in ['', '   ', 'x', '!!']:
+            response = self.client.get(self.url, {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['suggestions'], [])
+
+
+class InMemorySearchTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.title = Lesson.objects.create(
+            title='Xin chào', slug='xin-chao', category=category, description='', content='Greetings'
+        )
+        self.content = Lesson.objects.create(
+            title='Greetings', slug='greetings', category=category, description='', content='Nói xin chào'
+        )
+        Lesson.objects.create(
+            title='Xin chào nháp', slug='draft', category=category, description='', content='', is_published=False
+        )
+        self.backend = search.InMemoryBackend()
+
+    def test_folded_query_ranks_titles_first_and_hides_drafts(self):
+        hits = self.backend.search('xin chao')['lessons']
+        self.assertEqual([object_id for object_id, _ in hits], [self.title.id, self.content.id])
+
+    def test_matches_rows_postgres_would_match(self):
+        # Both backends fold accents on both sides: the accented and plain queries agree
+        self.assertEqual(self.backend.search('xin chào'), self.backend.search('xin chao'))
+
+
+class GradingTests(SimpleTestCase):
+    def setUp(self):
+        answer = grading.AnswerDef
+        self.key = grading.AnswerKey([
+            grading.QuestionDef(1, 'One?', 'multiple_choice', None, None, 1, (
+                answer(11, 'yes', True, ''), answer(12, 'no', False, ''),
+            )),
+            grading.QuestionDef(2, 'Two?', 'multiple_choice', None, None, 3, (
+                answer(21, 'yes', True, ''), answer(22, 'no', False, ''),
+            )),
+        ])
+
+    def test_scores_by_question_points(self):
+        result = grading.grade(self.key, {1: '12', 2: '21'}, passing_score=70)
+        self.assertEqual((result.score, result.max_score), (3, 4))
+        self.assertEqual(result.percentage, 75)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.correct_count, 1)
+        self.assertEqual(result.responses, [(1, 12, False), (2, 21, True)])
+
+    def test_foreign_or_malformed_answers_count_as_unanswered(self):
+        # 21 belongs to question 2, not question 1
+        result = grading.grade(self.key, {1: '21', 2: 'x'}, passing_score=50)
+        self.assertEqual(result.score, 0)
+        self.assertEqual(result.selections, {1: None, 2: None})
+        self.assertEqual(result.answer_ids, [])
+        self.assertEqual([graded.correct.id for graded in result.results], [11, 21])
+
+    def test_reads_submitted_form_fields(self):
+        selections = self.key.selections_from_post({'question_1': '11', 'question_9': '99'})
+        self.assertEqual(selections, {1: '11', 2: None})
+
+
+class QuizDefinitionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.quiz = Quiz.objects.create(lesson=lesson, title='Q', passing_score=50)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='?', points=1)
+        self.answer = Answer.objects.create(question=self.question, answer_text='yes', is_correct=True)
+
+    def definition(self):
+        self.quiz.refresh_from_db()
+        return grading.get_quiz_definition(self.quiz)
+
+    def test_cached_until_content_changes(self):
+        self.definition()
+        with CaptureQueriesContext(connection) as queries:
+            grading.get_quiz_definition(self.quiz)
+        self.assertEqual(len(queries), 0)
+
+    def test_answer_changes_replace_the_definition(self):
+        self.definition()
+        self.answer.answer_text = 'oui'
+        self.answer.save()
+        self.assertEqual(self.definition().questions[0].answers[0].answer_text, 'oui')
+        Answer.objects.create(question=self.question, answer_text='non')
+        self.assertEqual(len(self.definition().questions[0].answers), 2)
+        self.answer.delete()
+        self.assertEqual([answer.answer_text for answer in self.definition().questions[0].answers], ['non'])
+
+    def test_question_changes_replace_the_definition(self):
+        self.definition()
+        self.question.points = 5
+        self.question.save()
+        self.assertEqual(self.definition().max_score, 5)
+        self.question.delete()
+        self.assertEqual(self.definition().questions, ())
+
+
+class QuizBestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.quiz = Quiz.objects.create(lesson=lesson, title='Q', passing_score=60)
+
+    def record(self, user, score):
+        return QuizBest.record_attempt(user, self.quiz, score, 5, score >= 3)[0]
+
+    def test_summary_tracks_best_and_counters(self):
+        self.record(self.user, 2)
+        best = self.record(self.user, 5)
+        self.record(self.user, 5)  # A tie keeps the earlier attempt
+        self.record(self.user, 3)
+        summary = QuizBest.for_quiz(self.user, self.quiz)
+        self.assertEqual(summary.best_attempt, best)
+        self.assertEqual((summary.best_score, summary.max_score, summary.percentage), (5, 5, 100))
+        self.assertEqual((summary.attempts, summary.passed_attempts, summary.perfect_attempts), (4, 3, 2))
+        self.assertTrue(summary.passed)
+        self.assertEqual(QuizBest.totals_for_user(self.user), {'attempts': 4, 'passed': 3, 'perfect': 2})
+
+    def test_quiz_list_shows_only_the_viewers_summary(self):
+        self.record(self.other, 4)
+        self.client.force_login(self.user)
+        quiz = self.client.get(reverse('quiz_list')).context['quizzes'].get()
+        self.assertIsNone(quiz.best_score)
+        self.record(self.user, 3)
+        quiz = self.client.get(reverse('quiz_list')).context['quizzes'].get()
+        self.assertEqual((quiz.best_score, quiz.attempt_count, quiz.has_passed), (3, 1, True))
+
+
+class CompactQuizAttemptsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.quiz = Quiz.objects.create(lesson=lesson, title='Q', passing_score=60)
+        self.attempts = []
+        for days_ago, score in [(200, 1), (150, 5), (120, 2), (100, 3), (60, 1), (10, 2)]:
+            attempt, _ = QuizBest.record_attempt(self.user, self.quiz, score, 5, score >= 3)
+            QuizAttempt.objects.filter(id=attempt.id).update(started_at=timezone.now() - timedelta(days=days_ago))
+            self.attempts.append(attempt.id)
+
+    def compact(self, *args):
+        call_command('compact_quiz_attempts', '--keep-recent=2', '--keep-days=90', *args, stdout=StringIO())
+
+    def test_keeps_recent_young_and_best_attempts(self):
+        self.compact()
+        # Kept: the best (150 days), and the newest two (60 and 10 days, also under 90 days)
+        remaining = set(QuizAttempt.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {self.attempts[1], self.attempts[4], self.attempts[5]})
+        summary = QuizBest.objects.get()
+        self.assertEqual((summary.attempts, summary.archived_attempts, summary.passed_attempts), (6, 3, 2))
+
+    def test_rerun_and_dry_run_delete_nothing_more(self):
+        self.compact('--dry-run')
+        self.assertEqual(QuizAttempt.objects.count(), 6)
+        self.compact()
+        self.compact()
+        self.assertEqual(QuizAttempt.objects.count(), 3)
+        self.assertEqual(QuizBest.objects.get().archived_attempts, 3)
+
+
+class QuestionStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.quiz = Quiz.objects.create(lesson=lesson, title='Q', passing_score=50)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='?', points=1)
+        self.right = Answer.objects.create(question=self.question, answer_text='yes', is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, answer_text='no')
+
+    def finish(self, answer, is_correct):
+        session = QuizSession.open_for(self.user, self.quiz)
+        return session.finish(
+            int(is_correct), 1, is_correct, answers=[answer.id],
+            responses=[(self.question.id, answer.id, is_correct)], score_fraction=float(is_correct),
+        )
+
+    def test_finish_records_stats(self):
+        self.finish(self.right, True)
+        self.finish(self.wrong, False)
+        stats = QuestionStats.objects.get(question=self.question)
+        self.assertEqual((stats.responses, stats.correct, stats.skipped), (2, 1, 0))
+        self.assertEqual(stats.p_value, 0.5)
+        self.assertEqual(AnswerStats.objects.get(answer=self.right).picks, 1)
+        self.assertEqual(stats.answer_share(Answer.objects.select_related('stats').get(pk=self.wrong.pk)), 0.5)
+
+    def test_stats_roll_back_with_the_attempt(self):
+        # Fails after the attempt and question stats are written, on the answer counts
+        with mock.patch.object(AnswerStats.objects, 'filter', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.finish(self.right, True)
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertFalse(QuestionStats.objects.filter(question=self.question, responses__gt=0).exists())
+
+
+class QuizSessionViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='x')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.quiz = Quiz.objects.create(lesson=lesson, title='Timed', passing_score=50, time_limit=5)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='?', points=1)
+        self.right = Answer.objects.create(question=self.question, answer_text='yes', is_correct=True)
+        self.url = reverse('quiz_detail', args=[self.quiz.id])
+
+    def expire(self):
+        QuizSession.objects.update(deadline=timezone.now() - timedelta(hours=1))
+
+    def test_viewing_does_not_start_the_timer(self):
+        self.client.get(self.url)
+        self.assertFalse(QuizSession.objects.exists())
+
+    def test_expired_session_without_answers_records_no_attempt(self):
+        self.client.post(self.url, {'start': '1'})
+        self.expire()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertFalse(QuizSession.objects.exists())
+
+    def test_expired_session_with_answers_is_graded(self):
+        self.client.post(self.url, {'start': '1'})
+        QuizSession.objects.get().save_answers({self.question.id: self.right.id})
+        self.expire()
+        self.client.get(self.url)
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual((attempt.score, attempt.max_score), (1, 1))
+
+    def test_submit_without_a_session_records_no_attempt(self):
+        response = self.client.post(self.url, {f'question_{self.question.id}': self.right.id}, follow=True)
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertContains(response, 'Your answers were not recorded')
+
+    def test_untimed_submit_without_a_session_is_graded(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(time_limit=0)
+        self.client.post(self.url, {f'question_{self.question.id}': self.right.id})
+        attempt = QuizAttempt.objects.get()
+        self.assertEqual((attempt.score, attempt.max_score), (1, 1))
+        self.assertFalse(QuizSession.objects.filter(finished_at__isnull=True).exists())
+
+    def test_autosave_rejects_non_object_bodies(self):
+        self.client.post(self.url, {'start': '1'})
+        url = reverse('quiz_session_save', args=[QuizSession.objects.get().id])
+        for body in ['[]', '"answers"', '1']:
+            response = self.client.post(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='x')
+        self.post = ForumPost.objects.create(author=self.user, title='Thread', content='...')
+        self.root = self.post.add_comment(Comment(author=self.user, content='root'))
+        self.reply = self.post.add_comment(Comment(author=self.user, content='reply'), parent=self.root)
+        self.nested = self.post.add_comment(Comment(author=self.user, content='nested'), parent=self.reply)
+
+    def reply_counts(self):
+        return dict(Comment.objects.values_list('content', 'reply_count'))
+
+    def test_deleting_a_reply_updates_ancestors(self):
+        self.assertEqual(self.reply_counts(), {'root': 2, 'reply': 1, 'nested': 0})
+        self.reply.delete()  # Cascades to the nested reply
+        self.assertEqual(self.reply_counts(), {'root': 0})
+
+    def test_repair_recounts_replies(self):
+        Comment.objects.filter(pk=self.root.pk).update(reply_count=7)
+        call_command('repair_forum_counts', stdout=StringIO())
+        self.assertEqual(self.reply_counts(), {'root': 2, 'reply': 1, 'nested': 0})
+
+
+class ForumCommentsApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='x')
+        self.post = ForumPost.objects.create(author=self.user, title='Thread', content='...')
+        self.url = reverse('forum_comments_api', args=[self.post.id])
+
+    def comment(self, content, parent=None):
+        return self.post.add_comment(Comment(author=self.user, content=content), parent=parent)
+
+    def fetch(self, **params):
+        data = self.client.get(self.url, params).json()
+        ids = [int(comment_id) for comment_id in re.findall(r'id="comment-(\d+)"', data['html'])]
+        indents = [int(indent) for indent in re.findall(r'--indent: (\d+)', data['html'])]
+        return ids, indents, data
+
+    def test_top_level_comments_page_by_cursor(self):
+        comments = [self.comment(f'comment {n}') for n in range(forum.COMMENT_PAGE_SIZE + 2)]
+        self.comment('reply', parent=comments[0])  # Replies load with their thread, not here
+        first, _, data = self.fetch()
+        self.assertEqual(first, [comment.id for comment in comments[:forum.COMMENT_PAGE_SIZE]])
+        self.assertTrue(data['has_more'])
+        rest, _, data = self.fetch(cursor=data['cursor'])
+        self.assertEqual(rest, [comment.id for comment in comments[forum.COMMENT_PAGE_SIZE:]])
+        self.assertFalse(data['has_more'])
+        self.assertIsNone(data['cursor'])
+
+    def test_replies_follow_the_materialised_path(self):
+        root = self.comment('root')
+        first = self.comment('first', parent=root)
+        second = self.comment('second', parent=root)
+        nested = self.comment('nested', parent=first)  # Written last, read under its parent
+        ids, indents, _ = self.fetch(parent=root.id)
+        self.assertEqual(ids, [first.id, nested.id, second.id])
+        self.assertEqual(indents, [0, 1, 0])
+
+    def test_deep_replies_are_capped_and_paged(self):
+        root = parent = self.comment('root')
+        for level in range(Comment.MAX_DEPTH + 3):
+            parent = self.comment(f'level {level}', parent=parent)
+        with mock.patch.object(forum, 'REPLY_PAGE_SIZE', 4):
+            ids, indents, data = self.fetch(parent=root.id)
+            while data['has_more']:
+                more_ids, more_indents, data = self.fetch(parent=root.id, cursor=data['cursor'])
+                ids += more_ids
+                indents += more_indents
+        replies = list(forum.thread_replies(root).order_by('path'))
+        self.assertEqual(ids, [reply.id for reply in replies])
+        self.assertEqual(max(reply.depth for reply in replies), Comment.MAX_DEPTH)
+        self.assertEqual(max(indents), Comment.MAX_DEPTH - 1)
+
+    def test_unknown_parent(self):
+        other = ForumPost.objects.create(author=self.user, title='Other', content='...')
+        elsewhere = other.add_comment(Comment(author=self.user, content='elsewhere'))
+        self.assertEqual(self.client.get(self.url, {'parent': elsewhere.id}).status_code, 404)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Basics', slug='basics')
+        Lesson.objects.create(title='Greetings', slug='greetings', category=self.category, description='', content='')
+        self.url = reverse('lesson_list')
+
+    def test_anonymous_pages_are_cached_until_content_changes(self):
+        self.assertEqual(self.client.get(self.url)['X-Page-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(len(queries), 0)
+
+        Lesson.objects.create(title='Farewells', slug='farewells', category=self.category, description='', content='')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Farewells')
+
+    def test_query_strings_are_cached_separately(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, {'category': 'basics'})['X-Page-Cache'], 'miss')
+
+    def test_cached_pages_get_each_visitors_csrf_token(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, page_cache.CSRF_PLACEHOLDER)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_logged_in_users_are_not_served_cached_pages(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_fragments_follow_content_changes(self):
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        self.client.get(reverse('category_list'))
+        Category.objects.create(name='Numbers', slug='numbers')
+        self.assertContains(self.client.get(reverse('category_list')), 'Numbers')
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_single_flight(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache_tags.get_or_compute('entry', slow, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+
+    def test_early_refresh_is_probabilistic(self):
+        # Took 10 s to compute and expires in 60 s: refreshed early once 10 * -log(1 - u) > 60
+        cache.set(cache_tags.make_key('entry', ()), ('old', 10.0, time.time() + 60), 60)
+        with mock.patch.object(cache_tags.random, 'random', return_value=0.0):
+            self.assertEqual(cache_tags.get_or_compute('entry', lambda: 'new', 60), 'old')
+        with mock.patch.object(cache_tags.random, 'random', return_value=1 - 1e-12):
+            self.assertEqual(cache_tags.get_or_compute('entry', lambda: 'new', 60), 'new')
+
+    def test_is_fresh(self):
+        now = time.time()
+        self.assertFalse(cache_tags.is_fresh(None))
+        self.assertTrue(cache_tags.is_fresh(('value', 0.0, now + 60)))
+        self.assertFalse(cache_tags.is_fresh(('value', 0.0, now - 1)))
+        self.assertTrue(cache_tags.is_fresh(('value', 10.0, None)))
+
+    def test_waits_for_the_lock_holder(self):
+        key = cache_tags.make_key('entry', ())
+        cache.add(f'{key}:lock', 1, cache_tags.LOCK_TIMEOUT)
+
+        def finish_elsewhere():
+            time.sleep(0.1)
+            cache.set(key, ('theirs', 0.0, time.time() + 60), 60)
+
+        threading.Thread(target=finish_elsewhere).start()
+        self.assertEqual(cache_tags.get_or_compute('entry', lambda: 'mine', 60), 'theirs')
+
+    def test_computes_when_the_lock_holder_never_finishes(self):
+        key = cache_tags.make_key('entry', ())
+        cache.add(f'{key}:lock', 1, cache_tags.LOCK_TIMEOUT)
+        with mock.patch.object(cache_tags, 'LOCK_WAIT', 0.1):
+            self.assertEqual(cache_tags.get_or_compute('entry', lambda: 'mine', 60), 'mine')
+
+    def test_stale_value_served_while_another_caller_refreshes(self):
+        key = cache_tags.make_key('entry', ())
+        cache.set(key, ('old', 0.0, time.time() - 1), 60)
+        cache.add(f'{key}:lock', 1, cache_tags.LOCK_TIMEOUT)
+        self.assertEqual(cache_tags.get_or_compute('entry', lambda: 'new', 60), 'old')
+
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self):
+        category = VideoCategory.objects.create(name='Library', slug='library')
+        for number in range(7):
+            Video.objects.create(title=f'Video {number}', slug=f'video-{number}', category=category, description='')
+        self.ordering = ['-created_at', '-id']
+        self.expected = list(Video.objects.order_by(*self.ordering).values_list('id', flat=True))
+        self.paginator = CursorPaginator(Video.objects.all(), self.ordering, 3)
+
+    def ids(self, page):
+        return [video.id for video in page]
+
+    def test_forward_and_back(self):
+        first = self.paginator.page()
+        self.assertFalse(first.has_previous)
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+        self.assertFalse(third.has_next)
+
+        back = self.paginator.page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.has_next)
+        self.assertEqual(self.ids(self.paginator.page(back.previous_cursor)), self.ids(first))
+
+    def test_malformed_cursor_starts_over(self):
+        for cursor in ['not-base64!', 'e30=', 'eyJkIjoibmV4dCIsInYiOlsieCJdfQ==']:
+            page = self.paginator.page(cursor)
+            self.assertEqual(self.ids(page), self.expected[:3])
+            self.assertFalse(page.has_previous)
+
+
+class LessonListPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Basics', slug='basics')
+        other = Category.objects.create(name='Numbers', slug='numbers')
+        for number in range(15):
+            Lesson.objects.create(
+                title=f'Lesson {number}', slug=f'lesson-{number}', order=number % 4,
+                category=self.category if number % 3 else other, description='', content='',
+            )
+
+    def titles(self, url):
+        titles, params = [], {}
+        while True:
+            page = self.client.get(url, params).context['lessons']
+            titles.extend(lesson.title for lesson in page)
+            if not page.has_next:
+                return titles
+            params = {'cursor': page.next_cursor}
+
+    def test_category_pages_follow_lesson_order(self):
+        expected = Lesson.objects.filter(category=self.category).order_by('order', 'id')
+        url = reverse('lesson_list_by_category', args=[self.category.slug])
+        self.assertEqual(self.titles(url), [lesson.title for lesson in expected])
+
+    def test_catalogue_pages_cover_every_lesson_once(self):
+        titles = self.titles(reverse('lesson_list'))
+        self.assertEqual(sorted(titles), sorted(Lesson.objects.values_list('title', flat=True)))
+
+
+def scalar_sm2(ease, interval, reps, rating):
+    """SM-2 as ReviewVocabulary.apply_rating computed it before scheduling was vectorised"""
+    if rating == 1:
+        return ease, 0, 0
+    if rating == 2:
+        return max(1.3, ease - 0.15), max(1, int(interval * 0.5)), 0
+    if rating == 3:
+        if reps == 0:
+            interval = 1
+        elif reps == 1:
+            interval = 3
+        else:
+            interval = int(interval * ease)
+        return ease, interval, reps + 1
+    interval = 4 if reps == 0 else int(interval * ease * 1.3)
+    return min(3.0, ease + 0.1), interval, reps + 1
+
+
+class SM2Tests(SimpleTestCase):
+    def test_matches_scalar_implementation(self):
+        states = list(itertools.product([1.3, 1.75, 2.5, 2.95, 3.0], [0, 1, 3, 10, 47], [0, 1, 2, 6], [1, 2, 3, 4]))
+        ease, interval, reps, ratings = map(list, zip(*states))
+        new_ease, new_interval, new_reps = scheduling.sm2_step(ease, interval, reps, ratings)
+        for index, state in enumerate(states):
+            expected = scalar_sm2(*state)
+            self.assertAlmostEqual(new_ease[index], expected[0], msg=state)
+            self.assertEqual((new_interval[index], new_reps[index]), expected[1:], msg=state)
+
+    def test_single_card_matches_batch(self):
+        self.assertEqual(scheduling.sm2_next(2.5, 10, 3, 4), scalar_sm2(2.5, 10, 3, 4))
+
+
+class ExportReviewLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        word = Vocabulary.objects.create(lesson=lesson, word='word', meaning='m')
+        days = [datetime(2026, 3, day, 12, tzinfo=dt_timezone.utc) for day in (3, 1, 2, 2)]
+        self.logs = ReviewLog.objects.bulk_create([
+            ReviewLog(user=self.user, vocabulary=word, rating=rating, elapsed_days=n, stability=n * 1.5, reviewed_at=at)
+            for n, (rating, at) in enumerate(zip([3, 1, 4, 2], days))
+        ])
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_review_log', chunk_size=2, stdout=out, **options)
+        return list(csv.reader(StringIO(out.getvalue())))
+
+    def test_exports_every_column_in_time_order(self):
+        header, *rows = self.export()
+        self.assertEqual(
+            header, ['id', 'user_id', 'vocabulary_id', 'rating', 'elapsed_days', 'stability', 'reviewed_at']
+        )
+        ordered = sorted(self.logs, key=lambda log: (log.reviewed_at, log.id))
+        self.assertEqual(rows, [
+            [str(log.id), str(self.user.id), str(log.vocabulary_id), str(log.rating), str(log.elapsed_days),
+             str(log.stability), log.reviewed_at.isoformat()]
+            for log in ordered
+        ])
+
+    def test_date_range(self):
+        _, *rows = self.export(since='2026-03-02', until='2026-03-03')
+        self.assertEqual([row[3] for row in rows], ['4', '2'])
+
+
+class OptimizeSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.word = Vocabulary.objects.create(lesson=lesson, word='word', meaning='m')
+        self.learner = User.objects.create_user('learner', password='x')
+        self.newcomer = User.objects.create_user('newcomer', password='x')
+
+    def log(self, user, count, rating):
+        # Ten days after a review with 10 days' stability: 90% recall expected
+        ReviewLog.objects.bulk_create([
+            ReviewLog(
+                user=user, vocabulary=self.word, rating=rating, elapsed_days=10,
+                stability=10, reviewed_at=timezone.now(),
+            )
+            for _ in range(count)
+        ])
+
+    def test_fits_and_saves_a_stability_scale(self):
+        self.log(self.learner, 40, rating=3)  # Always recalled: memories last longer than modelled
+        self.log(self.newcomer, 5, rating=3)
+        SchedulerParams.for_user(self.learner.id)  # Cached defaults must not survive the fit
+        out = StringIO()
+        call_command('optimize_scheduler', min_samples=20, stdout=out)
+
+        params = SchedulerParams.objects.get(user=self.learner)
+        self.assertGreater(params.stability_scale, 1)
+        self.assertEqual(params.sample_count, 40)
+        self.assertIsNotNone(params.fitted_at)
+        self.assertEqual(SchedulerParams.for_user(self.learner.id).stability_scale, params.stability_scale)
+        self.assertFalse(SchedulerParams.objects.filter(user=self.newcomer).exists())
+        self.assertIn('updated for 1 users', out.getvalue())
+
+    def test_forgetting_lowers_the_scale(self):
+        self.log(self.learner, 30, rating=1)
+        call_command('optimize_scheduler', min_samples=20, stdout=StringIO())
+        self.assertLess(SchedulerParams.objects.get(user=self.learner).stability_scale, 1)
+
+    def test_dry_run_saves_nothing(self):
+        self.log(self.learner, 30, rating=3)
+        call_command('optimize_scheduler', min_samples=20, dry_run=True, stdout=StringIO())
+        self.assertFalse(SchedulerParams.objects.exists())
+
+
+class RescheduleReviewsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.reviewed_at = timezone.now() - timedelta(days=2)
+        self.reviews = [
+            VocabularyReview.objects.create(
+                user=self.user, vocabulary=Vocabulary.objects.create(lesson=lesson, word=f'word {n}', meaning='m'),
+                total_reviews=1, ease_factor=ease, interval=interval, last_reviewed=self.reviewed_at,
+                next_review=self.reviewed_at.date() + timedelta(days=interval),
+            )
+            for n, (ease, interval) in enumerate([(2.5, 10), (4.0, 3), (2.0, 100)])
+        ]
+        # Never rated: left alone
+        self.new = VocabularyReview.objects.create(
+            user=self.user, vocabulary=Vocabulary.objects.create(lesson=lesson, word='new', meaning='m'),
+        )
+
+    def schedules(self):
+        return [
+            (review.ease_factor, review.interval, review.next_review)
+            for review in VocabularyReview.objects.filter(total_reviews__gt=0).order_by('id')
+        ]
+
+    def test_rescales_intervals_and_recomputes_due_dates(self):
+        out = StringIO()
+        call_command('reschedule_reviews', interval_scale=0.5, max_interval=30, chunk_size=2, stdout=out)
+        base = self.reviewed_at.date()
+        self.assertEqual(self.schedules(), [
+            (2.5, 5, base + timedelta(days=5)),
+            (3.0, 1, base + timedelta(days=1)),  # Ease clamped to the allowed range
+            (2.0, 30, base + timedelta(days=30)),
+        ])
+        self.assertIn('3 reviews scanned, 3 rescheduled', out.getvalue())
+        self.assertEqual(VocabularyReview.objects.get(pk=self.new.pk).interval, 0)
+
+    def test_shift_days_moves_due_dates_only(self):
+        before = self.schedules()
+        call_command('reschedule_reviews', shift_days=3, stdout=StringIO())
+        self.assertEqual(self.schedules(), [
+            (ease, interval, due + timedelta(days=3)) for ease, interval, due in before
+        ])
+
+    def test_dry_run_writes_nothing(self):
+        before = self.schedules()
+        call_command('reschedule_reviews', interval_scale=2, dry_run=True, stdout=StringIO())
+        self.assertEqual(self.schedules(), before)
+
+
+class SchedulerParamsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        words = [Vocabulary.objects.create(lesson=lesson, word=f'word {n}', meaning='m') for n in range(3)]
+        self.reviews = [VocabularyReview.objects.create(user=self.user, vocabulary=word) for word in words]
+
+    def params_queries(self, queries):
+        return [query for query in queries if 'schedulerparams' in query['sql']]
+
+    def test_ratings_read_params_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            for review in self.reviews:
+                review.apply_rating(3)
+        self.assertEqual(len(self.params_queries(queries)), 1)
+
+    def test_saved_params_replace_cached_ones(self):
+        self.assertEqual(SchedulerParams.for_user(self.user.id).desired_retention, 0.9)
+        SchedulerParams.objects.create(user=self.user, desired_retention=0.8)
+        self.assertEqual(SchedulerParams.for_user(self.user.id).desired_retention, 0.8)
+
+    def test_base_classes_are_abstract(self):
+        with self.assertRaises(TypeError):
+            scheduling.Scheduler()
+        with self.assertRaises(TypeError):
+            search.ProcessIndex()
+
+
+class FlashcardDeckTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('learner', password='x')
+        self.category = Category.objects.create(name='Basics', slug='basics')
+
+    def lesson(self, slug, words):
+        lesson = Lesson.objects.create(title=slug, slug=slug, category=self.category, description='', content='')
+        for number in range(words):
+            Vocabulary.objects.create(lesson=lesson, word=f'{slug} {number}', meaning='m')
+        return lesson
+
+    def deck_queries(self, lesson):
+        with CaptureQueriesContext(connection) as queries:
+            deck = flashcards.load_deck(self.user, lesson)
+        return deck, len(queries)
+
+    def test_queries_do_not_grow_with_the_deck(self):
+        small, small_queries = self.deck_queries(self.lesson('small', 2))
+        large, large_queries = self.deck_queries(self.lesson('large', 12))
+        self.assertEqual((len(small), len(large)), (2, 12))
+        self.assertEqual(small_queries, large_queries)
+
+    def test_missing_reviews_are_created_and_counted(self):
+        lesson = self.lesson('words', 3)
+        flashcards.load_deck(self.user, lesson)
+        flashcards.load_deck(self.user, lesson)
+        self.assertEqual(VocabularyReview.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(LessonMastery.objects.get(user=self.user, lesson=lesson).card_count, 3)
+
+    def test_repeat_loads_use_the_cached_vocabulary(self):
+        lesson = self.lesson('words', 3)
+        flashcards.load_deck(self.user, lesson)
+        with CaptureQueriesContext(connection) as queries:
+            deck = flashcards.load_deck(self.user, lesson)
+        self.assertEqual(len(deck), 3)
+        self.assertFalse([query for query in queries if 'signlang_vocabulary"."meaning' in query['sql']])
+
+    def test_new_vocabulary_appears(self):
+        lesson = self.lesson('words', 2)
+        flashcards.load_deck(self.user, lesson)
+        Vocabulary.objects.create(lesson=lesson, word='added', meaning='m')
+        self.assertIn('added', [card['word'] for card in flashcards.load_deck(self.user, lesson)])
+        # Also when the change bypassed signals (another process, bulk write)
+        Vocabulary.objects.bulk_create([Vocabulary(lesson=lesson, word='bulk', meaning='m', letter='B')])
+        self.assertIn('bulk', [card['word'] for card in flashcards.load_deck(self.user, lesson)])
+
+
+class ReviewQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        today = timezone.now().date()
+        self.due, self.new = [], []
+        for number in range(10):
+            word = Vocabulary.objects.create(lesson=lesson, word=f'due {number}', meaning='m')
+            VocabularyReview.objects.create(
+                user=self.user, vocabulary=word, total_reviews=1, next_review=today - timedelta(days=10 - number)
+            )
+            self.due.append(word.id)
+        for number in range(3):
+            word = Vocabulary.objects.create(lesson=lesson, word=f'new {number}', meaning='m')
+            VocabularyReview.objects.create(user=self.user, vocabulary=word, next_review=today)
+            self.new.append(word.id)
+        # Not due yet
+        later = Vocabulary.objects.create(lesson=lesson, word='later', meaning='m')
+        VocabularyReview.objects.create(
+            user=self.user, vocabulary=later, total_reviews=1, next_review=today + timedelta(days=3)
+        )
+
+    def session(self, limit):
+        cards, cursor = flashcards.get_review_batch(self.user, limit=limit)
+        served = [cards]
+        while cursor:
+            cards, cursor = flashcards.get_review_batch(self.user, cursor=cursor, limit=limit)
+            served.append(cards)
+        return served
+
+    def test_due_cards_oldest_first_with_new_cards_interleaved(self):
+        cards = [card['id'] for card in self.session(20)[0]]
+        self.assertEqual(
+            cards, self.due[:4] + self.new[:1] + self.due[4:8] + self.new[1:2] + self.due[8:] + self.new[2:]
+        )
+
+    def test_batches_continue_without_repeats(self):
+        batches = self.session(3)
+        self.assertTrue(all(len(batch) <= 3 for batch in batches))
+        served = [card['id'] for batch in batches for card in batch]
+        self.assertEqual(sorted(served), sorted(self.due + self.new))
+
+    def test_session_limit(self):
+        with mock.patch.object(flashcards, 'REVIEW_SESSION_LIMIT', 5):
+            batches = self.session(3)
+        self.assertEqual([len(batch) for batch in batches], [3, 2])
+
+    def test_malformed_cursor_starts_over(self):
+        cards, _ = flashcards.get_review_batch(self.user, cursor='bm90LWpzb24=', limit=2)
+        self.assertEqual([card['id'] for card in cards], self.due[:2])
+
+    def test_queue_api(self):
+        self.client.force_login(self.user)
+        _, cursor = flashcards.get_review_batch(self.user, limit=5)
+        rest = self.client.get(reverse('review_queue_api'), {'cursor': cursor}).json()
+        self.assertEqual(len(rest['cards']), 8)
+        self.assertEqual((rest['cursor'], rest['has_more']), (None, False))
+
+
+class RatingBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        self.words = [Vocabulary.objects.create(lesson=self.lesson, word=f'word {n}', meaning='m') for n in range(2)]
+        self.url = reverse('flashcard_rate_batch')
+
+    def entry(self, word, rating=3, minutes_ago=10):
+        at = timezone.now() - timedelta(minutes=minutes_ago)
+        return {'vocabulary_id': word.id, 'rating': rating, 'client_timestamp': at.isoformat()}
+
+    def statuses(self, result):
+        return [row['status'] for row in result['results']]
+
+    def test_replayed_queue_is_applied_once(self):
+        entries = [self.entry(self.words[0], minutes_ago=10), self.entry(self.words[1], minutes_ago=9)]
+        first = flashcards.apply_rating_batch(self.user, entries)
+        replay = flashcards.apply_rating_batch(self.user, entries)
+        self.assertEqual(self.statuses(first), ['applied', 'applied'])
+        self.assertEqual(self.statuses(replay), ['duplicate', 'duplicate'])
+        self.assertEqual(VocabularyReview.objects.get(vocabulary=self.words[0]).total_reviews, 1)
+
+    def test_unknown_vocabulary_and_future_ratings(self):
+        missing = {'vocabulary_id': 0, 'rating': 3, 'client_timestamp': timezone.now().isoformat()}
+        result = flashcards.apply_rating_batch(self.user, [
+            missing, self.entry(self.words[0], minutes_ago=-60), self.entry(self.words[1]),
+        ])
+        self.assertEqual(self.statuses(result), ['not_found', 'rejected', 'applied'])
+        self.assertEqual(result['applied'], 1)
+
+    def test_missing_timestamp_is_refused(self):
+        with self.assertRaisesMessage(ValueError, 'Missing client_timestamp'):
+            flashcards.apply_rating_batch(self.user, [{'vocabulary_id': self.words[0].id, 'rating': 3}])
+        self.assertFalse(VocabularyReview.objects.filter(total_reviews__gt=0).exists())
+
+    def test_rollup_matches_reviews(self):
+        flashcards.apply_rating_batch(self.user, [
+            self.entry(self.words[0], rating=4, minutes_ago=10), self.entry(self.words[1], rating=1, minutes_ago=9),
+            self.entry(self.words[0], rating=3, minutes_ago=8),
+        ])
+        rollup = LessonMastery.objects.get(user=self.user, lesson=self.lesson)
+        reviews = VocabularyReview.objects.filter(user=self.user)
+        self.assertEqual(rollup.mastery_sum, sum(review.mastery for review in reviews))
+        self.assertEqual((rollup.card_count, rollup.reviewed_count), (2, 2))
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.post({'ratings': [self.entry(self.words[0])]})
+        self.assertEqual(response.json()['applied'], 1)
+        response = self.post([self.entry(self.words[0])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Expected a JSON object with "ratings"'})
+        self.assertEqual(self.post({'ratings': []}).status_code, 400)
+
+    def test_ratings_are_logged(self):
+        flashcards.apply_rating_batch(self.user, [self.entry(self.words[0], rating=2)])
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('flashcard_rate'), {'vocabulary_id': self.words[1].id, 'rating': 4},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['mastery'], VocabularyReview.objects.get(vocabulary=self.words[1]).mastery)
+        logs = ReviewLog.objects.filter(user=self.user).order_by('reviewed_at')
+        self.assertEqual(
+            [(log.vocabulary_id, log.rating) for log in logs], [(self.words[0].id, 2), (self.words[1].id, 4)]
+        )
+        self.assertEqual(LessonMastery.objects.get(user=self.user, lesson=self.lesson).reviewed_count, 2)
+
+    def test_single_rating_of_unknown_vocabulary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('flashcard_rate'), {'vocabulary_id': 0, 'rating': 3}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('flashcard_rate'), {'vocabulary_id': 999, 'rating': 3}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class LessonMasteryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('learner', password='x')
+        category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(title='L', slug='l', category=category, description='', content='')
+        for number in range(4):
+            word = Vocabulary.objects.create(lesson=self.lesson, word=f'word {number}', meaning='m')
+            VocabularyReview.objects.create(user=self.user, vocabulary=word, mastery=50)
+        LessonMastery.rebuild(lesson_id=self.lesson.id)
+
+    def test_deleting_vocabulary_rebuilds_once_per_lesson(self):
+        with mock.patch.object(LessonMastery, 'rebuild', wraps=LessonMastery.rebuild) as rebuild:
+            Vocabulary.objects.filter(word__in=['word 0', 'word 1']).delete()
+        rebuild.assert_called_once_with(lesson_id=self.lesson.id)
+        self.assertEqual(LessonMastery.objects.get(lesson=self.lesson).card_count, 2)
+
+    def test_deleting_the_lesson_skips_rebuilds(self):
+        with mock.patch.object(LessonMastery, 'rebuild') as rebuild:
+            self.lesson.delete()
+        rebuild.assert_not_called()
+        self.assertFalse(LessonMastery.objects.exists())
+
+
+SAMPLE_MARKDOWN = """# Chào hỏi
+
+Giơ **tay phải** lên, lòng bàn tay hướng ra ngoài.
+Vẫy nhẹ hai lần.
+
+| Ký hiệu | Nghĩa |
+|---|---|
+| A | Xin chào |
+
+```
+bước 1
+```
+
+<script>alert(1)</script> [link](https://example.com)
+"""
+
+
+def legacy_markdown(text):
+    """The markdown filter as it rendered before content HTML was stored"""
+    html = markdown.Markdown(extensions=rendering.MARKDOWN_EXTENSIONS).convert(text)
+    return bleach.clean(html, tags=rendering.ALLOWED_TAGS, attributes=rendering.ALLOWED_ATTRIBUTES, strip=True)
+
+
+class RenderedContentTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Basics', slug='basics')
+        self.lesson = Lesson.objects.create(
+            title='Greetings', slug='greetings', category=self.category, description='', content=SAMPLE_MARKDOWN
+        )
+
+    def test_stored_html_matches_the_markdown_filter(self):
+        self.assertEqual(self.lesson.content_html, legacy_markdown(SAMPLE_MARKDOWN))
+        # The per-thread renderer is reset between documents
+        self.assertEqual(rendering.render_markdown(SAMPLE_MARKDOWN), legacy_markdown(SAMPLE_MARKDOWN))
+
+    def test_forum_html_matches_linebreaks(self):
+        author = User.objects.create_user('author', password='x')
+        post = ForumPost.objects.create(author=author, title='Hi', content='<b>one</b>\n\ntwo')
+        self.assertEqual(post.content_html, '<p>&lt;b&gt;one&lt;/b&gt;</p>\n\n<p>two</p>')
+
+    def test_update_fields_save_rerenders(self):
+        self.lesson.content = '*new*'
+        self.lesson.save(update_fields=['content'])
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.content_html, '<p><em>new</em></p>')
+
+    def test_raw_save_renders(self):
+        lesson = Lesson(
+            title='Raw', slug='raw', category=self.category, description='', content='**raw**',
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        lesson.save_base(raw=True)
+        self.assertEqual(Lesson.objects.get(slug='raw').content_html, '<p><strong>raw</strong></p>')
+
+    def test_detail_page_falls_back_when_html_is_missing(self):
+        Lesson.objects.filter(id=self.lesson.id).update(content_html='')
+        response = self.client.get(reverse('lesson_detail', args=[self.lesson.slug]))
+        self.assertContains(response, legacy_markdown(SAMPLE_MARKDOWN), html=True)
@@ -8,7 +8,9 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('about/', views.about, name='about'),
     path('search/', views.global_search, name='global_search'),
+    path('api/search/suggest/', views.search_suggest, name='search_suggest'),
     path('dictionary/', views.dictionary, name='dictionary'),
+    path('api/dictionary/letter/', views.dictionary_letter_api, name='dictionary_letter_api'),
     path('set-language/', views.set_language, name='set_language'),
 
     # Authentication
@@ -52,6 +54,7 @@ urlpatterns = [
     path('lesson/<slug:slug>/flashcard/', views.flashcard_mode, name='flashcard_mode'),
     path('lesson/<int:lesson_id>/save/', views.save_lesson, name='save_lesson'),
     path('lesson/<int:lesson_id>/complete/', views.complete_lesson, name='complete_lesson'),
+    path('review/', views.review_session, name='review_session'),
 
     # Quiz
     path('quizzes/', views.quiz_list, name='quiz_list'),
@@ -68,6 +71,7 @@ urlpatterns = [
     path('forum/<int:post_id>/edit/', views.forum_edit, name='forum_edit'),
     path('forum/<int:post_id>/delete/', views.forum_delete, name='forum_delete'),
     path('forum/<int:post_id>/like/', views.like_post, name='like_post'),
+    path('api/forum/<int:post_id>/comments/', views.forum_comments_api, name='forum_comments_api'),
     path('forum/<int:post_id>/report/', views.report_post, name='report_post'),
 
     # API
@@ -75,6 +79,9 @@ urlpatterns = [
     path('api/notifications/', views.api_notifications, name='api_notifications'),
     path('api/activity-calendar/', views.activity_calendar_api, name='activity_calendar_api'),
     path('api/flashcard/rate/', views.flashcard_rate, name='flashcard_rate'),
+    path('api/flashcard/rate-batch/', views.flashcard_rate_batch, name='flashcard_rate_batch'),
+    path('api/review/queue/', views.review_queue_api, name='review_queue_api'),
+    path('api/quiz/session/<int:session_id>/save/', views.quiz_session_save, name='quiz_session_save'),
     path('api/chatbot/', views.chatbot_api, name='chatbot_api'),
 
     # Gamification
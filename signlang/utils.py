@@ -2,6 +2,7 @@
 Utility functions for the Sign Language Learning Platform
 """
 import re
+import unicodedata
 from django.utils.text import slugify as django_slugify
 from unidecode import unidecode
 
@@ -57,6 +58,61 @@ def generate_slug(text, max_length=50):
     return slug[:max_length]
 
 
+def fold_text(text):
+    """Lowercase ASCII form of text for accent-insensitive matching ("Xin chào" -> "xin chao")"""
+    if not text:
+        return ''
+    return unidecode(text).lower()
+
+
+def tokenize(text):
+    """Split text into folded word tokens"""
+    return re.findall(r'[a-z0-9]+', fold_text(text))
+
+
+def normalize_text(text, max_length=None):
+    """Folded words joined by single spaces, for normalised lookup columns ("Xin chào!" -> "xin chao")"""
+    normalized = ' '.join(tokenize(text))
+    return normalized[:max_length] if max_length else normalized
+
+
+def trigrams(text):
+    """Character trigrams of each word, padded like PostgreSQL pg_trgm ("ab" -> "  a", " ab", "ab ")"""
+    grams = set()
+    for word in tokenize(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Vietnamese letters plus the English ones it lacks (F, J, W, Z), in dictionary order
+DICTIONARY_LETTERS = [
+    'A', 'Ă', 'Â', 'B', 'C', 'D', 'Đ', 'E', 'Ê', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
+    'N', 'O', 'Ô', 'Ơ', 'P', 'Q', 'R', 'S', 'T', 'U', 'Ư', 'V', 'W', 'X', 'Y', 'Z',
+]
+OTHER_LETTER = '#'
+# Tone marks (huyền, sắc, ngã, hỏi, nặng); breve, circumflex and horn make distinct letters
+TONE_MARKS = {'\u0300', '\u0301', '\u0303', '\u0309', '\u0323'}
+
+
+def dictionary_letter(word):
+    """Dictionary bucket of a word: its first letter without tone marks ("ấm" -> "Â", "đi" -> "Đ")"""
+    word = unicodedata.normalize('NFC', (word or '').strip())
+    if not word or not word[0].isalpha():
+        return OTHER_LETTER
+    base = ''.join(
+        char for char in unicodedata.normalize('NFD', word[0]) if char not in TONE_MARKS
+    )
+    return unicodedata.normalize('NFC', base).upper()[:1]
+
+
+def dictionary_letter_order(letter):
+    """Sort key for letter buckets: alphabet order, then other scripts, then "#" last"""
+    if letter in DICTIONARY_LETTERS:
+        return (0, DICTIONARY_LETTERS.index(letter), '')
+    return (2 if letter == OTHER_LETTER else 1, 0, letter)
+
+
 def clamp(value, min_value, max_value):
     """Clamp a value between min and max"""
     return max(min_value, min(value, max_value))
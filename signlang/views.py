@@ -2,27 +2,32 @@ import json
 import csv
 from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Count, Avg, Max, Q
+from django.db.models import Count, Avg, Q, F, FilteredRelation, Prefetch
 from django.http import JsonResponse, HttpResponseRedirect, HttpResponse
 from django.utils import timezone, translation
 from django.core.paginator import Paginator
-from django.core.cache import cache
 from django.views.decorators.http import require_POST
 from django.conf import settings
 
 from .models import (
     UserProfile, Category, Lesson, Vocabulary, UserProgress, SavedLesson,
-    Quiz, Question, Answer, QuizAttempt, VideoCategory, Video,
+    Quiz, Question, Answer, QuizAttempt, QuizBest, QuizSession,
+    VideoCategory, Video,
     ForumPost, Comment, Like, Report, UserInteraction,
     Badge, UserBadge, UserStreak, UserPoints, Notification, DailyActivity,
-    FeaturedCard, SiteSettings, VocabularyReview
+    FeaturedCard, SiteSettings, VocabularyReview, LessonMastery
 )
-from . import gamification
-from .utils import safe_int, sanitize_string, validate_slug, generate_slug
+from . import cache_tags, gamification, flashcards, grading, forum
+from . import dictionary as dictionary_index
+from .page_cache import cache_anonymous_page
+from .pagination import paginate
+from .search import search as search_content, suggest as suggest_content
+from .utils import safe_int, sanitize_string, validate_slug, generate_slug, dictionary_letter_order
 from .forms import (
     UserRegisterForm, UserUpdateForm, ProfileUpdateForm,
     ForumPostForm, CommentForm, ReportForm
@@ -43,14 +48,14 @@ CACHE_TIMEOUT = 300  # 5 minutes
 
 def get_featured_cards(section):
     """Get featured cards with caching and fallback"""
-    cache_key = f'featured_cards_{section}'
-    cards = cache.get(cache_key)
-
-    if cards is None:
-        cards = list(FeaturedCard.objects.filter(section=section, is_active=True).values(
+    cards = cache_tags.get_or_compute(
+        f'featured_cards_{section}',
+        lambda: list(FeaturedCard.objects.filter(section=section, is_active=True).values(
             'title', 'icon', 'color', 'link', 'description'
-        ))
-        cache.set(cache_key, cards, CACHE_TIMEOUT)
+        )),
+        CACHE_TIMEOUT,
+        tags=['featuredcard'],
+    )
 
     # Fallback for common_sentences if empty
     if not cards and section == 'common_sentences':
@@ -90,6 +95,7 @@ def set_language(request):
     return response
 
 
+@cache_anonymous_page('lesson', 'category', 'featuredcard')
 def home(request):
     categories = Category.objects.all()[:6]
     latest_lessons = Lesson.objects.filter(is_published=True)[:6]
@@ -107,113 +113,78 @@ def home(request):
     return render(request, 'signlang/home.html', context)
 
 
+@cache_anonymous_page()
 def about(request):
     return render(request, 'signlang/about.html')
 
 
+@cache_anonymous_page('vocabulary', 'lesson', 'category')
 def dictionary(request):
-    """Dictionary page with all vocabulary A-Z"""
+    """Dictionary page: letter index with one letter's words at a time (more load on demand)"""
     search = request.GET.get('q', '').strip()
     category_slug = request.GET.get('category', '')
 
-    # Get all vocabulary from published lessons
-    vocabulary = Vocabulary.objects.filter(
-        lesson__is_published=True
-    ).select_related('lesson', 'lesson__category').order_by('word')
+    letter_counts = dictionary_index.get_letter_counts(category_slug)
+    letters = [letter for letter, _ in letter_counts]
+    context = {
+        'letter_nav': dictionary_index.letter_nav(letter_counts),
+        'total_count': sum(count for _, count in letter_counts),
+        'search': search,
+        'categories': dictionary_index.get_categories(),
+        'selected_category': category_slug,
+    }
 
-    # Apply search filter
     if search:
-        vocabulary = vocabulary.filter(
-            Q(word__icontains=search) |
-            Q(meaning__icontains=search)
+        # Accent-insensitive, typo-tolerant matches, grouped by letter (best match first in each)
+        matches = dictionary_index.lookup(
+            search, category_slug, limit=dictionary_index.DICTIONARY_PAGE_SIZE
         )
+        vocab_by_letter = {}
+        for vocab in matches:
+            vocab_by_letter.setdefault(vocab.letter, []).append(vocab)
+        vocab_by_letter = sorted(vocab_by_letter.items(), key=lambda item: dictionary_letter_order(item[0]))
+        context.update({
+            'letter_nav': dictionary_index.letter_nav(
+                [(letter, len(words)) for letter, words in vocab_by_letter]
+            ),
+            'vocab_by_letter': vocab_by_letter,
+            'match_count': len(matches),
+        })
+    elif letters:
+        letter = request.GET.get('letter', '')
+        if letter not in letters:
+            letter = letters[0]
+        vocabulary, cursor = dictionary_index.get_letter_page(letter, category_slug)
+        context.update({
+            'current_letter': letter,
+            'vocab_by_letter': [(letter, vocabulary)],
+            'next_cursor': cursor,
+        })
 
-    # Apply category filter
-    if category_slug:
-        vocabulary = vocabulary.filter(lesson__category__slug=category_slug)
+    return render(request, 'signlang/dictionary.html', context)
 
-    # Group by first letter
-    vocab_by_letter = {}
-    for vocab in vocabulary:
-        if vocab.word and len(vocab.word) > 0:
-            first_letter = vocab.word[0].upper()
-            if not first_letter.isalpha():
-                first_letter = '#'
-        else:
-            first_letter = '#'
-        if first_letter not in vocab_by_letter:
-            vocab_by_letter[first_letter] = []
-        vocab_by_letter[first_letter].append(vocab)
-
-    # Sort letters
-    sorted_letters = sorted(vocab_by_letter.keys(), key=lambda x: (x == '#', x))
-
-    # Get categories for filter
-    categories = Category.objects.annotate(
-        vocab_count=Count('lessons__vocabularies', filter=Q(lessons__is_published=True))
-    ).filter(vocab_count__gt=0)
-
-    return render(request, 'signlang/dictionary.html', {
-        'vocab_by_letter': vocab_by_letter,
-        'sorted_letters': sorted_letters,
-        'total_count': vocabulary.count(),
-        'search': search,
-        'categories': categories,
-        'selected_category': category_slug,
+
+def dictionary_letter_api(request):
+    """API endpoint returning the next page of one dictionary letter as rendered cards"""
+    letter = sanitize_string(request.GET.get('letter', ''), max_length=1)
+    if not letter:
+        return JsonResponse({'error': 'Missing letter'}, status=400)
+    vocabulary, cursor = dictionary_index.get_letter_page(
+        letter,
+        category_slug=request.GET.get('category', ''),
+        cursor=request.GET.get('cursor'),
+    )
+    return JsonResponse({
+        'html': render_to_string('signlang/includes/dictionary_cards.html', {'vocabulary': vocabulary}),
+        'cursor': cursor,
+        'has_more': cursor is not None,
     })
 
 
 def global_search(request):
-    """Global search across lessons, videos, vocabulary, and forum posts"""
+    """Global search across lessons, videos, vocabulary, and forum posts, ranked by relevance"""
     query = request.GET.get('q', '').strip()
-    results = {
-        'lessons': [],
-        'videos': [],
-        'vocabulary': [],
-        'forum': [],
-        'total_count': 0
-    }
-
-    if query and len(query) >= 2:
-        # Search Lessons
-        lessons = Lesson.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(content__icontains=query),
-            is_published=True
-        ).select_related('category')[:10]
-        results['lessons'] = lessons
-
-        # Search Videos
-        videos = Video.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query),
-            is_published=True
-        ).select_related('category')[:10]
-        results['videos'] = videos
-
-        # Search Vocabulary
-        vocabulary = Vocabulary.objects.filter(
-            Q(word__icontains=query) |
-            Q(meaning__icontains=query) |
-            Q(description__icontains=query),
-            lesson__is_published=True
-        ).select_related('lesson')[:10]
-        results['vocabulary'] = vocabulary
-
-        # Search Forum Posts
-        forum_posts = ForumPost.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query)
-        ).select_related('author')[:10]
-        results['forum'] = forum_posts
-
-        results['total_count'] = (
-            len(results['lessons']) +
-            len(results['videos']) +
-            len(results['vocabulary']) +
-            len(results['forum'])
-        )
+    results = search_content(query, limit=10)
 
     return render(request, 'signlang/search_results.html', {
         'query': query,
@@ -221,6 +192,15 @@ def global_search(request):
     })
 
 
+def search_suggest(request):
+    """
+    API endpoint for search box typeahead: titles and words starting with the typed prefix,
+    or vocabulary that looks like it when nothing does (typos)
+    """
+    query = sanitize_string(request.GET.get('q', ''), max_length=100)
+    return JsonResponse({'query': query, 'suggestions': suggest_content(query)})
+
+
 def get_activity_calendar(user, weeks=52):
     """
     Generate activity calendar data for heatmap visualization.
@@ -459,7 +439,7 @@ def profile(request):
     progress = UserProgress.objects.filter(user=request.user)
     stats = {
         'completed_lessons': progress.filter(status='completed').count(),
-        'quiz_attempts': QuizAttempt.objects.filter(user=request.user).count(),
+        'quiz_attempts': QuizBest.totals_for_user(request.user)['attempts'],
         'forum_posts': ForumPost.objects.filter(author=request.user).count(),
     }
 
@@ -473,11 +453,13 @@ def profile(request):
 
 # ============ LESSONS ============
 
+@cache_anonymous_page('category', 'lesson')
 def category_list(request):
     categories = Category.objects.annotate(lesson_count=Count('lessons'))
     return render(request, 'signlang/lessons/category_list.html', {'categories': categories})
 
 
+@cache_anonymous_page('lesson', 'category')
 def lesson_list(request, category_slug=None):
     lessons = Lesson.objects.filter(is_published=True)
     category = None
@@ -498,10 +480,14 @@ def lesson_list(request, category_slug=None):
             Q(title__icontains=search) | Q(description__icontains=search)
         )
 
-    # Pagination
-    paginator = Paginator(lessons, 12)
-    page = request.GET.get('page')
-    lessons = paginator.get_page(page)
+    # Pagination (keyset over the catalogue order; the last key makes positions unique).
+    # Within a category, (order, id) is served by lesson_category_order_idx; the full
+    # catalogue sorts by the category's order too, which no lesson index covers, so the
+    # database sorts the published lessons for each page
+    if category:
+        lessons = paginate(request, lessons, ['order', 'id'], 12)
+    else:
+        lessons = paginate(request, lessons, ['category__order', 'category_id', 'order', 'id'], 12)
 
     context = {
         'lessons': lessons,
@@ -600,15 +586,10 @@ def calculate_lesson_learning_progress(user, lesson):
 
     # Calculate vocabulary mastery
     if stats['has_vocabulary']:
-        reviews = VocabularyReview.objects.filter(
-            user=user,
-            vocabulary__lesson=lesson
-        )
-        stats['vocab_reviewed'] = reviews.filter(total_reviews__gt=0).count()
-
-        if reviews.exists():
-            total_mastery = sum(r.mastery_level for r in reviews)
-            stats['vocab_mastery'] = total_mastery // reviews.count() if reviews.count() > 0 else 0
+        lesson_mastery = LessonMastery.for_lesson(user, lesson)
+        if lesson_mastery:
+            stats['vocab_reviewed'] = lesson_mastery.reviewed_count
+            stats['vocab_mastery'] = lesson_mastery.average_mastery
 
         # Vocabulary progress: need 70% average mastery
         vocab_progress = min(100, int(stats['vocab_mastery'] / 70 * 100))
@@ -616,15 +597,12 @@ def calculate_lesson_learning_progress(user, lesson):
 
     # Calculate quiz progress
     if stats['has_quiz']:
-        best_attempt = QuizAttempt.objects.filter(
-            user=user,
-            quiz=quiz
-        ).order_by('-score').first()
-
-        if best_attempt:
-            stats['quiz_best_score'] = best_attempt.score
-            stats['quiz_passed'] = best_attempt.passed
-            quiz_progress = 100 if best_attempt.passed else int(best_attempt.score / best_attempt.max_score * 100) if best_attempt.max_score > 0 else 0
+        quiz_best = QuizBest.objects.filter(user=user, quiz=quiz).first()
+
+        if quiz_best:
+            stats['quiz_best_score'] = quiz_best.best_score
+            stats['quiz_passed'] = quiz_best.passed
+            quiz_progress = 100 if quiz_best.passed else quiz_best.percentage
         else:
             quiz_progress = 0
 
@@ -691,39 +669,18 @@ def complete_lesson(request, lesson_id):
 @login_required
 def flashcard_mode(request, slug):
     lesson = get_object_or_404(Lesson, slug=slug, is_published=True)
-    vocabularies = lesson.vocabularies.all()
 
-    # Get or create review records for each vocabulary
-    vocab_data = []
-    for vocab in vocabularies:
-        review = VocabularyReview.get_or_create_for_vocabulary(request.user, vocab)
-        vocab_data.append({
-            'id': vocab.id,
-            'word': vocab.word,
-            'meaning': vocab.meaning,
-            'description': vocab.description,
-            'image': vocab.image.url if vocab.image else None,
-            'video': vocab.video.url if vocab.video else None,
-            'review': {
-                'mastery': review.mastery_level,
-                'interval': review.interval,
-                'repetitions': review.repetitions,
-                'is_due': review.is_due,
-                'next_review': review.next_review.isoformat() if review.next_review else None,
-            }
-        })
+    # Cached vocabulary + this user's reviews, with missing reviews bulk-created
+    vocab_data = flashcards.load_deck(request.user, lesson)
 
-    # Calculate lesson mastery
-    total_mastery = sum(v['review']['mastery'] for v in vocab_data)
-    avg_mastery = total_mastery // len(vocab_data) if vocab_data else 0
-
-    # Serialize vocab_data to JSON for JavaScript
-    vocab_json = json.dumps(vocab_data)
+    # Lesson mastery comes from the incrementally maintained rollup
+    lesson_mastery = LessonMastery.for_lesson(request.user, lesson)
+    avg_mastery = lesson_mastery.average_mastery if lesson_mastery else 0
 
     context = {
         'lesson': lesson,
         'vocabularies': vocab_data,
-        'vocabularies_json': vocab_json,
+        'vocabularies_json': flashcards.deck_to_json(vocab_data),
         'avg_mastery': avg_mastery,
         'total_cards': len(vocab_data),
         'due_cards': sum(1 for v in vocab_data if v['review']['is_due']),
@@ -731,40 +688,63 @@ def flashcard_mode(request, slug):
     return render(request, 'signlang/lessons/flashcard.html', context)
 
 
+@login_required
+def review_session(request):
+    """Cross-lesson review of due flashcards, interleaved with new cards"""
+    cards, cursor = flashcards.get_review_batch(request.user)
+
+    context = {
+        'lesson': None,
+        'vocabularies': cards,
+        'vocabularies_json': flashcards.deck_to_json(cards),
+        'due_cards': sum(1 for c in cards if not c['is_new']),
+        'total_cards': len(cards),
+        'queue_cursor': cursor or '',
+        'session_limit': flashcards.REVIEW_SESSION_LIMIT,
+    }
+    return render(request, 'signlang/lessons/flashcard.html', context)
+
+
+@login_required
+def review_queue_api(request):
+    """API endpoint returning the next batch of a review session (used for prefetching)"""
+    cards, cursor = flashcards.get_review_batch(request.user, cursor=request.GET.get('cursor'))
+    return JsonResponse({
+        'cards': cards,
+        'cursor': cursor,
+        'has_more': cursor is not None,
+    })
+
+
 @login_required
 @require_POST
 def flashcard_rate(request):
-    """API endpoint to rate a flashcard (Anki-style)"""
+    """API endpoint to rate a flashcard (Anki-style); applied like a one-card batch"""
     try:
         data = json.loads(request.body)
-        vocab_id = data.get('vocabulary_id')
-        rating = data.get('rating')  # 1=Again, 2=Hard, 3=Good, 4=Easy
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+        vocab_id = safe_int(data.get('vocabulary_id'))
+        rating = safe_int(data.get('rating'))  # 1=Again, 2=Hard, 3=Good, 4=Easy
 
         if not vocab_id or not rating:
             return JsonResponse({'error': 'Missing vocabulary_id or rating'}, status=400)
-
-        rating = int(rating)
         if rating not in [1, 2, 3, 4]:
             return JsonResponse({'error': 'Rating must be 1-4'}, status=400)
 
-        vocabulary = get_object_or_404(Vocabulary, id=vocab_id)
-        review = VocabularyReview.get_or_create_for_vocabulary(request.user, vocabulary)
-
-        # Process the rating
-        next_interval = review.process_rating(rating)
-
-        # Update daily activity
-        gamification.update_daily_activity(request.user, 'flashcard')
-
-        # Award points for reviewing (small amount)
-        if rating >= 3:  # Good or Easy
-            gamification.award_points(request.user, 2, 'lesson')
+        # Review, review log, lesson mastery, points and daily activity in one transaction
+        result = flashcards.rate_card(request.user, vocab_id, rating)
+        if result['status'] == 'not_found':
+            return JsonResponse({'error': 'Vocabulary not found'}, status=404)
+        if result['status'] != 'applied':
+            return JsonResponse({'error': 'Rating already recorded'}, status=409)
 
+        next_interval = result['next_interval']
         return JsonResponse({
             'success': True,
             'next_interval': next_interval,
-            'mastery': review.mastery_level,
-            'next_review': review.next_review.isoformat() if review.next_review else None,
+            'mastery': result['mastery'],
+            'next_review': result['next_review'],
             'message': f'Next review in {next_interval} day{"s" if next_interval != 1 else ""}'
         })
 
@@ -774,34 +754,47 @@ def flashcard_rate(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+@require_POST
+def flashcard_rate_batch(request):
+    """
+    API endpoint to rate several flashcards at once.
+    Accepts {"ratings": [{"vocabulary_id", "rating", "client_timestamp"}, ...]} in review order
+    (client_timestamp is required); ratings already applied are skipped, so offline
+    queues can be replayed.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Expected a JSON object with "ratings"'}, status=400)
+        result = flashcards.apply_rating_batch(request.user, data.get('ratings'))
+        return JsonResponse(dict(result, success=True))
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except ValueError as e:
+        # Raised by clean_rating_entries with a fixed message
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 # ============ QUIZ ============
 
 @login_required
 def quiz_list(request):
-    from django.db.models import Exists, OuterRef
-    
-    quizzes = Quiz.objects.filter(is_active=True).select_related('lesson')
-
-    # Get user's attempts with best (highest) score
-    user_attempts = QuizAttempt.objects.filter(user=request.user).values(
-        'quiz_id'
-    ).annotate(
-        best_score=Max('score'),
-        max_score=Max('max_score'),
-        attempts=Count('id'),
-        has_passed=Exists(
-            QuizAttempt.objects.filter(
-                user=request.user,
-                quiz_id=OuterRef('quiz_id'),
-                passed=True
-            )
-        )
+    # One query: each quiz joined with this user's attempt summary (if any)
+    quizzes = Quiz.objects.filter(is_active=True).select_related('lesson').annotate(
+        my_best=FilteredRelation('user_bests', condition=Q(user_bests__user=request.user)),
+        question_count=Count('questions', distinct=True),
+        best_score=F('my_best__best_score'),
+        best_max_score=F('my_best__max_score'),
+        attempt_count=F('my_best__attempts'),
+        has_passed=F('my_best__passed'),
     )
-    attempts_dict = {a['quiz_id']: a for a in user_attempts}
 
     context = {
         'quizzes': quizzes,
-        'attempts_dict': attempts_dict,
     }
     return render(request, 'signlang/quiz/quiz_list.html', context)
 
@@ -809,109 +802,140 @@ def quiz_list(request):
 @login_required
 def quiz_detail(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id, is_active=True)
-    questions = quiz.questions.prefetch_related('answers').all()
+    definition = grading.get_quiz_definition(quiz)
 
     # Get user's attempt history for this quiz
     user_attempts = QuizAttempt.objects.filter(
         user=request.user,
         quiz=quiz
     ).order_by('-started_at')
-    # Get best attempt (highest score)
-    best_attempt = user_attempts.order_by('-score').first()
-
-    if request.method == 'POST':
-        score = 0
-        max_score = 0
-        results = []
-
-        for question in questions:
-            max_score += question.points
-            selected_answer_id = request.POST.get(f'question_{question.id}')
-
-            if selected_answer_id:
-                try:
-                    selected_answer = Answer.objects.get(id=selected_answer_id)
-                    is_correct = selected_answer.is_correct
-                    if is_correct:
-                        score += question.points
-                except Answer.DoesNotExist:
-                    is_correct = False
-                    selected_answer = None
-            else:
-                is_correct = False
-                selected_answer = None
-
-            correct_answer = question.answers.filter(is_correct=True).first()
-            results.append({
-                'question': question,
-                'selected': selected_answer,
-                'correct': correct_answer,
-                'is_correct': is_correct,
-            })
-
-        # Calculate percentage and pass status
-        percentage = (score / max_score * 100) if max_score > 0 else 0
-        passed = percentage >= quiz.passing_score
-
-        # Save attempt
-        attempt = QuizAttempt.objects.create(
-            user=request.user,
-            quiz=quiz,
-            score=score,
-            max_score=max_score,
-            passed=passed,
-            completed_at=timezone.now()
+    # Best attempt and attempt count come from the per-user summary
+    quiz_best = QuizBest.for_quiz(request.user, quiz)
+
+    # Only an explicit start opens the timed session; viewing the quiz doesn't start the clock
+    if request.method == 'POST' and 'start' in request.POST:
+        QuizSession.open_for(request.user, quiz)
+        return redirect('quiz_detail', quiz_id=quiz.id)
+
+    # Resume the open session, if any; its answers are autosaved by the page
+    session = QuizSession.current_for(request.user, quiz)
+    if session is None and request.method == 'POST':
+        # Submitted without a session (never started, or already graded in another tab).
+        # Untimed quizzes have no clock to enforce, so the submission opens one and is graded
+        if quiz.time_limit:
+            messages.warning(request, 'Your answers were not recorded: start the quiz before submitting.')
+            return redirect('quiz_detail', quiz_id=quiz.id)
+        session = QuizSession.open_for(request.user, quiz)
+    if session and request.method != 'POST' and session.is_expired and not session.answers:
+        # Time ran out before anything was answered: no attempt is recorded
+        session.discard()
+        messages.info(request, 'Time ran out before any answers were saved. You can start the quiz again.')
+        session = None
+
+    # Submitting, or coming back after time ran out with saved answers, grades the session
+    if session and (request.method == 'POST' or session.is_expired):
+        key = definition.key
+        selections = session.selections
+        if request.method == 'POST' and not session.is_expired:
+            posted = key.selections_from_post(request.POST)
+            selections.update({question_id: answer for question_id, answer in posted.items() if answer})
+        result = grading.grade(key, selections, quiz.passing_score)
+
+        # Save attempt, the user's best-score summary and item analysis
+        # (p-value, answer distribution, discrimination) together
+        attempt, quiz_best = session.finish(
+            result.score, result.max_score, result.passed, answers=result.answer_ids,
+            responses=result.responses, score_fraction=result.percentage / 100,
         )
+        if attempt is None:
+            # Already submitted from another request
+            return redirect('quiz_detail', quiz_id=quiz.id)
 
         # Track interaction (only if quiz has a lesson)
         if quiz.lesson:
             UserInteraction.objects.create(
                 user=request.user,
                 lesson=quiz.lesson,
-                interaction_type='quiz_pass' if passed else 'quiz_fail',
-                weight=2.5 if passed else 0.5
+                interaction_type='quiz_pass' if result.passed else 'quiz_fail',
+                weight=2.5 if result.passed else 0.5
             )
 
         # Gamification: Award points and check badges
         gamification.on_quiz_complete(request.user, attempt)
 
-        # Refresh attempt history after new attempt
-        user_attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            quiz=quiz
-        ).order_by('-started_at')
-        best_attempt = user_attempts.order_by('-score').first()
-
         # Check if this is a new personal best
-        is_new_best = (attempt.id == best_attempt.id) if best_attempt else True
+        is_new_best = quiz_best.best_attempt_id == attempt.id
 
         context = {
             'quiz': quiz,
-            'results': results,
-            'score': score,
-            'max_score': max_score,
-            'percentage': round(percentage, 1),
-            'passed': passed,
+            'results': result.results,
+            'score': result.score,
+            'max_score': result.max_score,
+            'percentage': round(result.percentage, 1),
+            'passed': result.passed,
             'attempt': attempt,
             'is_new_best': is_new_best,
-            'best_attempt': best_attempt,
+            'best_attempt': quiz_best.best_attempt,
             'user_attempts': user_attempts[:10],  # Last 10 attempts
-            'total_attempts': user_attempts.count(),
+            'total_attempts': quiz_best.attempts,
         }
         return render(request, 'signlang/quiz/quiz_result.html', context)
 
     context = {
         'quiz': quiz,
-        'questions': questions,
+        'questions': definition.questions,
+        'session': session,
+        'saved_answers': session.selections if session else {},
         'user_attempts': user_attempts[:5],  # Show recent attempts on quiz page
-        'best_attempt': best_attempt,
-        'total_attempts': user_attempts.count(),
+        'best_attempt': quiz_best.best_attempt if quiz_best else None,
+        'total_attempts': quiz_best.attempts if quiz_best else 0,
     }
     return render(request, 'signlang/quiz/quiz_detail.html', context)
 
 
+@login_required
+@require_POST
+def quiz_session_save(request, session_id):
+    """
+    API endpoint to autosave answers of an open quiz session.
+    Accepts {"answers": {"<question_id>": <answer_id>, ...}} (only changed questions are needed).
+    """
+    session = get_object_or_404(
+        QuizSession.objects.select_related('quiz'), id=session_id, user=request.user
+    )
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Expected a JSON object with "answers"'}, status=400)
+        answers = data.get('answers')
+        if not isinstance(answers, dict):
+            return JsonResponse({'error': 'answers must be an object'}, status=400)
+
+        # Only keep answers that belong to their question in the current quiz definition
+        key = grading.get_quiz_definition(session.quiz).key
+        cleaned = {}
+        for question_id, answer_id in answers.items():
+            question_id = grading.parse_answer_id(question_id)
+            answer_id = grading.parse_answer_id(answer_id)
+            if question_id in key.map and answer_id in key.map[question_id]:
+                cleaned[question_id] = answer_id
+
+        if not session.save_answers(cleaned):
+            return JsonResponse({'error': 'Quiz session has ended', 'expired': True}, status=409)
+
+        return JsonResponse({
+            'success': True,
+            'saved': len(cleaned),
+            'remaining_seconds': session.remaining_seconds,
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+
 # ============ VIDEO LIBRARY ============
 
+@cache_anonymous_page('video', 'videocategory')
 def video_list(request):
     videos = Video.objects.filter(is_published=True)
     categories = VideoCategory.objects.annotate(video_count=Count('videos'))
@@ -934,9 +958,7 @@ def video_list(request):
         )
 
     # Pagination
-    paginator = Paginator(videos, 12)
-    page = request.GET.get('page')
-    videos = paginator.get_page(page)
+    videos = paginate(request, videos, ['-created_at', '-id'], 12)
 
     context = {
         'videos': videos,
@@ -968,10 +990,7 @@ def video_detail(request, slug):
 # ============ FORUM ============
 
 def forum_list(request):
-    posts = ForumPost.objects.select_related('author').annotate(
-        likes_count=Count('likes'),
-        comments_count=Count('comments')
-    ).order_by('-created_at')
+    posts = ForumPost.objects.select_related('author')
 
     # Search
     search = request.GET.get('search')
@@ -980,20 +999,26 @@ def forum_list(request):
             Q(title__icontains=search) | Q(content__icontains=search)
         )
 
+    # Feed: newest (pinned first), hot or top this week, each a range scan on its own index
+    feed = request.GET.get('sort')
+    if feed not in forum.FEEDS:
+        feed = forum.DEFAULT_FEED
+    posts, ordering = forum.feed_posts(posts, feed)
+
     # Pagination
-    paginator = Paginator(posts, 10)
-    page = request.GET.get('page')
-    posts = paginator.get_page(page)
+    posts = paginate(request, posts, ordering, 10)
 
     context = {
         'posts': posts,
+        'feed': feed,
     }
     return render(request, 'signlang/forum/forum_list.html', context)
 
 
 def forum_detail(request, post_id):
     post = get_object_or_404(ForumPost, id=post_id)
-    comments = post.comments.select_related('author').all()
+    # Only the first page of top-level comments; replies and later pages load on demand
+    comments = paginate(request, forum.top_level_comments(post), forum.COMMENT_ORDERING, forum.COMMENT_PAGE_SIZE)
 
     is_liked = False
     if request.user.is_authenticated:
@@ -1005,9 +1030,11 @@ def forum_detail(request, post_id):
         comment_form = CommentForm(request.POST)
         if comment_form.is_valid():
             comment = comment_form.save(commit=False)
-            comment.post = post
             comment.author = request.user
-            comment.save()
+            parent = None
+            if request.POST.get('parent'):
+                parent = Comment.objects.filter(id=safe_int(request.POST['parent']), post=post).first()
+            post.add_comment(comment, parent=parent)
             messages.success(request, 'Comment added!')
             return redirect('forum_detail', post_id=post.id)
 
@@ -1020,6 +1047,31 @@ def forum_detail(request, post_id):
     return render(request, 'signlang/forum/forum_detail.html', context)
 
 
+def forum_comments_api(request, post_id):
+    """API endpoint returning the next page of a post's top-level comments, or of one thread's replies"""
+    post = get_object_or_404(ForumPost, id=post_id)
+    parent_id = safe_int(request.GET.get('parent'), default=None)
+    if parent_id is None:
+        comments, ordering, per_page = forum.top_level_comments(post), forum.COMMENT_ORDERING, forum.COMMENT_PAGE_SIZE
+        root = None
+    else:
+        root = Comment.objects.filter(id=parent_id, post=post).first()
+        if root is None:
+            return JsonResponse({'error': 'Comment not found'}, status=404)
+        comments, ordering, per_page = forum.thread_replies(root), forum.REPLY_ORDERING, forum.REPLY_PAGE_SIZE
+
+    page = paginate(request, comments, ordering, per_page)
+    for comment in page:
+        comment.indent = comment.depth - root.depth - 1 if root else 0
+    return JsonResponse({
+        'html': render_to_string('signlang/includes/forum_comments.html', {
+            'comments': page, 'post': post, 'user': request.user,
+        }),
+        'cursor': page.next_cursor,
+        'has_more': page.has_next,
+    })
+
+
 @login_required
 def forum_create(request):
     if request.method == 'POST':
@@ -1071,15 +1123,12 @@ def forum_delete(request, post_id):
 @login_required
 def like_post(request, post_id):
     post = get_object_or_404(ForumPost, id=post_id)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
-
-    if not created:
-        like.delete()
+    liked, like_count = post.toggle_like(request.user)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
-            'liked': created,
-            'count': post.likes.count()
+            'liked': liked,
+            'count': like_count
         })
 
     return redirect('forum_detail', post_id=post.id)
@@ -1308,10 +1357,21 @@ def admin_dashboard(request):
     recent_users = User.objects.order_by('-date_joined')[:5]
     recent_posts = ForumPost.objects.order_by('-created_at')[:5]
 
+    # Hardest signs across all learners (lowest average stored mastery)
+    difficulty = list(VocabularyReview.vocabulary_difficulty(limit=5))
+    vocab_map = Vocabulary.objects.select_related('lesson').in_bulk(
+        [row['vocabulary_id'] for row in difficulty]
+    )
+    hardest_vocabulary = [
+        dict(row, vocabulary=vocab_map[row['vocabulary_id']])
+        for row in difficulty if row['vocabulary_id'] in vocab_map
+    ]
+
     context = {
         'stats': stats,
         'recent_users': recent_users,
         'recent_posts': recent_posts,
+        'hardest_vocabulary': hardest_vocabulary,
     }
     return render(request, 'signlang/admin/dashboard.html', context)
 
@@ -1419,9 +1479,7 @@ def admin_lesson_list(request):
         )
 
     # Pagination
-    paginator = Paginator(lessons, 15)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    page_obj = paginate(request, lessons, ['-created_at', '-id'], 15, estimate_total=True)
 
     return render(request, 'signlang/admin/lesson_list.html', {
         'lessons': page_obj,
@@ -1838,7 +1896,9 @@ def admin_quiz_create(request):
 @teacher_or_staff_required
 def admin_quiz_edit(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
-    questions = quiz.questions.prefetch_related('answers').all()
+    questions = quiz.questions.select_related('stats').prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.select_related('stats'))
+    ).all()
     lessons = Lesson.objects.all()
 
     if request.method == 'POST':
@@ -1856,7 +1916,8 @@ def admin_quiz_edit(request, quiz_id):
             for error in errors:
                 messages.error(request, error)
             return render(request, 'signlang/admin/quiz_form.html', {
-                'quiz': quiz, 'questions': questions, 'lessons': lessons, 'action': 'Edit'
+                'quiz': quiz, 'item_analysis': grading.item_analysis(questions), 'lessons': lessons,
+                'action': 'Edit'
             })
 
         quiz.title = title
@@ -1870,7 +1931,8 @@ def admin_quiz_edit(request, quiz_id):
         return redirect('admin_quiz_list')
 
     return render(request, 'signlang/admin/quiz_form.html', {
-        'quiz': quiz, 'questions': questions, 'lessons': lessons, 'action': 'Edit'
+        'quiz': quiz, 'item_analysis': grading.item_analysis(questions), 'lessons': lessons,
+        'action': 'Edit'
     })
 
 
@@ -2139,7 +2201,7 @@ def admin_vocabulary_delete(request, vocab_id):
 # User Management
 @teacher_or_staff_required
 def admin_user_list(request):
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.all()
 
     # Search
     search = request.GET.get('search')
@@ -2151,10 +2213,8 @@ def admin_user_list(request):
             Q(last_name__icontains=search)
         )
 
-    # Pagination
-    paginator = Paginator(users, 20)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    # Pagination (newest first by id: ids follow sign-up order and, unlike date_joined, are indexed)
+    page_obj = paginate(request, users, ['-id'], 20, estimate_total=True)
 
     return render(request, 'signlang/admin/user_list.html', {
         'users': page_obj,
@@ -2206,9 +2266,7 @@ def admin_report_list(request):
         reports = reports.filter(status=status)
 
     # Pagination
-    paginator = Paginator(reports, 20)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
+    page_obj = paginate(request, reports, ['-created_at', '-id'], 20, estimate_total=True)
 
     return render(request, 'signlang/admin/report_list.html', {
         'reports': page_obj,
@@ -2368,7 +2426,7 @@ def export_users_csv(request):
             current_streak = 0
 
         lessons_completed = UserProgress.objects.filter(user=user, status='completed').count()
-        quizzes_passed = QuizAttempt.objects.filter(user=user, passed=True).count()
+        quizzes_passed = QuizBest.totals_for_user(user)['passed']
 
         writer.writerow([
             user.username,